@@ -0,0 +1,35 @@
+import os
+import struct
+
+MAGIC = b'R2D1REC'
+VERSION = 1
+
+
+def record_format(fields):
+    """Returns the struct format of a record, little endian without padding."""
+    return '<' + ''.join(field_type for name, field_type in fields)
+
+
+def pack_header(fields):
+    """
+    Packs the self-describing file header.
+
+    Args:
+        fields (list): (name, struct type) pairs of the record.
+
+    Returns:
+        bytes: magic, version, u16 length and the 'name:type' list separated by commas.
+    """
+    description = ','.join(f'{name}:{field_type}' for name, field_type in fields).encode('ascii')
+    return MAGIC + struct.pack('<BH', VERSION, len(description)) + description
+
+
+def write_header(filename, fields):
+    """Writes the header if filename does not exist yet or is empty, so reboots keep appending records."""
+    try:
+        if os.stat(filename)[6] > 0:
+            return
+    except OSError:
+        pass
+    with open(filename, 'wb') as file:
+        file.write(pack_header(fields))
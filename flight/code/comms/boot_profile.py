@@ -0,0 +1,52 @@
+import time
+
+from code.comms.logger import default_logger
+
+
+class BootProfiler:
+    """Measures where the time between power on and the first sample goes.
+
+    main.py imports the sensor drivers through `load` and R2D1.setup times every `setup()` through `timed`,
+    so a brownout reboot can be checked against the boot budget from logs.log alone. Times are kept in
+    microseconds and reported in milliseconds.
+
+    Args:
+        logger (Logger, optional): Logger the report is written to. Defaults to default_logger.
+    """
+
+    def __init__(self, logger=None):
+        self.logger = logger or default_logger
+        self.started = time.ticks_us()
+        self.entries = []
+
+    def load(self, module, name=None):
+        """Imports module, or the attribute name from it, and records how long it took.
+
+        Args:
+            module (str): Dotted module name, e.g. 'code.sensors.uv'.
+            name (str, optional): Attribute to return instead of the module, e.g. 'UV'.
+        """
+        start = time.ticks_us()
+        imported = __import__(module, None, None, [name] if name else [])
+        self.entries.append(('import', module, time.ticks_diff(time.ticks_us(), start)))
+        return getattr(imported, name) if name else imported
+
+    def timed(self, label, function, *args, **kwargs):
+        """Calls function(*args, **kwargs), records how long it took and returns its result."""
+        start = time.ticks_us()
+        result = function(*args, **kwargs)
+        self.entries.append(('setup', label, time.ticks_diff(time.ticks_us(), start)))
+        return result
+
+    def mark(self, label):
+        """Records the time since boot at a milestone, e.g. 'first sample'."""
+        self.entries.append(('mark', label, time.ticks_diff(time.ticks_us(), self.started)))
+
+    def report(self):
+        """Writes one line per import, setup and milestone to the logger."""
+        for kind, label, us in self.entries:
+            self.logger.info(f'BOOT > {kind.upper():6} > {label} > {us / 1000:.1f} ms\n')
+        self.logger.flush()
+
+
+boot_profiler = BootProfiler()
@@ -0,0 +1,140 @@
+import binascii
+import os
+import struct
+import time
+
+MAGIC = b'R2CK'
+VERSION = 2
+
+# magic, version, flags, resets, sequence, mission time in ms, radio frame count, radio telemetry count, groups
+HEAD = '<4sBBHIIIIB'
+HEAD_SIZE = struct.calcsize(HEAD)
+# group name, packet count, store count, next frame sequence tag
+GROUP = '<12sIII'
+GROUP_SIZE = struct.calcsize(GROUP)
+CRC = '<I'
+
+FLAG_GPS_AIRBORNE = 0x01
+
+# longer than any flight, a checkpoint further into its mission is left over from bench runs
+MAX_ELAPSED_MS = 8 * 3600 * 1000
+
+
+class Checkpoint:
+    """Warm restart state, so a watchdog reset or brownout mid flight resumes instead of starting over.
+
+    The mission time, the packet, store, sequence tag and radio counters and whether the GPS is already in airborne mode
+    are packed into a few dozen bytes. FAT cannot replace a file atomically, so saves alternate between two
+    slots, each ending in a CRC32, and `load` takes the newest slot that is intact. A reset during a save
+    therefore loses at most one interval.
+
+    The checkpoint has to be cleared (`clear`) before launch, otherwise the flight resumes the last test.
+    R2D1.setup clears it when the clear pin is held at power on, see main.py. As a guard, a checkpoint more
+    than `max_elapsed_ms` into its mission is taken as left over and cleared instead of resumed.
+
+    Args:
+        filename (str, optional): Slot files are filename + '.0' and filename + '.1'.
+            Defaults to '/data/checkpoint'.
+        interval_ms (int, optional): Interval for `maybe_save`. Defaults to 10000.
+        max_elapsed_ms (int, optional): Longest mission time a checkpoint is resumed from. Defaults to 8 h.
+    """
+
+    def __init__(self, filename='/data/checkpoint', interval_ms=10000, max_elapsed_ms=MAX_ELAPSED_MS):
+        self.filename = filename
+        self.interval_ms = interval_ms
+        self.max_elapsed_ms = max_elapsed_ms
+        self.rejected = None # the state load found too old, if any
+        self.sequence = 0
+        self.resets = 0
+        self._last_save = time.ticks_ms()
+
+    def _slot(self, sequence):
+        return f'{self.filename}.{sequence % 2}'
+
+    def _read_slot(self, filename):
+        try:
+            with open(filename, 'rb') as file:
+                data = file.read()
+        except OSError:
+            return None
+        if len(data) < HEAD_SIZE + 4 or data[:len(MAGIC)] != MAGIC:
+            return None
+        if struct.unpack(CRC, data[-4:])[0] != binascii.crc32(data[:-4]) & 0xFFFFFFFF:
+            return None
+        magic, version, flags, resets, sequence, elapsed_ms, frame_count, telemetry_count, groups = \
+            struct.unpack(HEAD, data[:HEAD_SIZE])
+        if version != VERSION or len(data) != HEAD_SIZE + groups * GROUP_SIZE + 4:
+            return None
+        state = {
+            'sequence': sequence,
+            'resets': resets,
+            'elapsed_ms': elapsed_ms,
+            'gps_airborne': bool(flags & FLAG_GPS_AIRBORNE),
+            'frame_count': frame_count,
+            'telemetry_count': telemetry_count,
+            'packet_count': {},
+            'store_count': {},
+            'frame_tags': {},
+        }
+        for i in range(groups):
+            name, packet_count, store_count, frame_tag = struct.unpack_from(GROUP, data, HEAD_SIZE + i * GROUP_SIZE)
+            name = name.rstrip(b'\x00').decode('ascii')
+            state['packet_count'][name] = packet_count
+            state['store_count'][name] = store_count
+            state['frame_tags'][name] = frame_tag
+        return state
+
+    def load(self):
+        """Returns the newest intact state, or None on a cold start.
+
+        A loaded state counts as one more reset and the next save continues its sequence. A state past
+        `max_elapsed_ms` is kept in `rejected`, both slots are cleared and None is returned.
+        """
+        states = [state for state in (self._read_slot(self._slot(0)), self._read_slot(self._slot(1))) if state]
+        if not states:
+            return None
+        state = max(states, key=lambda state: state['sequence'])
+        if state['elapsed_ms'] > self.max_elapsed_ms:
+            self.rejected = state
+            self.clear()
+            return None
+        self.sequence = state['sequence'] + 1
+        self.resets = state['resets'] + 1
+        state['resets'] = self.resets
+        return state
+
+    def save(self, state):
+        """Writes state (as returned by `load`, without 'sequence' and 'resets') to the older slot."""
+        groups = state['packet_count']
+        data = struct.pack(HEAD, MAGIC, VERSION, FLAG_GPS_AIRBORNE if state['gps_airborne'] else 0,
+                           self.resets & 0xFFFF, self.sequence, state['elapsed_ms'] & 0xFFFFFFFF,
+                           state['frame_count'], state['telemetry_count'], len(groups))
+        for name, packet_count in groups.items():
+            data += struct.pack(GROUP, name.encode('ascii')[:12], packet_count, state['store_count'].get(name, 0),
+                                state['frame_tags'].get(name, 0))
+        data += struct.pack(CRC, binascii.crc32(data) & 0xFFFFFFFF)
+        with open(self._slot(self.sequence), 'wb') as file:
+            file.write(data)
+        self.sequence += 1
+        self._last_save = time.ticks_ms()
+
+    def maybe_save(self, get_state):
+        """Saves get_state() if `interval_ms` has passed since the last save."""
+        if time.ticks_diff(time.ticks_ms(), self._last_save) >= self.interval_ms:
+            self.save(get_state())
+
+    def next_save_ms(self, now=None):
+        """Returns the ms until maybe_save saves."""
+        if now is None:
+            now = time.ticks_ms()
+        return max(0, self.interval_ms - time.ticks_diff(now, self._last_save))
+
+    def clear(self):
+        """Removes both slots, the next boot is a cold start."""
+        for sequence in (0, 1):
+            try:
+                os.remove(self._slot(sequence))
+            except OSError:
+                pass
+        self.sequence = 0
+        self.resets = 0
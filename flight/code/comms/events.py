@@ -0,0 +1,81 @@
+import struct
+
+# event ids of the binary log, the text form of each is EVENTS[id]
+TEXT = 0
+MISSION_START = 1
+SETUP_GROUP = 2
+SETUP_RADIO = 3
+SETUP_PACKETS = 4
+STORE = 5
+TRANSMIT = 6
+QUEUE = 7
+RESUME = 8
+PHASE = 9
+CPU = 10
+DUAL_CORE = 11
+SENT = 12
+
+# id -> (name, text template, argument format, argument names)
+# argument formats are struct codes, 's' is an utf-8 string with an u16 length prefix
+# counters that grow for the whole flight are 'I', pack_event saturates anything beyond its code
+EVENTS = {
+    TEXT: ('TEXT', '{text}', 's', ('text',)),
+    MISSION_START: ('MISSION_START', '------Mission Start------\nStart Time - {epoch}\n', 'I', ('epoch',)),
+    SETUP_GROUP: ('SETUP_GROUP', '{t:9} > SETUP    > {group:9} > {sensors}\n', 'ss', ('group', 'sensors')),
+    SETUP_RADIO: ('SETUP_RADIO', '{t:9} > SETUP    > Radio\n', '', ()),
+    SETUP_PACKETS: ('SETUP_PACKETS', '{t:9} > SETUP    > Created empty packets\n', '', ()),
+    STORE: ('STORE', '{t:9} > STORE    > {group}\n', 's', ('group',)),
+    TRANSMIT: ('TRANSMIT', '{t:9} > TRANSMIT > {group:9} > Packet Count - {packet_count} > Packet Rate - {packet_rate}\n',
+               'sIf', ('group', 'packet_count', 'packet_rate')),
+    QUEUE: ('QUEUE', '{t:9} > QUEUE    > {group:9} > Depth - {depth} > Drops - {drops} > Duplicates - {duplicates} > Latency - {latency}\n',
+            'sHIIf', ('group', 'depth', 'drops', 'duplicates', 'latency')),
+    RESUME: ('RESUME', '{t:9} > RESUME   > Reset {resets} > GPS airborne - {gps_airborne}\n', 'HB', ('resets', 'gps_airborne')),
+    PHASE: ('PHASE', '{t:9} > PHASE    > {phase:9} > Rate - {rate} m/s\n', 'sf', ('phase', 'rate')),
+    CPU: ('CPU', '{t:9} > CPU      > Duty - {duty}% > Wakes - {wakes} > MCU - {current} mA\n', 'fIf', ('duty', 'wakes', 'current')),
+    DUAL_CORE: ('DUAL_CORE', '{t:9} > DUAL     > Depth - {depth} > Peak - {peak} > Overflows - {overflows} > Throttled - {throttled} > Latency - {latency} ms\n',
+                'HHIIf', ('depth', 'peak', 'overflows', 'throttled', 'latency')),
+    SENT: ('SENT', '{t:9} > SENT     > {group:9} > Frame - {msgid} > Bytes - {length} > Latency - {latency} ms\n',
+           'sBHI', ('group', 'msgid', 'length', 'latency')),
+}
+
+MAGIC = b'R2D1LOG'
+VERSION = 1
+
+# every record starts with the event id and the mission time in ms
+RECORD_HEAD = '<BI'
+RECORD_HEAD_SIZE = struct.calcsize(RECORD_HEAD)
+
+# largest value of each unsigned integer code
+UNSIGNED_MAX = {'B': 0xFF, 'H': 0xFFFF, 'I': 0xFFFFFFFF}
+
+
+def format_event(event_id, t, args):
+    """Returns the text log line of an event."""
+    name, template, fmt, names = EVENTS[event_id]
+    return template.format(t=t, **dict(zip(names, args)))
+
+
+def pack_event(event_id, ms, args):
+    """Packs an event into a binary record.
+
+    An unsigned value out of range of its code is saturated, a log line is never worth an exception in the
+    main loop.
+    """
+    fmt = EVENTS[event_id][2]
+    record = struct.pack(RECORD_HEAD, event_id, ms & 0xFFFFFFFF)
+    for code, value in zip(fmt, args):
+        if code == 's':
+            value = str(value).encode('utf-8')
+            record += struct.pack('<H', len(value)) + value
+        else:
+            if code in UNSIGNED_MAX:
+                value = min(max(int(value), 0), UNSIGNED_MAX[code])
+            record += struct.pack('<' + code, value)
+    return record
+
+
+def pack_header():
+    """Packs the file header, the event table is stored once so the records only carry ids and values."""
+    table = ''.join(f'{event_id}\x1f{name}\x1f{template}\x1f{fmt}\x1f{",".join(names)}\x1e'
+                    for event_id, (name, template, fmt, names) in EVENTS.items()).encode('utf-8')
+    return MAGIC + struct.pack('<BH', VERSION, len(table)) + table
@@ -0,0 +1,115 @@
+PRE_LAUNCH = 0
+ASCENT = 1
+FLOAT = 2
+DESCENT = 3
+LANDED = 4
+
+PHASE_NAMES = ('pre_launch', 'ascent', 'float', 'descent', 'landed')
+
+# the MS5611 reads down to 10 mbar, about 31 km, the GPS altitude is used above
+MIN_PRESSURE = 1000
+
+
+def pressure_altitude(pressure):
+    """Altitude in m of the standard atmosphere for a pressure in Pa, good to about 11 km and a guide above."""
+    return 44330.8 * (1 - (pressure / 101325) ** 0.190263)
+
+
+class FlightPhase:
+    """Incremental flight phase detector from the pressure and GPS altitude streams.
+
+    The altitude is the pressure altitude while the pressure is in the MS5611 range and the GPS altitude
+    otherwise. Its vertical rate, taken over at least `interval_s`, is smoothed with an exponential moving
+    average over `smoothing_s`. A phase only changes once the rate has pointed to the new phase for `hold_s`
+    without a break, and the rate thresholds to enter and leave a phase differ, so noise around a threshold
+    does not flip the phase.
+
+    pre_launch -> ascent -> float -> descent -> landed, float goes back to ascent if the balloon climbs
+    again. A warm restart aloft starts in pre_launch, level above `flight_altitude` it goes to float.
+
+    Args:
+        ascent_rate (float, optional): m/s above which the balloon is climbing. Defaults to 1.5.
+        descent_rate (float, optional): m/s of sink above which it is descending. Defaults to 3.
+        level_rate (float, optional): m/s below which it is level (float or landed). Defaults to 0.5.
+        hold_s (float, optional): Time a new phase has to be indicated before the change. Defaults to 30.
+        smoothing_s (float, optional): Time constant of the rate average. Defaults to 20.
+        interval_s (float, optional): Shortest interval a rate is taken over. Defaults to 5.
+        flight_altitude (float, optional): m above which a level balloon is floating. Defaults to 3000.
+    """
+
+    def __init__(self, ascent_rate=1.5, descent_rate=3, level_rate=0.5, hold_s=30, smoothing_s=20,
+                 interval_s=5, flight_altitude=3000):
+        self.ascent_rate = ascent_rate
+        self.descent_rate = descent_rate
+        self.level_rate = level_rate
+        self.hold_s = hold_s
+        self.smoothing_s = smoothing_s
+        self.interval_s = interval_s
+        self.flight_altitude = flight_altitude
+        self.phase = PRE_LAUNCH
+        self.rate = 0.0
+        self.altitude = None
+        self._source = None
+        self._t = None
+        self._candidate = None
+        self._since = None
+
+    def update(self, t, altitude=None, pressure=None):
+        """Adds a sample at mission time t (s). Returns the new phase if it changed, otherwise None.
+
+        A GPS altitude of 0 is taken as no fix, like a pressure of 0 as no reading.
+        """
+        if pressure and pressure >= MIN_PRESSURE:
+            source = 'pressure'
+        elif altitude:
+            source = 'gps'
+        else:
+            return None
+        # called every cycle, only samples an interval apart are converted
+        if source == self._source and t - self._t < self.interval_s:
+            return None
+        if source == 'pressure':
+            altitude = pressure_altitude(pressure)
+        if source != self._source:
+            # the two altitudes differ by tens of metres, start the rate again from the new source
+            self._source, self._t, self.altitude = source, t, altitude
+            return None
+        dt = t - self._t
+        alpha = dt / (self.smoothing_s + dt)
+        self.rate += alpha * ((altitude - self.altitude) / dt - self.rate)
+        self._t, self.altitude = t, altitude
+        return self._hold(self.classify(), t)
+
+    def classify(self):
+        """Returns the phase the current rate and altitude point to."""
+        phase, rate = self.phase, self.rate
+        if phase == LANDED:
+            return LANDED
+        if rate > (self.level_rate if phase == ASCENT else self.ascent_rate):
+            return ASCENT
+        if phase in (ASCENT, FLOAT, DESCENT) and rate < -(self.level_rate if phase == DESCENT else self.descent_rate):
+            return DESCENT
+        if abs(rate) < self.level_rate:
+            if phase == ASCENT:
+                return FLOAT
+            if phase == DESCENT:
+                return LANDED
+            if phase == PRE_LAUNCH and self.altitude > self.flight_altitude:
+                return FLOAT
+        return phase
+
+    def _hold(self, candidate, t):
+        if candidate == self.phase:
+            self._candidate = None
+            return None
+        if candidate != self._candidate:
+            self._candidate, self._since = candidate, t
+            return None
+        if t - self._since < self.hold_s:
+            return None
+        self.phase = candidate
+        self._candidate = None
+        return candidate
+
+    def name(self):
+        return PHASE_NAMES[self.phase]
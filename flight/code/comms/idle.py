@@ -0,0 +1,92 @@
+import time
+
+SPIN = 'spin'
+SLEEP = 'sleep'
+LIGHTSLEEP = 'lightsleep'
+
+# rough RP2040 (Pico) supply current in mA per mode at 125 MHz, the MCU only, sensors and radio come on top
+ACTIVE_MA = 25
+IDLE_MA = {SPIN: ACTIVE_MA, SLEEP: 12, LIGHTSLEEP: 1.5}
+
+
+class Idle:
+    """Idles the main loop until the next due task and keeps the CPU duty cycle.
+
+    'sleep' waits with time.sleep_ms, which halts the core between interrupts, so UART and I2C keep
+    working. 'lightsleep' uses machine.lightsleep and stops the peripheral clocks as well, UART bytes that
+    arrive while it sleeps are lost, so it only suits a GPS configured for short bursts (GPS(protocol='ubx'))
+    or none. 'spin' does not idle at all, the loop runs back to back.
+
+    Args:
+        mode (str, optional): 'sleep', 'lightsleep' or 'spin'. Defaults to 'sleep'.
+        min_sleep_ms (int, optional): Shorter waits are skipped, a wake up costs more. Defaults to 2.
+        max_sleep_ms (int, optional): Longest single wait, bounds the latency to anything not scheduled.
+            Defaults to 1000.
+        report_interval_ms (int, optional): Window of the duty cycle. Defaults to 60000.
+    """
+
+    def __init__(self, mode=SLEEP, min_sleep_ms=2, max_sleep_ms=1000, report_interval_ms=60000):
+        if mode not in IDLE_MA:
+            raise ValueError(f'Invalid idle mode {mode}')
+        self.mode = mode
+        self.min_sleep_ms = min_sleep_ms
+        self.max_sleep_ms = max_sleep_ms
+        self.report_interval_ms = report_interval_ms
+        self._sleep = time.sleep_ms
+        if mode == LIGHTSLEEP:
+            import machine
+            self._sleep = machine.lightsleep
+        self.busy_us = 0
+        self.idle_us = 0
+        self.wakes = 0
+        self.duty = 1.0
+        self._window_start = self._wake = time.ticks_us()
+
+    def wait(self, due_ms):
+        """Counts the time since the last wake up as busy and sleeps for due_ms, within the bounds."""
+        now = time.ticks_us()
+        self.busy_us += time.ticks_diff(now, self._wake)
+        due_ms = min(due_ms, self.max_sleep_ms)
+        if self.mode != SPIN and due_ms >= self.min_sleep_ms:
+            self._sleep(due_ms)
+            self.wakes += 1
+        self._wake = time.ticks_us()
+        self.idle_us += time.ticks_diff(self._wake, now)
+
+    def report_due(self):
+        """Returns True once per report_interval_ms, closing the window and updating `duty`."""
+        if time.ticks_diff(self._wake, self._window_start) < self.report_interval_ms * 1000:
+            return False
+        total = self.busy_us + self.idle_us
+        self.duty = self.busy_us / total if total else 1.0
+        return True
+
+    def reset(self):
+        """Starts a new duty cycle window."""
+        self.busy_us = self.idle_us = self.wakes = 0
+        self._window_start = self._wake
+
+    def current_ma(self, duty=None):
+        """Mean MCU current in mA at duty (the measured one by default)."""
+        duty = self.duty if duty is None else duty
+        return duty * ACTIVE_MA + (1 - duty) * IDLE_MA[self.mode]
+
+    def battery_hours(self, capacity_mah, other_ma=0, duty=None):
+        """Forecast of the hours a battery of capacity_mah lasts, other_ma being the draw of everything else."""
+        return capacity_mah / (self.current_ma(duty) + other_ma)
+
+
+def main():
+    """MCU current and battery life of a 2000 mAh battery per mode over a range of duty cycles."""
+    print(f'{"duty":>6} ' + ' '.join(f'{mode:>16}' for mode in IDLE_MA))
+    for duty in (1.0, 0.5, 0.2, 0.1, 0.05, 0.01):
+        cells = []
+        for mode in IDLE_MA:
+            idle = Idle.__new__(Idle)
+            idle.mode, idle.duty = mode, duty
+            cells.append(f'{idle.current_ma():5.1f} mA {idle.battery_hours(2000):5.0f} h')
+        print(f'{duty:6.0%} ' + ' '.join(f'{cell:>16}' for cell in cells))
+
+
+if __name__ == '__main__':
+    main()
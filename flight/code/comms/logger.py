@@ -0,0 +1,222 @@
+import os
+import time
+
+from code.comms.events import TEXT, format_event, pack_event, pack_header
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+
+class _NoLock:
+    """Stands in for a _thread lock while only one core logs."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class Logger:
+    """Buffered event logger for logs.log.
+
+    Lines are kept in a fixed size RAM buffer and written to the file in one open/close per flush, instead
+    of one per event. Identical warnings and errors repeated within `repeat_interval_ms` are counted rather
+    than written, the count is appended to the next line that gets through.
+
+    Structured events (see code.comms.events) are logged with `event`. In binary mode, which is opt-in with
+    `use_binary`, they are stored as packed records instead of text lines, `tuppersat.tools.logdecode` turns
+    them back into text. Every record carries the mission time: events the one they are logged with, text
+    lines the time of `clock`, which R2D1 points at its own mission clock.
+
+    When both cores log (tuppersat.dual_core), `use_lock` guards the buffer and the file with a lock.
+
+    Args:
+        filename (str, optional): File the lines are appended to. Defaults to 'data/logs.log'.
+        capacity (int, optional): Number of lines buffered before a flush is forced. Defaults to 64.
+        flush_interval_ms (int, optional): Interval for `maybe_flush`. Defaults to 5000.
+        repeat_interval_ms (int, optional): Window in which repeated identical errors are suppressed. Defaults to 10000.
+        level (int, optional): Lines below this severity are discarded. Defaults to INFO.
+        binary (bool, optional): Store packed binary records instead of text lines. Defaults to False.
+    """
+
+    def __init__(self, filename='data/logs.log', capacity=64, flush_interval_ms=5000, repeat_interval_ms=10000,
+                 level=INFO, binary=False):
+        self.filename = filename
+        self.binary = binary
+        self.capacity = capacity
+        self.flush_interval_ms = flush_interval_ms
+        self.repeat_interval_ms = repeat_interval_ms
+        self.level = level
+        self._lines = [None] * capacity
+        self._head = 0
+        self._count = 0
+        self._start = self._last_flush = time.ticks_ms()
+        # message -> [ticks when last written, times suppressed since]
+        self._repeats = {}
+        self.written = 0
+        self.suppressed = 0
+        self.dropped = 0
+        self._lock = _NoLock()
+        # mission time in s for the binary text records, until it is set the s since the logger was created
+        self.clock = self._uptime
+
+    def _uptime(self):
+        return time.ticks_diff(time.ticks_ms(), self._start) / 1000
+
+    def use_lock(self):
+        """Guards the logger with a _thread lock, for logging from both cores."""
+        import _thread
+        self._lock = _thread.allocate_lock()
+
+    def log(self, level, message):
+        """Buffers message if it passes the level and repeat filters."""
+        if level < self.level:
+            return
+        with self._lock:
+            self._log(level, message)
+
+    def _log(self, level, message):
+        if level >= WARNING:
+            now = time.ticks_ms()
+            key = message
+            repeat = self._repeats.get(key)
+            if repeat and time.ticks_diff(now, repeat[0]) < self.repeat_interval_ms:
+                repeat[1] += 1
+                self.suppressed += 1
+                return
+            if repeat and repeat[1]:
+                message = f'{message.rstrip()} (repeated {repeat[1]} times)\n'
+            if len(self._repeats) >= self.capacity:
+                self._repeats = {}
+            self._repeats[key] = [now, 0]
+        if self.binary:
+            message = pack_event(TEXT, round(self.clock() * 1000), (message,))
+        self._append_unlocked(message)
+
+    def event(self, event_id, t, *args, level=INFO):
+        """
+        Logs a structured event.
+
+        Args:
+            event_id (int): One of the ids in code.comms.events.
+            t (float): Mission time in seconds.
+            *args: The event's arguments, in the order of its argument names.
+            level (int, optional): Severity. Defaults to INFO.
+        """
+        if level < self.level:
+            return
+        if self.binary:
+            self._append(pack_event(event_id, round(t * 1000), args))
+        else:
+            self._append(format_event(event_id, t, args))
+
+    def use_binary(self, filename='data/logs.bin'):
+        """Switches to the binary format, writing to filename."""
+        with self._lock:
+            self._flush()
+            self.binary = True
+            self.filename = filename
+
+    def _append(self, line):
+        with self._lock:
+            self._append_unlocked(line)
+
+    def _append_unlocked(self, line):
+        if self._count == self.capacity:
+            self._flush()
+        if self._count == self.capacity:
+            # the flush failed, overwrite the oldest line
+            self._head = (self._head + 1) % self.capacity
+            self._count -= 1
+            self.dropped += 1
+        self._lines[(self._head + self._count) % self.capacity] = line
+        self._count += 1
+
+    def debug(self, message):
+        self.log(DEBUG, message)
+
+    def info(self, message):
+        self.log(INFO, message)
+
+    def warning(self, message):
+        self.log(WARNING, message)
+
+    def error(self, message):
+        self.log(ERROR, message)
+
+    def write(self, message):
+        """File-like alias for info, so the logger can be passed where `logs.write` was."""
+        self.log(INFO, message)
+
+    def maybe_flush(self):
+        """Flushes if flush_interval_ms has passed since the last flush."""
+        if time.ticks_diff(time.ticks_ms(), self._last_flush) >= self.flush_interval_ms:
+            self.flush()
+
+    def next_flush_ms(self, now=None):
+        """Returns the ms until maybe_flush flushes."""
+        if now is None:
+            now = time.ticks_ms()
+        return max(0, self.flush_interval_ms - time.ticks_diff(now, self._last_flush))
+
+    def flush(self):
+        """Writes every buffered line with a single open of the log file."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.ticks_ms()
+        if not self._count:
+            return
+        try:
+            if self.binary and self._is_new_file():
+                with open(self.filename, 'wb') as logs:
+                    logs.write(pack_header())
+            with open(self.filename, 'ab' if self.binary else 'a') as logs:
+                for i in range(self._count):
+                    logs.write(self._lines[(self._head + i) % self.capacity])
+        except OSError:
+            return
+        self.written += self._count
+        for i in range(self.capacity):
+            self._lines[i] = None
+        self._head = self._count = 0
+
+    def _is_new_file(self):
+        try:
+            return os.stat(self.filename)[6] == 0
+        except OSError:
+            return True
+
+
+# shared by every module that is not handed its own logger
+default_logger = Logger()
+
+
+def main():
+    """Compares sustained throughput of one open per event against the buffered logger."""
+    events = 500
+    filename = 'data/logs_benchmark.log'
+
+    start = time.ticks_ms()
+    for i in range(events):
+        with open(filename, 'a') as logs:
+            logs.write(f'ERROR > READ > PRESSURE > [Errno 5] EIO {i}\n')
+    unbuffered = time.ticks_diff(time.ticks_ms(), start)
+
+    logger = Logger(filename)
+    start = time.ticks_ms()
+    for i in range(events):
+        logger.error(f'ERROR > READ > PRESSURE > [Errno 5] EIO {i}\n')
+    logger.flush()
+    buffered = time.ticks_diff(time.ticks_ms(), start)
+
+    print(f'unbuffered : {events} events in {unbuffered} ms')
+    print(f'buffered   : {events} events in {buffered} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,65 +1,113 @@
 from ucollections import namedtuple
 from code.comms.time_keeper import time_since_epoch
 import time
+from tuppersat.schema import GROUPS, INTEGER_TYPES, field_names, storage_fields
 
 Time = namedtuple('Time', 'hour minute second microsecond')
 
-def generated_to_required(timer, group, packet, client_specified_format):
+# order of the values stored per group, from the group schemas
+PACKET_ORDER = {group: list(field_names(group)) for group in GROUPS}
+
+# fields of the data group summarised by the 'R2D1_STATS' packet variant
+DATA_STAT_FIELDS = ('altitude', 'uva', 'uvb', 'humidity', 'temperature')
+
+def _term(field, index):
+    """Source expression of a schema field, reading the record values `v`."""
+    name, source, field_type, scale, digits, packet = field
+    term = f'v[{index[source]}]'
+    if scale != 1:
+        term = f'{term} / {scale}'
+    if field_type in INTEGER_TYPES:
+        return f'int({term})'
+    if digits is not None:
+        return f'round({term}, {digits})'
+    return term
+
+def _compile(name, body):
+    """Compiles `def name(v): return body` once, the encoders are called every cycle."""
+    source = f'def {name}(v):\n    return {body}\n'
+    namespace = {'hhmmss_to_time': hhmmss_to_time}
+    exec(source, namespace)
+    return namespace[name]
+
+def compile_row(group, record):
     """
-    Converts a packet generated by a sensor device to a format required by a client.
+    Generates the encoder of a group's stored row from its schema.
+
+    The record offsets of every field are resolved here, the returned function only indexes the values.
+    A record without one of the schema's sources fails here, at startup, with a KeyError.
+
+    Args:
+    group (str): The schema of the row, a key of tuppersat.schema.GROUPS.
+    record (SampleRecord): The record the encoder will read.
+
+    Returns:
+    function: encoder(values) -> tuple of the values in the order of PACKET_ORDER[group].
+    """
+    terms = [_term(field, record.index) for field in GROUPS[group]]
+    return _compile('row', '(' + ', '.join(terms) + ',)')
+
+def compile_text(group, record):
+    """
+    Generates the encoder of a group's CSV line, the fields in the order of tuppersat.schema.csv_header.
+
+    Returns:
+    function: encoder(values) -> str of the comma separated values, without the store count.
+    """
+    terms = [_term(field, record.index) for field in GROUPS[group]]
+    template = ','.join('{}' for term in terms)
+    return _compile('text', repr(template) + '.format(' + ', '.join(terms) + ')')
+
+def compile_telemetry(record):
+    """
+    Generates the encoder of the TupperSatRadio.send_telemetry keyword arguments.
+
+    Returns:
+    function: encoder(values) -> dict of the TelemetryPacket fields.
+    """
+    items = []
+    for field in GROUPS['telemetry']:
+        if field[5] is None:
+            continue
+        if field[5][1] == 'time':
+            term = f'hhmmss_to_time(v[{record.index[field[1]]}])'
+        else:
+            term = _term(field, record.index)
+        items.append(repr(field[0]) + ': ' + term)
+    return _compile('telemetry', '{' + ', '.join(items) + '}')
+
+def compile_select(record, names):
+    """
+    Generates a function returning the values of names from the record values.
+
+    Returns:
+    function: select(values) -> tuple in the order of names.
+    """
+    return _compile('select', '(' + ''.join(f'v[{i}], ' for i in record.offsets(names)) + ')')
+
+def compile_packet(group, record, client_specified_format):
+    """
+    Generates the converter of a group's records to the format required by a client.
+
+    The format is resolved once here instead of for every packet.
 
     Args:
-        time (float): The timestamp of the packet.
         group (str): The group identifier of the sensor device.
-        packet (Packet): The packet generated by the sensor device.
-        client_specified_format (str): The format specified by the client, either 'ucd' or 'r2d1'.
+        record (SampleRecord): The record filled by the group's sensors.
+        client_specified_format (str): The format specified by the client, 'ucd', 'r2d1' or 'r2d1_stats'.
 
     Returns:
-        Union[Packet, Dict[str, Any], Tuple[float, str, float, float, float, float, float]]: The converted packet in the format specified by the client.
-        If the client format is 'ucd', a dictionary with the following keys:
-            - 'hhmmss': The time of day in HHMMSS format.
-            - 'latitude': The latitude of the sensor device.
-            - 'longitude': The longitude of the sensor device.
-            - 'hdop': The horizontal dilution of precision of the GPS measurement.
-            - 'altitude': The altitude of the sensor device.
-            - 't_internal': The internal temperature of the sensor device.
-            - 't_external': The external temperature of the sensor device.
-            - 'pressure': The atmospheric pressure measured by the sensor device.
-        If the client format is 'r2d1', a tuple with the following values:
-            - The timestamp of the packet, rounded to 2 decimal places.
-            - The time of day in HHMMSS format.
-            - The altitude of the sensor device.
-            - The UVA radiation measured by the sensor device.
-            - The UVB radiation measured by the sensor device.
-            - The relative humidity measured by the sensor device.
-            - The temperature measured by the humidity sensor of the device.
-        If the client format is neither 'ucd' nor 'r2d1', the original packet is returned.
-    """
-    if client_specified_format.lower() == 'ucd':
-        
-        _pack = {
-            'hhmmss': [parse_time(packet.gps.get('hhmmss'))][0],
-            'latitude': [packet.gps.get('latitude')][0],
-            'longitude': [packet.gps.get('longitude')][0],
-            'hdop': [float(packet.gps.get('hdop'))][0],
-            'altitude': [float(packet.gps.get('altitude'))][0],
-            't_internal': [packet.temperature.get('temperature')[0]][0],
-            't_external': [packet.temperature.get('temperature')[-1]][0],
-            'pressure': [packet.pressure.get('pressure')/100][0],
-            }
-    
-    elif client_specified_format.lower() == 'r2d1':
-        _pack = [(round(timer, 2),
-                    int(float(packet.gps.get('hhmmss'))),
-                    float(packet.gps.get('altitude')),
-                    packet.uv.get('uva'),
-                    packet.uv.get('uvb'),
-                    packet.humidity.get('humidity'),
-                    packet.humidity.get('temperature'))][0]
-    else:
-        _pack = packet
-    
-    return _pack
+        function: encoder(values) returning
+        - for 'ucd', the TelemetryPacket fields of the telemetry schema as a dictionary,
+        - for 'r2d1' and 'r2d1_stats', a tuple of the data schema,
+        - otherwise a copy of the record values, the record being refilled every cycle.
+    """
+    _format = (client_specified_format or '').lower()
+    if _format == 'ucd':
+        return compile_telemetry(record)
+    if _format in ('r2d1', 'r2d1_stats'):
+        return compile_row('data', record)
+    return tuple
 
 def put_in_dict(group, packet):
     """
@@ -115,54 +163,33 @@ def fix_time(time_named_tuple):
     """
     return int(''.join((str(i) for i in tuple(time_named_tuple)))[:-1])
 
-def package_it(timer, group, packet, packet_order=None, delimiter=','):
+def package_stats(timer, hhmmss, stats, precision=3):
     """
-    Package a dictionary of data with a specified order of keys into a delimited string.
+    Package the window statistics of a group into the 'R2D1_STATS' data packet.
 
     Args:
-    group (str): A string indicating the group of data (e.g. "telemetry", "data").
-    packet (dict): A dictionary containing the data to be packaged.
-    packet_order (dict, optional): A dictionary specifying the order of keys to package the data. Defaults to None.
-    delimiter (str, optional): The delimiter to use between each value. Defaults to '/'.
+    timer (float): The mission time of the packet.
+    hhmmss (str): The GPS time of the last sample in the window.
+    stats (WindowStats): The statistics of the transmit window.
+    precision (int, optional): Decimal places of the statistics. Defaults to 3.
 
     Returns:
-    str: A delimited string of the data in the specified order.
-
+    str: (time, hhmmss, count, mean, std, min, max for each field in stats.fields)
     """
-    if packet_order is None:
-        packet_order = {
-            'telemetry': ['hhmmss', 'latitude', 'longitude', 'hdop', 'altitude', 't_internal', 't_external', 'pressure', 'temperature_from_pressure'],
-        }
-    if group == 'telemetry':
-        _pack = {
-            'hhmmss': [int(float(packet.gps.get('hhmmss')))][0],
-            'latitude': [packet.gps.get('latitude')][0],
-            'longitude': [packet.gps.get('longitude')][0],
-            'hdop': [float(packet.gps.get('hdop'))][0],
-            'altitude': [float(packet.gps.get('altitude'))][0],
-            't_internal': [packet.temperature.get('temperature')[0]][0],
-            't_external': [packet.temperature.get('temperature')[-1]][0],
-            'pressure': [packet.pressure.get('pressure')/100][0],
-            'temperature_from_pressure': [packet.pressure.get('temperature')][0],
-            }
-        # time = packet['hhmmss']
-        # _temp['hhmmss'] = fix_time(_time)
-        return (delimiter.join(str(_pack[order]) for order in packet_order.get(group)))
-    elif group == 'data':
-        _pack = [(round(timer, 2),
-                    int(float(packet.gps.get('hhmmss'))),
-                    float(packet.gps.get('altitude')),
-                    packet.uv.get('uva'),
-                    packet.uv.get('uvb'),
-                    packet.humidity.get('humidity'),
-                    packet.humidity.get('temperature'))][0]
-        packet = str(_pack).strip('[]').strip('()')
-        return packet
+    _pack = [round(timer, 2), int(float(hhmmss)), stats.count]
+    for field_stats in stats.summary():
+        _pack.extend(round(value, precision) for value in field_stats)
+    return str(tuple(_pack))
 
 def chunk(string, n):
     """Break a string into chunks of length n."""
     return (string[i:i+n] for i in range(0, len(string), n))
 
+def hhmmss_to_time(hhmmss):
+    """Split a numeric HHMMSS.SS time into a Time object."""
+    _hhmmss = int(hhmmss)
+    return Time(_hhmmss // 10000, _hhmmss // 100 % 100, _hhmmss % 100, int((hhmmss - _hhmmss) * 1000000))
+
 def parse_time(time_str):
     """Parse a time string HHMMSS.SSS into a Time object."""
 
@@ -178,29 +205,19 @@ def parse_time(time_str):
     return Time(_hh, _mm, _ss, _us)
 
 def main():
-    dp = {'data':{
-        'hhmmss': [120000, 120000, 120000, 120000, 120000],
-        'altitude': [12000, 12000, 12000, 12000, 12000],
-        'uva': [12000, 12000, 12000, 12000, 12000],
-        'uvb': [12000, 12000, 12000, 12000, 12000],
-        'humidity': [12000, 12000, 12000, 12000, 12000],
-        'temperature': [12000, 12000, 12000, 12000, 12000],
-        },
-          'telemetry':{
-                'hhmmss': 120000,
-                'latitude': 120000,
-                'longitude': 120000,
-                'hdop': 120000,
-                'altitude': 120000,
-                't_internal': 120000,
-                't_external': 120000,
-                'pressure': 120000,
-        }
+    from code.comms.sample_record import SampleRecord
+    record = SampleRecord(('time', 't_internal', 't_external', 'pressure', 'temperature_from_pressure',
+                           'hhmmss', 'latitude', 'longitude', 'hdop', 'altitude', 'gps_valid', 'gps_age'))
+    for i, value in enumerate((12.345, 21.5, -40.25, 101325.0, 2150.0, 120000.0, 53.3, -6.2, 0.92, 1234.5, 1.0, 0.4)):
+        record.values[i] = value
+    return {
+        'row': compile_row('telemetry', record)(record.values),
+        'text': compile_text('telemetry', record)(record.values),
+        'telemetry': compile_telemetry(record)(record.values),
     }
-    return package_it(**dp)
 
 if __name__ == '__main__':
-    print(len(main()['data']))
+    print(main())
     # main()
     pass
 
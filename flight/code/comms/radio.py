@@ -10,7 +10,7 @@ from tuppersat.radio import TupperSatRadio
 
 class Radio:
 
-    def __init__(self, uart_id=1, tx_pin=4, rx_pin=5, t3_baudrate=38400, add=0x15, call='R2D1'):
+    def __init__(self, uart_id=1, tx_pin=4, rx_pin=5, t3_baudrate=38400, add=0x15, call='R2D1', queued=True):
         """
         Initializes a new Radio object.
 
@@ -21,6 +21,8 @@ class Radio:
             t3_baudrate (int): The baudrate for the radio. Default is 38400.
             add (int): The radio address. Default is 0x15.
             call (str): The radio call sign. Default is 'R2D1'.
+            queued (bool): Queue the frames and write them a FIFO chunk at a time from RHSerialRadio.service
+                instead of blocking in send. Default is True.
         """
         self.radio = None
         self.uart_id = uart_id
@@ -29,6 +31,7 @@ class Radio:
         self.t3_baudrate = t3_baudrate
         self.add = add
         self.call = call
+        self.queued = queued
 
     def setup(self):
         """
@@ -42,7 +45,7 @@ class Radio:
         """
         try:
             uart = UART(self.uart_id, baudrate=self.t3_baudrate, tx=Pin(self.tx_pin), rx=Pin(self.rx_pin))
-            self.radio = TupperSatRadio(uart, self.add, self.call)
+            self.radio = TupperSatRadio(uart, self.add, self.call, queued=self.queued)
             return self.radio
         except:
             print('radio fail') #TODO write an proper exception
@@ -0,0 +1,81 @@
+from array import array
+
+
+class SampleRecord:
+    """Fixed schema sample of one group, the values kept in a single typed array that is filled in place.
+
+    The schema is compiled once in R2D1.init_packet from the sensors of the group: 'time' followed by the
+    FIELDS of every sensor, each sensor writing its values at its own offset with `read_into`. The record is
+    reused every cycle, so anything kept beyond the cycle has to be copied out (see packets.packet_values).
+
+    Args:
+        fields (list): Field names in order.
+        sensor_offsets (list, optional): Offset of every sensor's first field, in sensor order.
+    """
+
+    def __init__(self, fields, sensor_offsets=None):
+        self.fields = tuple(fields)
+        self.index = {name: i for i, name in enumerate(self.fields)}
+        if len(self.index) != len(self.fields):
+            raise ValueError(f'Duplicate field in {self.fields}')
+        self.values = array('d', [0.0] * len(self.fields))
+        self.sensor_offsets = sensor_offsets or []
+        # set by R2D1.sample when a sensor of the group delivered a new sample, only then is it stored and sent
+        self.fresh = False
+
+    def get(self, name):
+        return self.values[self.index[name]]
+
+    def offsets(self, names):
+        """Returns the offsets of names, to be looked up once and reused."""
+        return [self.index[name] for name in names]
+
+
+def compile_record(sensors, leading=('time',)):
+    """Builds the SampleRecord of a group from the FIELDS of its sensors."""
+    fields = list(leading)
+    sensor_offsets = []
+    for sensor in sensors:
+        sensor_offsets.append(len(fields))
+        fields.extend(sensor.FIELDS)
+    return SampleRecord(fields, sensor_offsets)
+
+
+def main():
+    """Heap allocated per R2D1.sample cycle, with gc.mem_alloc on MicroPython.
+
+    Runs the real sampling path, Sampler.poll, Subscription.read_into and the drivers' read_into, with only
+    the I2C reads of the UV and humidity drivers replaced by fixed readings. Both are due on every cycle.
+    """
+    import gc
+    from code.sensors.sampler import Sampled
+    from code.sensors.uv import UV
+    from code.sensors.humidity import Humidity
+    from tuppersat.r2d1 import R2D1
+
+    class BenchUV(UV):
+        def read(self):
+            return {'uva': 1.5, 'uvb': 2.5}
+
+    class BenchHumidity(Humidity):
+        def read(self):
+            return {'humidity': 40.0, 'temperature': 21.5}
+
+    uv = Sampled(BenchUV(), rate=1000)
+    humidity = Sampled(BenchHumidity(), rate=1000)
+    sensors = [uv.subscribe(), humidity.subscribe()]
+    r2d1 = R2D1(data={'sensors': sensors})
+    records = {'data': compile_record(sensors)}
+    r2d1.sample(records)
+    cycles = 100
+    gc.collect()
+    before = gc.mem_alloc()
+    reads = 0
+    for i in range(cycles):
+        reads += r2d1.sample(records)
+    allocated = gc.mem_alloc() - before
+    print(f'{allocated / cycles} bytes per cycle, {reads / cycles} sensor reads per cycle')
+
+
+if __name__ == '__main__':
+    main()
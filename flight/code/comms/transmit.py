@@ -1,4 +1,24 @@
-def transmit(radio, timer, group, packet, logger, packet_count, packet_rate):
+from code.comms.events import TRANSMIT
+from tuppersat.radio._packet_utils import TELEMETRY_LAYOUT
+
+# RHSerial start, header, end and checksum bytes around every packet, DLE stuffing aside
+FRAME_OVERHEAD = 10
+# 'T|' and the fixed width telemetry fields between '|'
+TELEMETRY_BYTES = 2 + sum(width for name, width, fmt_spec in TELEMETRY_LAYOUT) + len(TELEMETRY_LAYOUT) - 1
+# 'D|', the 8 character callsign and '|'
+DATA_HEADER_BYTES = 11
+# sequence tags wrap like the 5 digit telemetry index they are sent as
+TAG_MODULO = 100000
+
+
+def frame_bytes(group, packet, tag):
+    """Returns the radio frame length of a packet queued for transmit, as the transmit budget counts it."""
+    if group == 'telemetry':
+        return TELEMETRY_BYTES + FRAME_OVERHEAD
+    return DATA_HEADER_BYTES + len(str(tag)) + len(packet) + FRAME_OVERHEAD
+
+
+def transmit(radio, timer, group, packet, logger, packet_count, packet_rate, event_logger=None, on_sent=None, tag=None):
     """
     Transmit a packet via the radio.
 
@@ -10,6 +30,9 @@ def transmit(radio, timer, group, packet, logger, packet_count, packet_rate):
     - logger (Callable): A function that logs the transmission details.
     - packet_count (int): An integer representing the total number of packets transmitted.
     - packet_rate (float): A float representing the packet transmission rate.
+    - event_logger (Logger, optional): If given, the transmission is logged as a structured TRANSMIT event instead of through `logger`.
+    - on_sent (Callable, optional): Called with (msgid, frame length, latency in ms) once the frame is written to the UART.
+    - tag (int, optional): Sequence tag of the frame, sent as the telemetry index or the data prefix. Defaults to the radio's telemetry count and `packet_count`.
 
     Returns:
     - None: The function does not return anything, but instead sends the packet via the radio and logs the transmission details using the provided logger function.
@@ -30,10 +53,13 @@ def transmit(radio, timer, group, packet, logger, packet_count, packet_rate):
     """
 
     if group == 'telemetry':
-        radio.send_telemetry(**packet)
+        radio.send_telemetry(on_sent=on_sent, index=tag, **packet)
     elif group == 'data':
-        _packet = str(packet_count) + packet
-        radio.send_data(bytearray(_packet.encode('ascii')))
+        _packet = str(packet_count if tag is None else tag) + packet
+        radio.send_data(bytearray(_packet.encode('ascii')), on_sent)
     else:
         logger(f'wut? - {packet} - {group}')
+    if event_logger:
+        event_logger.event(TRANSMIT, timer, group.upper(), packet_count, packet_rate)
+        return
     logger(f'{timer:9} > TRANSMIT > {group.upper():9} > Packet Count - {packet_count} > Packet Rate - {packet_rate}\n')
\ No newline at end of file
@@ -0,0 +1,129 @@
+class TransmitQueue:
+    """Bounded queue of outgoing frames ordered by group priority and deadline.
+
+    Frames are sent lowest priority value first and, within a priority, freshest first. Frames identical to
+    the last one queued for their group are suppressed, when the queue is full the oldest frame (of the same
+    group if it has any queued) is evicted,
+    and frames past their deadline are dropped instead of being sent.
+
+    Frames carry no sequence tag, the caller numbers them as they are taken for transmit, so frames evicted
+    or expired here never leave a gap in the tags the ground counts as link loss.
+
+    Args:
+        maxlen (int, optional): Maximum number of queued frames. Defaults to 8.
+    """
+
+    def __init__(self, maxlen=8):
+        self.maxlen = maxlen
+        # frames are [priority, deadline, sample_time, group, packet]
+        self.frames = []
+        self._last_pushed = {}
+        self.pushed = 0
+        self.sent = 0
+        self.duplicates = 0
+        self.evicted = 0
+        self.expired = 0
+        self.last_latency = 0
+        self.max_latency = 0
+        self._total_latency = 0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def pending(self, group):
+        """Returns True if a frame of group is queued."""
+        for frame in self.frames:
+            if frame[3] == group:
+                return True
+        return False
+
+    def push(self, group, packet, sample_time, deadline, priority=0):
+        """
+        Queues a frame.
+
+        Args:
+            group (str): Group the frame belongs to.
+            packet (dict or str): The packet as passed to transmit.
+            sample_time (float): Mission time the packet was sampled at.
+            deadline (float): Mission time after which the frame is too stale to send.
+            priority (int, optional): Lower is sent first. Defaults to 0.
+
+        Returns:
+            bool: False if the frame was suppressed as a duplicate.
+        """
+        if self._last_pushed.get(group) == packet:
+            self.duplicates += 1
+            return False
+        self._last_pushed[group] = packet
+        if len(self.frames) >= self.maxlen:
+            # evict within the same group first so a fast group cannot push out a slow group's frames
+            same_group = [frame for frame in self.frames if frame[3] == group]
+            oldest = min(same_group or self.frames, key=lambda frame: frame[2])
+            self.frames.remove(oldest)
+            self.evicted += 1
+        self.frames.append([priority, deadline, sample_time, group, packet])
+        self.pushed += 1
+        return True
+
+    def drop_expired(self, now):
+        """Removes frames whose deadline has passed."""
+        fresh = [frame for frame in self.frames if frame[1] >= now]
+        self.expired += len(self.frames) - len(fresh)
+        self.frames = fresh
+
+    def peek(self, now, group=None):
+        """
+        Returns the most urgent frame without taking it off the queue.
+
+        Args:
+            now (float): Current mission time.
+            group (str, optional): Only consider frames of this group. Defaults to None.
+
+        Returns:
+            list: The frame, [priority, deadline, sample_time, group, packet], or None if there is nothing fresh
+            to send.
+        """
+        self.drop_expired(now)
+        candidates = [frame for frame in self.frames if group is None or frame[3] == group]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda frame: (frame[0], -frame[2]))
+
+    def take(self, frame, now):
+        """Takes a frame returned by `peek` off the queue and records its latency. Returns (group, packet)."""
+        self.frames.remove(frame)
+        self.sent += 1
+        self.last_latency = now - frame[2]
+        self.max_latency = max(self.max_latency, self.last_latency)
+        self._total_latency += self.last_latency
+        return frame[3], frame[4]
+
+    def pop(self, now, group=None):
+        """
+        Takes the most urgent frame off the queue and records its latency.
+
+        Args:
+            now (float): Current mission time.
+            group (str, optional): Only consider frames of this group. Defaults to None.
+
+        Returns:
+            tuple: (group, packet) or None if there is nothing fresh to send.
+        """
+        frame = self.peek(now, group)
+        if frame is None:
+            return None
+        return self.take(frame, now)
+
+    def stats(self):
+        """Returns the queue counters as a dictionary."""
+        return {
+            'depth': len(self.frames),
+            'pushed': self.pushed,
+            'sent': self.sent,
+            'duplicates': self.duplicates,
+            'evicted': self.evicted,
+            'expired': self.expired,
+            'last_latency': round(self.last_latency, 2),
+            'max_latency': round(self.max_latency, 2),
+            'mean_latency': round(self._total_latency / self.sent, 2) if self.sent else 0,
+        }
@@ -0,0 +1,51 @@
+from array import array
+from math import sqrt
+
+
+class WindowStats:
+    """Streaming count, mean, standard deviation, min and max per field over a transmit window.
+
+    Uses Welford's algorithm on preallocated arrays, so memory stays fixed however many samples a window
+    summarises.
+
+    Args:
+        fields (tuple): Field names, `update` takes the values in the same order.
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        size = len(self.fields)
+        self.count = 0
+        self.mean = array('f', [0] * size)
+        self.m2 = array('f', [0] * size)
+        self.min = array('f', [0] * size)
+        self.max = array('f', [0] * size)
+
+    def reset(self):
+        """Starts a new window without reallocating the accumulators."""
+        self.count = 0
+        for i in range(len(self.fields)):
+            self.mean[i] = self.m2[i] = self.min[i] = self.max[i] = 0
+
+    def update(self, values):
+        """Adds one sample, values must be in the order of self.fields."""
+        self.count += 1
+        count = self.count
+        for i, value in enumerate(values):
+            delta = value - self.mean[i]
+            self.mean[i] += delta / count
+            self.m2[i] += delta * (value - self.mean[i])
+            if count == 1 or value < self.min[i]:
+                self.min[i] = value
+            if count == 1 or value > self.max[i]:
+                self.max[i] = value
+
+    def std(self, i):
+        """Sample standard deviation of field i."""
+        if self.count < 2:
+            return 0.0
+        return sqrt(self.m2[i] / (self.count - 1))
+
+    def summary(self):
+        """Returns a (mean, std, min, max) tuple per field."""
+        return [(self.mean[i], self.std(i), self.min[i], self.max[i]) for i in range(len(self.fields))]
@@ -1,11 +1,26 @@
+import os
+
+
+def write_header_line(filename, line):
+    """Writes line as the first line of a text file if it does not exist yet or is empty, so reboots keep appending rows."""
+    try:
+        if os.stat(filename)[6] > 0:
+            return
+    except OSError:
+        pass
+    with open(filename, 'w') as file:
+        file.write(f'{line}\n')
+
+
 class MultiFileWriter:
-    def __init__(self, filenames, write_type='a'):
+    def __init__(self, filenames, write_type='a', binary_extension='.bin'):
         """
         Initializes a MultiFileWriter object.
 
         Args:
             filenames (list): A list of filenames to open for writing.
             write_type (str): The write mode to use. Default is 'a' for appending to the files.
+            binary_extension (str): Files with this extension are opened in binary mode. Default is '.bin'.
 
         Attributes:
             filenames (list): A list of filenames to open for writing.
@@ -17,6 +32,7 @@ class MultiFileWriter:
         """
         self.filenames = filenames
         self.write_type = write_type
+        self.binary_extension = binary_extension
         self.files = {}
 
     def __enter__(self):
@@ -33,7 +49,8 @@ class MultiFileWriter:
             None.
         """
         for filename in self.filenames:
-            self.files[filename.split('.')[0].split('/')[-1]] = open(filename, self.write_type)
+            mode = self.write_type + 'b' if filename.endswith(self.binary_extension) else self.write_type
+            self.files[filename.split('.')[0].split('/')[-1]] = open(filename, mode)
         return self.files
 
     def __exit__(self, exc_type, exc_val, exc_tb):
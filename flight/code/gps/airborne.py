@@ -17,6 +17,11 @@ To use, include something like the following in your code:
 >>> uart = UART(0, 9600, tx_pin=Pin(4), rx_pin=Pin(5))
 >>> set_airborne_mode(uart)
 
+set_airborne_mode blocks for a bounded time and returns False if the GPS does
+not answer. To configure in the background instead, create an
+AirborneConfigurator and call its step() from the main loop until it returns
+DONE or FAILED.
+
 The message formats are described under CFG-NAV5 in "u-blox 7 Receiver
 Description" (GPS.G7-SW12001-B1) pg 107
 
@@ -26,34 +31,46 @@ version 2023-04-12: adapted to work with Micropython & Pi Pico
 
 """
 
-import binascii
 import time
+from micropython import const
+
+from code.comms.logger import default_logger, DEBUG
 
-AIRBORNE = 6
+AIRBORNE = const(6)
 
 MODES = ['Portable', None, 'Stationary', 'Pedestrian', 'Automotive', 'Sea', 
          'Airborne < 1g', 'Airborne < 2g','Airborne < 4g']
 
 
-POLLNAV = bytearray([0xB5, 0x62, 0x06, 0x24, 0x00, 0x00])
-SETNAV = bytearray([0xB5, 0x62, 0x06, 0x24, 0x24, 0x00, 0x01, 0x00, 
-                    0x06, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 
-                    0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 
-                    0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 
-                    0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 
-                    0x00, 0x00])
-SAVECONF = bytearray([0xB5, 0x62, 0x06, 0x09, 0x0D, 0x00, 0x00, 0x00,
-                      0x00, 0x00, 0xFF, 0xFF, 0x00, 0x00, 0x00, 0x00,
-                      0x00, 0x00, 0x17])
+# bytes literals stay in flash when the module is frozen, bytearrays would be copied to RAM at import
+POLLNAV = b'\xb5\x62\x06\x24\x00\x00'
+SETNAV = (b'\xb5\x62\x06\x24\x24\x00\x01\x00'
+          b'\x06\x00\x00\x00\x00\x00\x00\x00'
+          b'\x00\x00\x00\x00\x00\x00\x00\x00'
+          b'\x00\x00\x00\x00\x00\x00\x00\x00'
+          b'\x00\x00\x00\x00\x00\x00\x00\x00'
+          b'\x00\x00')
+SAVECONF = (b'\xb5\x62\x06\x09\x0d\x00\x00\x00'
+            b'\x00\x00\xff\xff\x00\x00\x00\x00'
+            b'\x00\x00\x17')
+
+ACKCLASS = b'\x05\x01'
+NAKCLASS = b'\x05\x00'
 
-ACKCLASS = bytearray([0x05, 0x01])
+SYNC1 = const(0xB5)
+SYNC2 = const(0x62)
+
+# transaction and configuration states
+PENDING = const(0)
+DONE = const(1)
+FAILED = const(2)
 
 
 def log_info(msg):
-    with open('data/logs.log', 'a') as logs:
-        logs.write(f"gps_airborne.py : {msg}")
+    default_logger.info(f"gps_airborne.py : {msg}\n")
 
 def bytes_to_hexstring(b, sep=' ', upper=True):
+    import binascii
     _hex = binascii.hexlify(b, sep).decode('ascii')
     if upper:
         return _hex.upper()
@@ -67,9 +84,10 @@ def lowercase_no_whitespace(s):
     """Remove all whitespace from string and make it lowercase"""
     return ''.join(s.split()).lower()
 
+# lowercase_no_whitespace of MODES, written out so nothing is built at import
 MODELS_LOOKUP = {
-    lowercase_no_whitespace(model) : i
-    for i, model in enumerate(MODES) if model
+    'portable': 0, 'stationary': 2, 'pedestrian': 3, 'automotive': 4, 'sea': 5,
+    'airborne<1g': 6, 'airborne<2g': 7, 'airborne<4g': 8,
 }
 
 def lookup_model(model):
@@ -80,7 +98,7 @@ def lookup_model(model):
     return MODELS_LOOKUP[lowercase_no_whitespace(model)]
 
 def setnav(mode):
-    _setnav = SETNAV[:]
+    _setnav = bytearray(SETNAV)
     _setnav[8] = mode
     return _setnav
 
@@ -88,24 +106,102 @@ def setnav(mode):
 # top level interface
 # ****************************************************************************
 
-def set_dynamic_platform_model(port, model):
-    """Choose dynamic platform model for UBLOX7."""
-    # allow string or integer input to specify model
-    mode = lookup_model(model)
-
-    # set the dynamic platform model
-    navMode = poll_gps_nav_mode(port)
+def set_dynamic_platform_model(port, model, retries=3, timeout_ms=1000):
+    """Choose dynamic platform model for UBLOX7, returns True on success.
 
-    while navMode != mode:
-        set_gps_nav_mode(port, mode)
-        navMode = poll_gps_nav_mode(port)
-
-    save_gps_config(port)
+    Blocks until the configuration is done or the retry budget is spent.
+    """
+    return run(AirborneConfigurator(port, model, retries, timeout_ms)) == DONE
 
 def set_airborne_mode(uart):
     """Set the UBLOX7 to airborne mode for operation above 12km."""
     return set_dynamic_platform_model(uart, model=AIRBORNE)
-    
+
+
+class AirborneConfigurator:
+    """Sets the dynamic platform model without blocking, one step per call.
+
+    Polls the nav mode, sets it if it differs, polls again to verify and saves
+    the configuration. Every UBX request is a UBXTransaction with its own retry
+    budget, and setting the mode is tried at most `retries` times, so a missing
+    GPS ends in FAILED instead of hanging.
+
+    Parameters
+    ----------
+    port : machine.UART
+        UART of the GPS.
+    model : int or str
+        Dynamic platform model, see MODES. Defaults to AIRBORNE.
+    retries : int
+        Attempts per request and per mode change.
+    timeout_ms : int
+        Wait for a reply per attempt.
+    save : bool
+        Save the configuration to the GPS once the mode is set.
+    """
+
+    def __init__(self, port, model=AIRBORNE, retries=3, timeout_ms=1000, save=True):
+        self.reader = UBXReader(port)
+        self.mode = lookup_model(model)
+        self.retries = retries
+        self.timeout_ms = timeout_ms
+        self.save = save
+        self.state = PENDING
+        self.nav_mode = None
+        self._stage = 'poll'
+        self._sets = 0
+        self._transaction = None
+
+    def _start(self, stage):
+        self._stage = stage
+        if stage == 'poll':
+            message, poll = POLLNAV, True
+        elif stage == 'set':
+            message, poll = setnav(self.mode), False
+        else:
+            message, poll = SAVECONF, False
+        self._transaction = UBXTransaction(self.reader, message, poll, self.retries, self.timeout_ms)
+
+    def step(self, now=None):
+        """Advances the configuration, returns PENDING, DONE or FAILED."""
+        if self.state != PENDING:
+            return self.state
+        if self._transaction is None:
+            self._start('poll')
+        result = self._transaction.step(now)
+        if result == PENDING:
+            return PENDING
+        if result == FAILED:
+            log_info(f'No reply from the GPS to {self._stage}, giving up')
+            self.state = FAILED
+        elif self._stage == 'poll':
+            self.nav_mode = self._transaction.response[8]
+            log_info('GPS nav mode is {}.'.format(MODES[self.nav_mode]))
+            if self.nav_mode != self.mode:
+                self._sets += 1
+                if self._sets > self.retries:
+                    log_info('GPS did not take nav mode {}, giving up'.format(MODES[self.mode]))
+                    self.state = FAILED
+                else:
+                    self._start('set')
+            elif self.save:
+                self._start('save')
+            else:
+                self.state = DONE
+        elif self._stage == 'set':
+            self._start('poll')
+        else:
+            log_info('GPS configuration saved.')
+            self.state = DONE
+        return self.state
+
+
+def run(task, sleep_ms=10):
+    """Steps a UBXTransaction or AirborneConfigurator until it is DONE or FAILED."""
+    while task.step() == PENDING:
+        time.sleep_ms(sleep_ms)
+    return task.state
+
 
 # ****************************************************************************
 # high level UBLOX tasks
@@ -113,20 +209,20 @@ def set_airborne_mode(uart):
 
 def set_gps_nav_mode(port, mode):
     log_info('Attempting to set GPS mode to {}...'.format(MODES[mode]))
-    ackmessage(setnav(mode), port)
-    log_info('{} sent.'.format(MODES[mode]))
+    acknowledged = ackmessage(setnav(mode), port)
+    log_info('{} {}.'.format(MODES[mode], 'set' if acknowledged else 'not acknowledged'))
+    return acknowledged
 
 def poll_gps_nav_mode(port):
-    log_info('Polling GPS nav mode...')
     modelmessage = ackpoll(POLLNAV, port)
+    if modelmessage is None:
+        return None
     navMode = modelmessage[8]
     log_info('GPS nav mode is {}.'.format(MODES[navMode]))
     return navMode
 
 def save_gps_config(port):
-    log_info('Saving GPS configuration...')
-    ackmessage(SAVECONF, port)
-    log_info('GPS configuration saved.')
+    return ackmessage(SAVECONF, port)
     
 # ****************************************************************************
 # low level UBLOX functions
@@ -158,65 +254,155 @@ def addcheck(msg):
 
 def sendmsg(msg, port):
     _msg = bytes(msg) + b"\r\n"
-    log_info(f"Sending {bytes_to_hexstring(_msg)}")
+    # checked first, the hex string is only built (and binascii imported) when debug lines are kept
+    if default_logger.level <= DEBUG:
+        default_logger.debug(f"gps_airborne.py : Sending {bytes_to_hexstring(_msg)}\n")
     port.write(_msg)
 
 
-def readUBX(port):
-    msgclass = port.read(2)
-    length = port.read(2)
-    lengthnum = length[0] + 256 * length[1]
-    payload = port.read(lengthnum)
-    checksum = port.read(2)
-    fullmsg = bytearray([0xB5, 0x62]) + msgclass + length + payload + checksum
-    if checkmsg(fullmsg):
-        return fullmsg
-    else:
-        return None
+def find_sync(buffer, start, end):
+    """Index of the first 0xB5 0x62 sync in buffer[start:end], -1 if there is none."""
+    for i in range(start, end - 1):
+        if buffer[i] == SYNC1 and buffer[i + 1] == SYNC2:
+            return i
+    return -1
+
+
+class UBXReader:
+    """Collects the GPS UART into a fixed buffer without blocking and returns checked UBX messages.
+
+    Each poll takes whatever the UART holds with one readinto, NMEA text and
+    broken messages in between are skipped.
+    """
+
+    def __init__(self, port, size=512):
+        self.port = port
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.fill = 0
+        self.bytes_read = 0
+
+    def poll(self):
+        """Reads the waiting bytes, returns the next complete message or None."""
+        while self.fill < len(self.buffer) and self.port.any():
+            count = self.port.readinto(self.view[self.fill:])
+            if not count:
+                break
+            self.fill += count
+            self.bytes_read += count
+        return self.next_message()
+
+    def next_message(self):
+        """Returns the next complete message already in the buffer, or None."""
+        buffer = self.buffer
+        start = 0
+        while True:
+            start = find_sync(buffer, start, self.fill)
+            if start < 0:
+                # a trailing 0xB5 may be the first half of the next sync
+                self._discard(self.fill - 1 if self.fill and buffer[self.fill - 1] == SYNC1 else self.fill)
+                return None
+            if self.fill - start < 6:
+                self._discard(start)
+                return None
+            end = start + 8 + (buffer[start + 4] | buffer[start + 5] << 8)
+            if end > len(buffer):
+                # longer than the buffer, a false sync inside NMEA text
+                start += 1
+                continue
+            if end > self.fill:
+                self._discard(start)
+                return None
+            message = bytes(self.view[start:end])
+            if checkmsg(message):
+                self._discard(end)
+                return message
+            start += 1
+
+    def _discard(self, count):
+        if count:
+            self.view[:self.fill - count] = self.view[count:self.fill]
+            self.fill -= count
+
+
+class UBXTransaction:
+    """A UBX request and its acknowledgement, retried without blocking.
+
+    Each attempt sends the request and waits up to `timeout_ms` for ACK-ACK
+    (and, for a poll, the response message first). ACK-NAK or a timeout
+    starts the next attempt, after `retries` attempts the state is FAILED.
+
+    Parameters
+    ----------
+    reader : UBXReader
+    message : bytes
+        Request without checksum.
+    poll : bool
+        Wait for a response of the request's class and id before the ACK.
+    """
+
+    def __init__(self, reader, message, poll=False, retries=3, timeout_ms=1000):
+        self.reader = reader
+        self.message = addcheck(message)
+        self.msgclass = message[2:4]
+        self.poll = poll
+        self.retries = retries
+        self.timeout_ms = timeout_ms
+        self.attempts = 0
+        self.state = PENDING
+        self.response = None
+        self._deadline = None
+
+    def step(self, now=None):
+        """Sends, resends or checks for the reply, returns PENDING, DONE or FAILED."""
+        if self.state != PENDING:
+            return self.state
+        if now is None:
+            now = time.ticks_ms()
+        if self._deadline is None or time.ticks_diff(now, self._deadline) >= 0:
+            if self.attempts >= self.retries:
+                self.state = FAILED
+                return FAILED
+            self.attempts += 1
+            self.response = None
+            sendmsg(self.message, self.reader.port)
+            self._deadline = time.ticks_add(now, self.timeout_ms)
+        message = self.reader.poll()
+        while message and self.state == PENDING:
+            self._handle(message)
+            message = self.reader.next_message()
+        return self.state
+
+    def _handle(self, message):
+        msgclass = message[2:4]
+        if msgclass == ACKCLASS and message[6:8] == self.msgclass:
+            if not self.poll or self.response is not None:
+                self.state = DONE
+        elif msgclass == NAKCLASS and message[6:8] == self.msgclass:
+            # resend on the next step
+            self._deadline = None
+        elif self.poll and msgclass == self.msgclass:
+            self.response = message
 
 
 def waitformsg(port, timeout = 2):
-    prevByte = None
-    starttime = time.time()
-    while (time.time() - starttime) < timeout:
-        received = port.read(1)
-        if received == b'\x62' and prevByte == b'\xb5':
-            return readUBX(port)
-        prevByte = received
-
-    # TODO: remove this log step?
+    """Returns the next UBX message within timeout seconds, or None."""
+    reader = UBXReader(port)
+    deadline = time.ticks_add(time.ticks_ms(), int(timeout * 1000))
+    while time.ticks_diff(deadline, time.ticks_ms()) > 0:
+        message = reader.poll()
+        if message:
+            return message
+        time.sleep_ms(10)
     log_info("Waiting for message -- timeout")
     return None
 
-def ackmessage(msg, port):
-    acknowledged = False
-    while not acknowledged:
-        sendmsg(addcheck(msg), port)
-        ackmsg = waitformsg(port)
-        if ackmsg:
-            msgclass = ackmsg[2:4]
-            if msgclass == ACKCLASS:
-                acknowledged = True	
-
-
-def ackpoll(msg, port):
-    pollclass = msg[2:4]
-    acknowledged = False
-    while not acknowledged:
-        sendmsg(addcheck(msg), port)
-        pollmsg = waitformsg(port)
-        if pollmsg:
-            recvpollclass = pollmsg[2:4]
-            if recvpollclass == pollclass:
-                ackmsg = waitformsg(port)
-                if ackmsg:
-                    msgclass = ackmsg[2:4]
-                    if msgclass == ACKCLASS:
-                        acknowledged = True
-    return pollmsg
-
-
-
-
+def ackmessage(msg, port, retries=3, timeout_ms=1000):
+    """Sends msg until it is acknowledged, returns False once the retries are spent."""
+    return run(UBXTransaction(UBXReader(port), msg, False, retries, timeout_ms)) == DONE
 
 
+def ackpoll(msg, port, retries=3, timeout_ms=1000):
+    """Polls msg's class and id, returns the response or None once the retries are spent."""
+    transaction = UBXTransaction(UBXReader(port), msg, True, retries, timeout_ms)
+    return transaction.response if run(transaction) == DONE else None
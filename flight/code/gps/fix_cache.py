@@ -0,0 +1,79 @@
+import time
+from array import array
+
+# returned until the first fix, marked invalid, with an HDOP that reads as "no fix"
+NO_FIX = {
+    'hhmmss': '000000.00',
+    'latitude': 0.0,
+    'longitude': 0.0,
+    'altitude': 0.0,
+    'hdop': 99.99,
+}
+
+
+class FixCache:
+    """Last known good GPS fix, with its age, a validity flag and an extrapolated altitude.
+
+    The altitudes of the last `history` fixes are kept in a ring buffer. Between fixes the altitude is
+    extrapolated from the ascent rate across the ring, for at most `max_extrapolation_s`, so the packets
+    follow the balloon through short GPS dropouts instead of repeating a frozen or made up value.
+
+    Args:
+        history (int, optional): Fixes in the ascent rate ring buffer. Defaults to 8.
+        stale_s (float, optional): Age after which a fix is reported as not valid. Defaults to 5.
+        max_extrapolation_s (float, optional): Longest extrapolation of the altitude. Defaults to 30.
+    """
+
+    def __init__(self, history=8, stale_s=5, max_extrapolation_s=30):
+        self.stale_ms = int(stale_s * 1000)
+        self.max_extrapolation_ms = int(max_extrapolation_s * 1000)
+        self.fix = None
+        self.fix_ms = None
+        self._ticks = array('i', [0] * history)
+        self._altitudes = array('f', [0] * history)
+        self._head = 0
+        self._count = 0
+
+    def update(self, fix, now=None):
+        """Stores a new valid fix, a dictionary as returned by GPS.build_dictionary."""
+        if now is None:
+            now = time.ticks_ms()
+        self.fix = fix
+        self.fix_ms = now
+        self._ticks[self._head] = now
+        self._altitudes[self._head] = float(fix['altitude'])
+        self._head = (self._head + 1) % len(self._ticks)
+        self._count = min(self._count + 1, len(self._ticks))
+
+    def ascent_rate(self):
+        """Returns the mean ascent rate in m/s across the ring buffer, 0 with fewer than two fixes."""
+        if self._count < 2:
+            return 0.0
+        newest = (self._head - 1) % len(self._ticks)
+        oldest = (self._head - self._count) % len(self._ticks)
+        dt = time.ticks_diff(self._ticks[newest], self._ticks[oldest])
+        if dt <= 0:
+            return 0.0
+        return (self._altitudes[newest] - self._altitudes[oldest]) * 1000 / dt
+
+    def get(self, now=None):
+        """Returns the last fix with 'age' (s, None before the first fix) and 'valid' added.
+
+        The altitude is extrapolated for the age of the fix, 'extrapolated' tells whether it was.
+        """
+        if self.fix is None:
+            result = dict(NO_FIX)
+            result['age'] = None
+            result['valid'] = False
+            result['extrapolated'] = False
+            return result
+        if now is None:
+            now = time.ticks_ms()
+        age_ms = time.ticks_diff(now, self.fix_ms)
+        result = dict(self.fix)
+        result['age'] = age_ms / 1000
+        result['valid'] = age_ms <= self.stale_ms
+        result['extrapolated'] = age_ms > 0 and self._count >= 2
+        if result['extrapolated']:
+            result['altitude'] = float(self.fix['altitude']) + self.ascent_rate() * min(age_ms, self.max_extrapolation_ms) / 1000
+        return result
@@ -1,61 +1,106 @@
 from machine import Pin, UART, SoftI2C
 import utime, time
-from code.gps.airborne import set_airborne_mode
+from code.comms.logger import default_logger
+from code.gps.fix_cache import FixCache
+from tuppersat.gps_parsing import gga_fields, gga_fix, decimal_degree
+
+# wait before the next attempt after a read without a fix, doubled per miss
+BACKOFF_MIN_MS = 250
+BACKOFF_MAX_MS = 8000
 
 class GPS(): 
-    def __init__(self, bus = 0, baudrate = 9600, tx = Pin(12), rx = Pin(13), timeout = 10, timeout_char = 10): 
+    def __init__(self, bus = 0, baudrate = 9600, tx = Pin(12), rx = Pin(13), timeout = 10, timeout_char = 10, logger = None, airborne = False, protocol = 'nmea', nmea_sentences = ('GGA',), fix_period_ms = None, fast_baudrate = None): 
         self.bus = bus 
         self.baudrate = 9600
         self.tx = tx
         self.rx = rx
         self.timeout = timeout
         self.timeout_char = timeout_char
+        self.logger = logger or default_logger
+        # set when the receiver is known to be in airborne mode already, e.g. after a warm restart
+        self.airborne = airborne
+        # 'nmea' parses $GPGGA text, 'ubx' switches the GPS to binary NAV-PVT output
+        self.protocol = protocol
+        # sentences left on in 'nmea' mode, None leaves the GPS default
+        self.nmea_sentences = nmea_sentences
+        self.fix_period_ms = fix_period_ms # CFG-RATE, None leaves the GPS default of 1000
+        self.fast_baudrate = fast_baudrate # CFG-PRT, None stays at baudrate
+        self.tasks = [] # (name, task) of the UBX configuration still running in the background
+        self.fix_cache = FixCache()
+        self._partial = b'' # a line cut off at the end of the last read
+        self._backoff_ms = 0
+        self._retry_at = None
          
     def setup(self):
-        self.gpsModule = UART(self.bus, self.baudrate, tx = self.tx, rx=self.rx, timeout = self.timeout, timeout_char = self.timeout_char)
-        set_airborne_mode(self.gpsModule)
+        # a larger receive buffer keeps UBX replies from being overrun by NMEA between polls
+        self.gpsModule = UART(self.bus, self.baudrate, tx = self.tx, rx=self.rx, timeout = self.timeout, timeout_char = self.timeout_char, rxbuf = 1024)
+        # only needed once per flight, kept out of the import of the driver
+        from code.gps import airborne
+        self._airborne = airborne
+        if self.protocol == 'ubx' or self.nmea_sentences or self.fix_period_ms or self.fast_baudrate:
+            from code.gps import ubx
+            self._ubx = ubx
+        if self.fast_baudrate:
+            # first, so the rest of the configuration already runs at the fast rate
+            out_proto = ubx.PROTO_UBX if self.protocol == 'ubx' else ubx.PROTO_UBX | ubx.PROTO_NMEA
+            self.tasks.append(('baudrate', ubx.BaudrateSwitch(self.gpsModule, self.fast_baudrate, out_proto)))
+        if not self.airborne:
+            self.tasks.append(('airborne', airborne.AirborneConfigurator(self.gpsModule)))
+        baudrate = self.fast_baudrate or self.baudrate
+        if self.protocol == 'ubx':
+            self.ubx_reader = airborne.UBXReader(self.gpsModule)
+            self.tasks.append(('nav_pvt', ubx.TransactionChain(self.ubx_reader, ubx.nav_pvt_config(self.fix_period_ms, baudrate))))
+        elif self.nmea_sentences or self.fix_period_ms:
+            self.tasks.append(('nmea', ubx.TransactionChain(airborne.UBXReader(self.gpsModule),
+                                                            ubx.nmea_config(self.nmea_sentences or tuple(ubx.NMEA_IDS), self.fix_period_ms))))
+
+    def background(self):
+        """Steps the UBX configuration, called on every sampler poll until it is finished."""
+        if not self.tasks:
+            return
+        name, task = self.tasks[0]
+        state = task.step()
+        if state == self._airborne.PENDING:
+            return
+        if state == self._airborne.DONE:
+            if name == 'airborne':
+                self.airborne = True
+        elif name == 'airborne':
+            self.logger.error('ERROR > GPS > airborne mode not set, the GPS stops reporting above 12 km\n')
+        elif name == 'nav_pvt':
+            self.logger.error(f'ERROR > GPS > {name} not configured, reading NMEA\n')
+            self.protocol = 'nmea'
+        else:
+            self.logger.error(f'ERROR > GPS > {name} not configured\n')
+        self.tasks.pop(0)
         
     def read_string(self):
-        
-        timeout_start = time.time()
-        timeout_loop = 2
+        """Reads the lines already waiting on the UART and keeps the $GPGGA sentences with a fix."""
         self.gps_list = []
         
-        while time.time() < timeout_start + timeout_loop:
-            #print(time.time())
-            #print(timeout_start + timeout_loop)
-            #print('-'*50)
+        while self.gpsModule.any():
             telemetry = self.gpsModule.readline()
-            # print(telemetry)
-            if telemetry:
-                # print(telemetry)
-                try:
-                    gps_line = telemetry.decode()
-                    # print(gps_line)
-                    gps_line = gps_line.split(',')
+            if not telemetry:
+                break
+            if not telemetry.endswith(b'\n'):
+                # the rest of the line has not arrived yet
+                self._partial += telemetry
+                break
+            telemetry, self._partial = self._partial + telemetry, b''
+            try:
+                gps_line = gga_fields(telemetry)
+                if gps_line:
+                    self.gps_list.append(gps_line)
                     
-                    if gps_line[0] == '$GPGGA' and len(gps_line) == 15:
-                        self.gps_list.append(gps_line)
-                        
-                except:
-                    continue
+            except:
+                continue
                     
     def get_decimal_degree(self, dddmm_mm):
         try:
-            if len(dddmm_mm) == 12: 
-                ddd = float(dddmm_mm[0:3])
-                mm_mm = float(dddmm_mm[3:-2])/60
-            else: 
-                ddd = float(dddmm_mm[0:2])
-                mm_mm = float(dddmm_mm[2:-2])/60
-            if dddmm_mm[-1] == 'N' or dddmm_mm[-1] == 'E': 
-                return ddd+mm_mm
-            else: 
-                return -(ddd+mm_mm)
+            return decimal_degree(dddmm_mm)
         except Exception as e:
-            with open('data/logs.log', 'a') as logs:
-                logs.write(f'ERROR > GPS > {e}\n')
-            return 11122.00
+            self.logger.error(f'ERROR > GPS > {e}\n')
+            return None
             
         
 
@@ -63,42 +108,79 @@ class GPS():
     def build_dictionary(self):
         self.read_string()
         # print(self.gps_list)
-        if self.gps_list:
-            dic = {'hhmmss': [j[1] for j in self.gps_list][-1],
-                   'latitude': [self.get_decimal_degree(j[2]+j[3]) for j in self.gps_list][-1],
-                   'longitude': [self.get_decimal_degree(j[4]+j[5]) for j in self.gps_list][-1],
-                   'altitude': [j[9] for j in self.gps_list][-1],
-                   'hdop': [j[11] for j in self.gps_list][-1]}
-        else:
-            dic = None
-        return dic 
+        if not self.gps_list:
+            return None
+        # only the newest sentence is converted
+        return gga_fix(self.gps_list[-1], self.get_decimal_degree)
             
+    def read_nav_pvt(self):
+        """Returns the newest NAV-PVT fix waiting on the UART, None if there is none.
+
+        The integer fields of ubx.parse_nav_pvt are kept, the fields of the NMEA
+        dictionary are added in the same units. NAV-PVT has no HDOP, the
+        position DOP stands in for it.
+        """
+        fix = None
+        message = self.ubx_reader.poll()
+        while message:
+            pvt = self._ubx.parse_nav_pvt(message)
+            if pvt and pvt['fix_type'] >= 2:
+                fix = pvt
+            message = self.ubx_reader.next_message()
+        if fix is None:
+            return None
+        fix['latitude'] = fix['lat'] * 1e-7
+        fix['longitude'] = fix['lon'] * 1e-7
+        fix['altitude'] = fix['alt'] / 1000
+        fix['hdop'] = fix['p_dop'] / 100
+        fix['hhmmss'] = f"{fix['hhmmss']:06}.00"
+        return fix
+
+    FIELDS = ('hhmmss', 'latitude', 'longitude', 'hdop', 'altitude', 'gps_valid', 'gps_age')
+
+    def read_into(self, record, offset, sample=None):
+        """Writes the fix of sample (default a new reading) into record.values at offset, hhmmss as a number.
+
+        'gps_valid' is 1 for a fix younger than the FixCache's stale_s and 0 otherwise, including the
+        NO_FIX placeholder before the first fix. 'gps_age' is the age of the fix in s, -1 before the first.
+        """
+        if sample is None:
+            sample = self.read()
+        values = record.values
+        values[offset] = float(sample['hhmmss'])
+        values[offset + 1] = sample['latitude']
+        values[offset + 2] = sample['longitude']
+        values[offset + 3] = float(sample['hdop'])
+        values[offset + 4] = float(sample['altitude'])
+        values[offset + 5] = 1.0 if sample.get('valid') else 0.0
+        age = sample.get('age')
+        values[offset + 6] = -1.0 if age is None else age
+
     def read(self):
-        dic = self.build_dictionary()
-        # print(dic)
-        if not dic:
-            return {
-                'hhmmss': '131424.00',
-                'longitude': -1133.778,
-                'latitude': 1133.778,
-                'altitude': 11111,
-                'hdop': 13.5,
-                }
-        elif dic.get('hdop'):
-            return dic
-        else:
-            return {
-                'hhmmss': '131424.00',
-                'longitude': -1133.778,
-                'latitude': 1133.778,
-                'altitude': 11111,
-                'hdop': 13.5,
-                }
+        """Returns the last good fix from the FixCache, with 'age', 'valid' and 'extrapolated'.
+
+        After a read without a fix the UART is left alone for an exponentially growing backoff, the
+        cache keeps answering in the meantime.
+        """
+        now = time.ticks_ms()
+        # while configuring, the UART is left to the configuration, which Sampled.poll steps with background,
+        # its replies would be consumed as NMEA
+        if not self.tasks and (self._retry_at is None or time.ticks_diff(now, self._retry_at) >= 0):
+            dic = self.read_nav_pvt() if self.protocol == 'ubx' else self.build_dictionary()
+            if dic and dic.get('hdop'):
+                self.fix_cache.update(dic, now)
+                self._backoff_ms = 0
+                self._retry_at = None
+            else:
+                self._backoff_ms = min(max(2 * self._backoff_ms, BACKOFF_MIN_MS), BACKOFF_MAX_MS)
+                self._retry_at = time.ticks_add(now, self._backoff_ms)
+        return self.fix_cache.get(now)
 
 def main():
     gps = GPS()
     gps.setup()
     while True:
+        gps.background()
         print(gps.read())
 
 
@@ -0,0 +1,134 @@
+"""
+UBX binary protocol for the uBlox GPS: message builders for the configuration
+and the NAV-PVT position, velocity and time solution.
+
+By default the GPS sends GGA, GLL, GSA, three GSV, RMC and VTG sentences every
+fix, about 500 bytes at 9600 baud, of which the driver only uses GGA.
+nmea_config turns the rest off with CFG-MSG and can set the fix period
+(CFG-RATE); BaudrateSwitch moves the UART to a faster rate (CFG-PRT).
+
+In UBX mode the GPS is told to output NAV-PVT once per fix and no NMEA at
+all, so a fix is about 100 bytes of fixed layout instead of several hundred
+bytes of text to split and convert.
+
+The NAV-PVT parser lives in tuppersat.gps_parsing, shared with the ground
+benchmark, and is imported from there.
+
+The requests are sent with the non-blocking transactions of airborne.py.
+"""
+
+import struct
+import time
+from micropython import const
+
+from code.gps.airborne import UBXTransaction, PENDING, DONE, FAILED, addcheck, sendmsg
+from tuppersat.gps_parsing import NAV_PVT, parse_nav_pvt
+
+CFG_PRT = b'\x06\x00'
+CFG_MSG = b'\x06\x01'
+CFG_RATE = b'\x06\x08'
+
+# NMEA standard messages, class 0xF0
+NMEA_IDS = {'GGA': 0x00, 'GLL': 0x01, 'GSA': 0x02, 'GSV': 0x03, 'RMC': 0x04, 'VTG': 0x05}
+
+UART1 = const(1)
+PROTO_UBX = const(0x01)
+PROTO_NMEA = const(0x02)
+# 8 data bits, no parity, 1 stop bit
+MODE_8N1 = const(0x000008D0)
+
+
+def ubx_message(msgclass, payload=b''):
+    """UBX message without the checksum, which UBXTransaction adds."""
+    return b'\xb5\x62' + msgclass + struct.pack('<H', len(payload)) + payload
+
+
+def cfg_msg(msgclass, rate):
+    """CFG-MSG: output msgclass (class and id) on the current port every `rate` fixes, 0 disables it."""
+    return ubx_message(CFG_MSG, msgclass + bytes([rate]))
+
+
+def cfg_prt(baudrate=9600, out_proto=PROTO_UBX | PROTO_NMEA, in_proto=PROTO_UBX | PROTO_NMEA):
+    """CFG-PRT: UART1 baud rate and input/output protocols."""
+    return ubx_message(CFG_PRT, struct.pack('<BBHIIHHHH', UART1, 0, 0, MODE_8N1, baudrate, in_proto, out_proto, 0, 0))
+
+
+def cfg_rate(period_ms):
+    """CFG-RATE: one navigation solution every period_ms, aligned to GPS time."""
+    return ubx_message(CFG_RATE, struct.pack('<HHH', period_ms, 1, 1))
+
+
+def nav_pvt_config(period_ms=None, baudrate=9600):
+    """Requests that switch the GPS to NAV-PVT on every fix and no NMEA output."""
+    messages = [cfg_msg(NAV_PVT, 1), cfg_prt(baudrate, out_proto=PROTO_UBX)]
+    if period_ms:
+        messages.append(cfg_rate(period_ms))
+    return messages
+
+
+def nmea_config(keep=('GGA',), period_ms=None):
+    """Requests that turn off every NMEA sentence not in keep and optionally set the fix period."""
+    messages = [cfg_msg(bytes([0xF0, msgid]), 1 if name in keep else 0) for name, msgid in NMEA_IDS.items()]
+    if period_ms:
+        messages.append(cfg_rate(period_ms))
+    return messages
+
+
+class TransactionChain:
+    """Sends a list of UBX requests one after the other, each acknowledged, without blocking.
+
+    `step` returns PENDING until every request is acknowledged (DONE) or one
+    of them runs out of retries (FAILED).
+    """
+
+    def __init__(self, reader, messages, retries=3, timeout_ms=1000):
+        self.reader = reader
+        self.messages = list(messages)
+        self.retries = retries
+        self.timeout_ms = timeout_ms
+        self.state = PENDING if self.messages else DONE
+        self.index = 0
+        self._transaction = None
+
+    def step(self, now=None):
+        if self.state != PENDING:
+            return self.state
+        if self._transaction is None:
+            self._transaction = UBXTransaction(self.reader, self.messages[self.index], False,
+                                               self.retries, self.timeout_ms)
+        result = self._transaction.step(now)
+        if result == FAILED:
+            self.state = FAILED
+        elif result == DONE:
+            self._transaction = None
+            self.index += 1
+            if self.index == len(self.messages):
+                self.state = DONE
+        return self.state
+
+
+class BaudrateSwitch:
+    """Moves the GPS and the UART from their current baud rate to `baudrate`.
+
+    The GPS answers CFG-PRT at the new rate, so the request is not
+    acknowledged. It is sent at the UART's current rate and, once the UART
+    has switched, again at the new rate, so a GPS that kept the fast rate
+    over a Pico reset ends up in the same place. Blocks for settle_ms twice.
+    """
+
+    def __init__(self, port, baudrate, out_proto=PROTO_UBX | PROTO_NMEA, settle_ms=50):
+        self.port = port
+        self.baudrate = baudrate
+        self.message = addcheck(cfg_prt(baudrate, out_proto))
+        self.settle_ms = settle_ms
+        self.state = PENDING
+
+    def step(self, now=None):
+        if self.state == PENDING:
+            sendmsg(self.message, self.port)
+            time.sleep_ms(self.settle_ms)
+            self.port.init(baudrate=self.baudrate)
+            sendmsg(self.message, self.port)
+            time.sleep_ms(self.settle_ms)
+            self.state = DONE
+        return self.state
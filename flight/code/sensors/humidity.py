@@ -1,5 +1,6 @@
 from machine import I2C, Pin
 import time
+from code.comms.logger import default_logger
 
 R_HIGH = const(1)
 R_MEDIUM = const(2)
@@ -26,7 +27,14 @@ class Humidity():
         }
     }
 
-    def __init__(self, bus=0, sda=Pin(0), scl=Pin(1), addr=0x44, freq=400000):
+    # Measurement duration in ms per repeatability, from the datasheet
+    _map_wait_ms = {
+        R_HIGH: 15,
+        R_MEDIUM: 6,
+        R_LOW: 4
+    }
+
+    def __init__(self, bus=0, sda=Pin(0), scl=Pin(1), addr=0x44, freq=400000, i2c_bus=None, logger=None):
         """
         Initialize a sensor object on the given I2C bus and accessed by the
         given address.
@@ -36,11 +44,15 @@ class Humidity():
             scl (Pin, optional): Pin object for SCL. Defaults to Pin(1).
             addr (int, optional): I2C address of the sensor. Defaults to 0x44.
             freq (int, optional): I2C clock frequency in Hz. Defaults to 400000.
+            i2c_bus (I2CBus, optional): Shared bus manager to register with. Defaults to None.
+            logger (Logger, optional): Logger for errors. Defaults to the shared default_logger.
         """
         # if i2c == None:
         #    raise ValueError('I2C object needed as argument!')
         # self._i2c = i2c
         self._i2c = None
+        self.i2c_bus = i2c_bus
+        self.logger = logger or default_logger
         self._addr = addr
         self.bus = bus
         self.sda = sda
@@ -52,10 +64,12 @@ class Humidity():
         Initializes the I2C interface with the sensor.
         """
         try:
-            self._i2c = I2C(self.bus, scl=self.scl, sda=self.sda, freq=400000)
-        except:
-            with open('data/logs.log', 'a') as logs:
-                logs.write(f'ERROR > SETUP > HUMIDITY > {e}\n')
+            if self.i2c_bus:
+                self._i2c = self.i2c_bus.register(self)
+            else:
+                self._i2c = I2C(self.bus, scl=self.scl, sda=self.sda, freq=400000)
+        except Exception as e:
+            self.logger.error(f'ERROR > SETUP > HUMIDITY > {e}\n')
 
     def _send(self, buf):
         """
@@ -84,6 +98,31 @@ class Humidity():
         raw = self._recv(6)
         return (raw[0] << 8) + raw[1], (raw[3] << 8) + raw[4]
 
+    def begin_measurement(self, resolution=R_HIGH):
+        """
+        I2CBus hook, starts a measurement without clock stretching so the bus
+        stays free while the sensor converts. Returns the ms until it is ready.
+        """
+        self._send(self._map_cs_r[False][resolution])
+        return self._map_wait_ms[resolution]
+
+    def finish_measurement(self):
+        """
+        I2CBus hook, reads out the measurement started by begin_measurement.
+        """
+        raw = self._recv(6)
+        return {'humidity': (raw[3] << 8) + raw[4], 'temperature': (raw[0] << 8) + raw[1]}
+
+    FIELDS = ('humidity', 'temperature')
+
+    def read_into(self, record, offset, sample=None):
+        """Writes humidity and temperature of sample (default a new reading) into record.values at offset."""
+        if sample is None:
+            sample = self.read()
+        values = record.values
+        values[offset] = sample['humidity']
+        values[offset + 1] = sample['temperature']
+
     def read(self, resolution=R_HIGH, clock_stretch=True, celsius=True):
         """
         Reads the temperature and humidity values from the sensor.
@@ -97,11 +136,12 @@ class Humidity():
             dict: A dictionary containing the temperature and humidity values.
         """
         try:
+            if self.i2c_bus:
+                return self.i2c_bus.result(self)
             t, h = self._raw_temp_humi(resolution, clock_stretch)
-            return {'humidity' :self._raw_temp_humi(resolution, clock_stretch)[1], 'temperature' :self._raw_temp_humi(resolution, clock_stretch)[0]}
+            return {'humidity' :h, 'temperature' :t}
         except Exception as e:
-            with open('data/logs.log', 'a') as logs:
-                logs.write(f'ERROR > READ > HUMIDITY > {e}\n')
+            self.logger.error(f'ERROR > READ > HUMIDITY > {e}\n')
             return {'humidity' :101, 'temperature' :101}
 
 def main():
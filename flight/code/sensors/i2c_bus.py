@@ -0,0 +1,109 @@
+import machine
+import time
+
+
+class I2CBus:
+    """Owns the single I2C bus shared by the Pressure, Humidity and UV sensors.
+
+    Drivers register themselves in their `setup` and get the shared `machine.I2C` object back. A registered
+    driver implements `begin_measurement()`, which starts a conversion and returns the ms until it is ready,
+    and `finish_measurement()`, which reads it out. `sample` starts every device of a round first and then
+    collects them in order of readiness, so the conversion waits overlap instead of adding up.
+
+    Freshness is kept per device: `result` returns a device's unread measurement, or measures only that
+    device. The Sampler runs one round over the sensors that are due together, so each sensor is measured at
+    its own rate.
+
+    Args:
+        bus (int, optional): The I2C Bus the sensors are connected to. Defaults to 0.
+        sda (int, optional): SDA Pin Nummber. Defaults to 0.
+        scl (int, optional): SCL Pin Number. Defaults to 1.
+        freq (int, optional): Frequency. Defaults to 400000.
+    """
+
+    def __init__(self, bus=0, sda=0, scl=1, freq=400000):
+        self.bus = bus
+        self.sda = sda
+        self.scl = scl
+        self.freq = freq
+        self.i2c = None
+        self.devices = []
+        self.results = {}
+        self._fresh = set()
+        # (ms since round start, device, event) for the last sample round, for profiling
+        self.timeline = []
+        self.last_round_ms = 0
+
+    def setup(self):
+        """Creates the machine.I2C object, only the first call does anything."""
+        if self.i2c is None:
+            self.i2c = machine.I2C(self.bus, sda=machine.Pin(self.sda), scl=machine.Pin(self.scl), freq=self.freq)
+        return self.i2c
+
+    def register(self, device):
+        """Registers a driver on the bus and returns the shared I2C object."""
+        if device not in self.devices:
+            self.devices.append(device)
+        return self.setup()
+
+    def sample(self, devices=None):
+        """Runs one overlapped measurement round over devices, every registered device by default."""
+        devices = self.devices if devices is None else [device for device in devices if device in self.devices]
+        start = time.ticks_ms()
+        self.timeline = []
+        due = []
+        for device in devices:
+            name = device.__class__.__name__
+            try:
+                wait_ms = device.begin_measurement()
+                due.append((time.ticks_add(start, wait_ms), device))
+                self.timeline.append((time.ticks_diff(time.ticks_ms(), start), name, 'start'))
+            except Exception as e:
+                self.results[device] = e
+                self.timeline.append((time.ticks_diff(time.ticks_ms(), start), name, 'error'))
+        due.sort(key=lambda item: time.ticks_diff(item[0], start))
+        for ready_at, device in due:
+            remaining = time.ticks_diff(ready_at, time.ticks_ms())
+            if remaining > 0:
+                time.sleep_ms(remaining)
+            name = device.__class__.__name__
+            try:
+                self.results[device] = device.finish_measurement()
+                self.timeline.append((time.ticks_diff(time.ticks_ms(), start), name, 'collect'))
+            except Exception as e:
+                self.results[device] = e
+                self.timeline.append((time.ticks_diff(time.ticks_ms(), start), name, 'error'))
+        self._fresh.update(devices)
+        self.last_round_ms = time.ticks_diff(time.ticks_ms(), start)
+
+    def result(self, device):
+        """Returns the unread measurement of device, measuring only device if it was already consumed.
+
+        Raises:
+            Exception: Whatever the driver raised while measuring, so its `read` can handle it as before.
+        """
+        if device not in self._fresh:
+            self.sample((device,))
+        self._fresh.discard(device)
+        result = self.results.get(device)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def main():
+    from code.sensors.pressure import Pressure
+    from code.sensors.humidity import Humidity
+    from code.sensors.uv import UV
+    bus = I2CBus()
+    sensors = [Pressure(i2c_bus=bus), Humidity(i2c_bus=bus), UV(i2c_bus=bus)]
+    for sensor in sensors:
+        sensor.setup()
+    while True:
+        print([sensor.read() for sensor in sensors])
+        print(f'{bus.last_round_ms} ms > {bus.timeline}')
+        time.sleep(1)
+
+
+if __name__ == '__main__':
+    main()
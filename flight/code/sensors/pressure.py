@@ -1,9 +1,24 @@
 import machine
 import time
+from code.comms.logger import default_logger
 
 # GLOBAL
 SENSOR_ADDRESS = 0x77
 
+# conversion commands, the OSR offset is added to the base command
+CMD_CONVERT_D1 = 0x40
+CMD_CONVERT_D2 = 0x50
+CMD_ADC_READ = 0x00
+
+# OSR -> (command offset, conversion time in ms rounded up from the datasheet)
+OSR_SETTINGS = {
+    256: (0x00, 1),
+    512: (0x02, 2),
+    1024: (0x04, 3),
+    2048: (0x06, 5),
+    4096: (0x08, 10),
+}
+
 
 class Pressure:
     """This is a class to interface with the MS5611-01BA03 Barometric Pressure Sensor 
@@ -14,20 +29,38 @@ class Pressure:
         sda (int, optional): SDA Pin Nummber. Defaults to 0.
         scl (int, optional): SCL Pin Number. Defaults to 1.
         freq (int, optional): Frequency. Defaults to 400000.
+        osr (int, optional): Oversampling rate used for conversions. Defaults to 4096.
+        temperature_every (int, optional): Number of D1 (pressure) conversions per D2 (temperature)
+            conversion in the pipelined `read`. Defaults to 10.
+        i2c_bus (I2CBus, optional): Shared bus manager to register with instead of creating an own I2C.
+            Defaults to None.
+        logger (Logger, optional): Logger for errors. Defaults to the shared default_logger.
     """
 
-    def __init__(self, bus=0, sensor_address=0x77, sda=0, scl=1, freq=400000):
+    def __init__(self, bus=0, sensor_address=0x77, sda=0, scl=1, freq=400000, osr=4096, temperature_every=10,
+                 i2c_bus=None, logger=None):
         """_summary_
         """
+        if osr not in OSR_SETTINGS:
+            raise ValueError(f'Invalid OSR {osr}')
         self.coefficients = {}
         self.sensor_status = None
         self.i2c = None
+        self.i2c_bus = i2c_bus
+        self.logger = logger or default_logger
         self.bus = bus
         self.sensor_address = sensor_address
         self.sda = sda
         self.scl = scl
         self.freq = freq
+        self.osr = osr
+        self.temperature_every = max(1, temperature_every)
         self.D1, self.D2, self.temp, self.dT, self.off, self.sens = 0, 0, 0, 0, 0, 0
+        # pipelined conversion state: which conversion is running, when it started and how long it takes
+        self._pending = None
+        self._started = 0
+        self._wait_ms = 0
+        self._d1_since_d2 = 0
 
     def get_coefficients(self):
         """Stores the orrection coefficients for the connectedd sensors
@@ -47,14 +80,77 @@ class Pressure:
         """
         try:
             self.sensor_status = True
-            self.i2c = machine.I2C(self.bus, sda=machine.Pin(self.sda), scl=machine.Pin(self.scl), freq=self.freq)
+            if self.i2c_bus:
+                self.i2c = self.i2c_bus.register(self)
+            else:
+                self.i2c = machine.I2C(self.bus, sda=machine.Pin(self.sda), scl=machine.Pin(self.scl), freq=self.freq)
             self.get_coefficients()
+            # prime D1 and D2 once so the pipelined read always has a full pair to convert
+            self.get_raw_data()
+            self.start_conversion('D2' if self.temperature_every == 1 else 'D1')
         except Exception as e:
             # TODO: write default conditions
-            with open('data/logs.log', 'a') as logs:
-                logs.write(f'ERROR > SETUP > PRESSURE > {e}\n')
+            self.logger.error(f'ERROR > SETUP > PRESSURE > {e}\n')
             self.sensor_status = False
 
+    def start_conversion(self, kind, osr=None):
+        """Starts a D1 (pressure) or D2 (temperature) conversion and returns without waiting.
+
+        Args:
+            kind (str): 'D1' or 'D2'.
+            osr (int, optional): Oversampling rate for this conversion. Defaults to self.osr.
+        """
+        offset, self._wait_ms = OSR_SETTINGS[osr or self.osr]
+        base = CMD_CONVERT_D1 if kind == 'D1' else CMD_CONVERT_D2
+        self.i2c.writeto(self.sensor_address, bytes([base + offset]))
+        self._pending = kind
+        self._started = time.ticks_ms()
+
+    def conversion_ready(self):
+        """Returns True if the running conversion has had enough time to finish."""
+        return self._pending is not None and time.ticks_diff(time.ticks_ms(), self._started) >= self._wait_ms
+
+    def read_adc(self):
+        """Reads the 24 bit ADC result of the last conversion."""
+        self.i2c.writeto(self.sensor_address, bytes([CMD_ADC_READ]))
+        return int.from_bytes(self.i2c.readfrom(self.sensor_address, 3), 'big')
+
+    def poll(self, osr=None):
+        """Advances the D1/D2 pipeline without blocking.
+
+        If the running conversion is finished its result is collected and the next conversion is started
+        straight away. D2 is refreshed once every `temperature_every` D1 conversions.
+
+        Args:
+            osr (int, optional): Oversampling rate for the next conversion. Defaults to self.osr.
+
+        Returns:
+            bool: True if a new D1 value was collected.
+        """
+        if not self.conversion_ready():
+            return False
+        finished = self._pending
+        if finished == 'D1':
+            self.D1 = self.read_adc()
+            self._d1_since_d2 += 1
+        else:
+            self.D2 = self.read_adc()
+            self._d1_since_d2 = 0
+        self.start_conversion('D2' if self._d1_since_d2 >= self.temperature_every else 'D1', osr)
+        return finished == 'D1'
+
+    def begin_measurement(self):
+        """I2CBus hook, returns the ms until the running conversion is ready."""
+        if self._pending is None:
+            self.start_conversion('D1')
+        return max(0, self._wait_ms - time.ticks_diff(time.ticks_ms(), self._started))
+
+    def finish_measurement(self):
+        """I2CBus hook, collects the conversion and returns the corrected values."""
+        self.poll()
+        pressure, temperature = self.convert_readings()
+        return {'pressure': pressure, 'temperature': temperature}
+
     def get_raw_data(self):
 
         # CALL PRESSURE
@@ -113,22 +209,45 @@ class Pressure:
 
         return (self.D1 * self.sens / pow(2, 21) - self.off) / pow(2, 15), temperature_final
 
-    def read(self):
+    FIELDS = ('pressure', 'temperature_from_pressure')
+
+    def read_into(self, record, offset, sample=None):
+        """Writes pressure and temperature of sample (default a new reading) into record.values at offset."""
+        if sample is None:
+            sample = self.read()
+        values = record.values
+        values[offset] = sample['pressure']
+        values[offset + 1] = sample['temperature']
+
+    def read(self, osr=None):
         """Reads the raw data from the sensor and corrects the values if the self.sensor_status is True. 
         If self.sensor_status is False then it returns 99999999
 
+        The conversions are pipelined across calls, a call collects the conversion started by the previous
+        one and kicks off the next, so it does not block. Until a new D1 is available the last value is
+        converted again.
+
+        Args:
+            osr (int, optional): Oversampling rate for the next conversion. Defaults to self.osr.
+
         Returns:
             float, float: pressure, temperature
         """
         try:
-            self.get_raw_data()
+            if self.i2c_bus:
+                return self.i2c_bus.result(self)
+            if self._pending is None:
+                # pipeline not running (e.g. setup failed part way), fall back to a blocking read
+                self.get_raw_data()
+                self.start_conversion('D1', osr)
+            else:
+                self.poll(osr)
             # self.get_correcting_factors()
             pressure, temperature = self.convert_readings()
             # time = time.time() 
             return {'pressure' :pressure, 'temperature': temperature}
         except Exception as e:
-            with open('data/logs.log', 'a') as logs:
-                logs.write(f'ERROR > READ > PRESSURE > {e}\n')
+            self.logger.error(f'ERROR > READ > PRESSURE > {e}\n')
             return {'pressure' :101, 'temperature': 101}
 
 
@@ -0,0 +1,216 @@
+import time
+
+LATEST = 'latest'
+AVERAGE = 'average'
+DECIMATE = 'decimate'
+
+
+def sensor_name(sensor):
+    """Returns the field name a sensor gets in the group namedtuple, e.g. 'uv' for an UV object."""
+    name = getattr(sensor, 'name', None)
+    if name:
+        return name
+    return str(sensor).split()[0][1:].split('.')[-1].lower()
+
+
+def driver(sensor):
+    """Returns the sensor driver behind a Subscription or Sampled wrapper, or sensor itself."""
+    sensor = getattr(sensor, 'source', sensor)
+    return getattr(sensor, 'sensor', sensor)
+
+
+class Sampled:
+    """Wraps a sensor so it is sampled at its own rate, independent of the group transmit cadence.
+
+    A sensor is wrapped once and the groups subscribe to it, so a sensor used by two groups (e.g. the GPS)
+    is only set up and read once per sample period.
+
+    Args:
+        sensor (object): Any sensor with `setup` and `read` methods.
+        rate (float, optional): Sample rate in Hz. Defaults to 1.
+    """
+
+    def __init__(self, sensor, rate=1):
+        self.sensor = sensor
+        self.name = sensor_name(sensor)
+        self.FIELDS = getattr(sensor, 'FIELDS', ())
+        self.rate = rate
+        self.period_ms = int(1000 / rate)
+        self.latest = None
+        self.sample_count = 0
+        self.subscriptions = []
+        self._next_due = None
+        self._is_setup = False
+        # optional non-blocking work of the sensor, e.g. the GPS configuration, run on every poll
+        self._background = getattr(sensor, 'background', None)
+
+    def setup(self):
+        """Sets the wrapped sensor up, only the first call does anything."""
+        if not self._is_setup:
+            self._is_setup = True
+            self.sensor.setup()
+
+    def subscribe(self, mode=LATEST, every=1):
+        """Returns a Subscription that a group can use in place of the sensor.
+
+        Args:
+            mode (str, optional): 'latest', 'average' (mean of the samples since the group last read)
+                or 'decimate' (every `every`th sample). Defaults to 'latest'.
+            every (int, optional): Decimation factor for 'decimate'. Defaults to 1.
+        """
+        subscription = Subscription(self, mode, every)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def set_rate(self, rate):
+        """Changes the sample rate, the next sample is due one new period after the last one."""
+        if self._next_due is not None:
+            self._next_due = time.ticks_add(self._next_due, int(1000 / rate) - self.period_ms)
+        self.rate = rate
+        self.period_ms = int(1000 / rate)
+
+    def due(self, now):
+        return self._next_due is None or time.ticks_diff(now, self._next_due) >= 0
+
+    def poll(self, now=None):
+        """Reads the sensor if its period has elapsed. Returns True if a new sample was taken."""
+        if now is None:
+            now = time.ticks_ms()
+        if self._background:
+            self._background()
+        if not self.due(now):
+            return False
+        self.latest = self.sensor.read()
+        self.sample_count += 1
+        for subscription in self.subscriptions:
+            subscription.push(self.latest)
+        # schedule from the previous due time so the rate does not drift with loop jitter
+        if self._next_due is None or time.ticks_diff(now, self._next_due) > self.period_ms:
+            self._next_due = time.ticks_add(now, self.period_ms)
+        else:
+            self._next_due = time.ticks_add(self._next_due, self.period_ms)
+        return True
+
+    def next_due_ms(self, now=None):
+        """Returns the ms until the next sample is due."""
+        if self._next_due is None:
+            return 0
+        if now is None:
+            now = time.ticks_ms()
+        return max(0, time.ticks_diff(self._next_due, now))
+
+
+class Subscription:
+    """A group's view of a Sampled sensor, read by R2D1 like any other sensor."""
+
+    def __init__(self, source, mode=LATEST, every=1):
+        if mode not in (LATEST, AVERAGE, DECIMATE):
+            raise ValueError(f'Invalid subscription mode {mode}')
+        self.source = source
+        self.name = source.name
+        self.FIELDS = source.FIELDS
+        self.mode = mode
+        self.every = max(1, every)
+        self._value = None
+        self._sums = None
+        self._count = 0
+        self.fresh = False # a sample arrived since the group last read
+
+    def setup(self):
+        self.source.setup()
+
+    def push(self, sample):
+        """Called by the source for every new sample."""
+        self.fresh = True
+        self._count += 1
+        if self.mode == AVERAGE:
+            self._sums = accumulate(self._sums, sample)
+        elif self.mode == DECIMATE:
+            if self._count % self.every == 0:
+                self._value = sample
+        else:
+            self._value = sample
+
+    def read_into(self, record, offset):
+        """Writes the subscribed sample into record.values at offset, through the sensor's read_into."""
+        self.source.sensor.read_into(record, offset, self.read())
+
+    def read(self):
+        self.fresh = False
+        if self.mode == AVERAGE:
+            if self._count:
+                self._value = mean(self._sums, self._count)
+                self._sums = None
+                self._count = 0
+        elif self._value is None:
+            self._value = self.source.latest
+        return self._value
+
+
+def accumulate(sums, sample):
+    """Adds the numeric fields of sample to sums, anything else keeps its latest value."""
+    if sums is None:
+        sums = {}
+    for key, value in sample.items():
+        if isinstance(value, (int, float)):
+            sums[key] = sums.get(key, 0) + value
+        elif isinstance(value, list) and all(isinstance(v, (int, float)) for v in value):
+            previous = sums.get(key)
+            if isinstance(previous, list) and len(previous) == len(value):
+                sums[key] = [a + b for a, b in zip(previous, value)]
+            else:
+                sums[key] = list(value)
+        else:
+            sums[key] = value
+    return sums
+
+
+def mean(sums, count):
+    """Divides the accumulated numeric fields by count."""
+    averaged = {}
+    for key, value in sums.items():
+        if isinstance(value, (int, float)):
+            averaged[key] = value / count
+        elif isinstance(value, list):
+            averaged[key] = [v / count for v in value]
+        else:
+            averaged[key] = value
+    return averaged
+
+
+class Sampler:
+    """Polls a set of Sampled sensors, reading only the ones that are due.
+
+    Args:
+        sources (list): Sampled sensors.
+    """
+
+    def __init__(self, sources=None):
+        self.sources = []
+        for source in sources or []:
+            self.add(source)
+
+    def add(self, source):
+        if source not in self.sources:
+            self.sources.append(source)
+
+    def poll(self):
+        """Samples every due sensor and returns how many were read.
+
+        Due sensors sharing an I2CBus are measured in one overlapped round first, each then reads its own
+        result, sensors that are not due are left alone.
+        """
+        now = time.ticks_ms()
+        rounds = {}
+        for source in self.sources:
+            bus = getattr(source.sensor, 'i2c_bus', None)
+            if bus is not None and source.due(now):
+                rounds.setdefault(bus, []).append(source.sensor)
+        for bus, devices in rounds.items():
+            bus.sample(devices)
+        return sum(1 for source in self.sources if source.poll(now))
+
+    def next_due_ms(self):
+        """Returns the ms until the next sensor is due."""
+        now = time.ticks_ms()
+        return min((source.next_due_ms(now) for source in self.sources), default=0)
@@ -4,6 +4,7 @@ from machine import Pin, SPI
 import uos
 import time
 from code.comms.write_to_csv import CSV
+from code.comms.logger import default_logger
 
 
 class SDCard:
@@ -16,7 +17,8 @@ class SDCard:
                  sck=10,
                  mosi=11,
                  miso=8,
-                 data_addr=None):
+                 data_addr=None,
+                 logger=None):
         """
         Initializes the SDCard object with the specified parameters.
 
@@ -31,6 +33,7 @@ class SDCard:
             mosi (int): The pin number for the SPI Master-Out-Slave-In (MOSI) line. Default is 11.
             miso (int): The pin number for the SPI Master-In-Slave-Out (MISO) line. Default is 8.
             data_addr (str): The directory where the data will be stored. Default is '/data'.
+            logger (Logger): Logger for errors. Default is the shared default_logger.
         """
         if not data_addr:
             data_addr = '/data'
@@ -45,6 +48,7 @@ class SDCard:
         self.miso = miso
         self.data_addr = data_addr
         self.status = None
+        self.logger = logger or default_logger
 
     def setup(self):
         """
@@ -79,8 +83,7 @@ class SDCard:
             #     return self.packet_setup()
         except Exception as e:
             self.status = False
-            with open('data/logs.log', 'a') as logs:
-                logs.write(f'ERROR > SETUP > SDCARD > {e}\n')
+            self.logger.error(f'ERROR > SETUP > SDCARD > {e}\n')
     def read(self):
         """
         Dummy method that does nothing, added to avoid errors in other parts of the code.
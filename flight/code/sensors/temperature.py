@@ -2,6 +2,7 @@ import machine
 import onewire
 import ds18x20
 import time
+from code.comms.logger import default_logger
 
 
 class Temperature():
@@ -9,12 +10,13 @@ class Temperature():
     This class implements an interface to the internal and external temperature sensor 
     """
 
-    def __init__(self, pin=17):
+    def __init__(self, pin=17, logger=None):
         """
         Constructor method for the Temperature class.
 
         Args:
         - pin (int): An integer representing the GPIO pin number used for the one-wire interface. Default value is 17.
+        - logger (Logger): Logger for errors. Default is the shared default_logger.
 
         Returns:
         - None: This method does not return anything.
@@ -22,6 +24,7 @@ class Temperature():
         self.all_sensors = None
         self.devices = None
         self.pin = pin
+        self.logger = logger or default_logger
 
     def setup(self):
         """
@@ -41,8 +44,7 @@ class Temperature():
             self.all_sensors = ds18x20.DS18X20(onewire.OneWire(all_pin))  # oneWire call
             self.find_devices()
         except Exception as e:
-            with open('data/logs.log', 'a') as logs:
-                logs.write(f'ERROR > Temperature > OneWire Not Found > {e}')
+            self.logger.error(f'ERROR > Temperature > OneWire Not Found > {e}\n')
         # print(self.devices)
 
     def find_devices(self):
@@ -59,12 +61,21 @@ class Temperature():
         else:
              return [101, 101]
 
+    FIELDS = ('t_internal', 't_external')
+
+    def read_into(self, record, offset, sample=None):
+        """Writes the first and last probe of sample (default a new reading) into record.values at offset."""
+        if sample is None:
+            sample = self.read()
+        values = record.values
+        values[offset] = sample['temperature'][0]
+        values[offset + 1] = sample['temperature'][-1]
+
     def read(self):
         try:
             return {'temperature': self.get_temperature()}
         except Exception as e:
-            with open('data/logs.log', 'a') as logs:
-                logs.write(f'ERROR > TEMPERATURE > 0 Sensors Connected > {e}\n')
+            self.logger.error(f'ERROR > TEMPERATURE > 0 Sensors Connected > {e}\n')
             return {'temperature': [101, 101]}
 
 def main():
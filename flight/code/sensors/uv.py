@@ -1,6 +1,7 @@
 import time
 import machine
 from ustruct import unpack
+from code.comms.logger import default_logger
 
 _VEML6075_ADDR = const(0x10)
 
@@ -29,10 +30,15 @@ class UV:
                  uvb_c_coef=2.95,
                  uvb_d_coef=1.74,
                  uva_response=0.001461,
-                 uvb_response=0.002591) -> None:
+                 uvb_response=0.002591,
+                 i2c_bus=None,
+                 logger=None) -> None:
         self.uvb = None
         self.uva = None
         self.i2c = None
+        self.i2c_bus = i2c_bus
+        self.logger = logger or default_logger
+        self._last_collect = None
         self.bus = bus
         self.sda = sda
         self.scl = scl
@@ -50,7 +56,10 @@ class UV:
 
     def setup(self):
         try:
-            self.i2c = machine.I2C(self.bus, sda=machine.Pin(self.sda), scl=machine.Pin(self.scl), freq=self.freq)
+            if self.i2c_bus:
+                self.i2c = self.i2c_bus.register(self)
+            else:
+                self.i2c = machine.I2C(self.bus, sda=machine.Pin(self.sda), scl=machine.Pin(self.scl), freq=self.freq)
             veml_id = self._read_register(_REV_ID)
             if veml_id != 0x26:
                 raise RuntimeError("Incorrect VEML6075 ID 0x%02X" % veml_id)
@@ -70,9 +79,25 @@ class UV:
                 sensor_status = 'broky'
         except:
             return 'brokey'
+
+    def begin_measurement(self):
+        """I2CBus hook, the VEML runs continuously so this only returns the ms left of the current integration"""
+        if self._last_collect is None:
+            return self.integration_time_s
+        return max(0, self.integration_time_s - time.ticks_diff(time.ticks_ms(), self._last_collect))
+
+    def finish_measurement(self):
+        """I2CBus hook, reads the finished integration"""
+        self._last_collect = time.ticks_ms()
+        return self.calculate()
+
     def get_raw_data(self):
         """Perform a full reading and calculation of all UV calibrated values"""
         time.sleep(0.1)
+        return self.calculate()
+
+    def calculate(self):
+        """Read the UV registers and apply the compensation, without waiting for the integration"""
         temp_uva = self._read_register(_REG_UVA)
         temp_uvb = self._read_register(_REG_UVB)
         # dark = self._read_register(_REG_DARK)
@@ -83,12 +108,23 @@ class UV:
         self.uvb = temp_uvb - (self._c * uvcomp1) - (self._d * uvcomp2)
         return {'uva': self.uva, 'uvb': self.uvb}
 
+    FIELDS = ('uva', 'uvb')
+
+    def read_into(self, record, offset, sample=None):
+        """Writes uva and uvb of sample (default a new reading) into record.values at offset."""
+        if sample is None:
+            sample = self.read()
+        values = record.values
+        values[offset] = sample['uva']
+        values[offset + 1] = sample['uvb']
+
     def read(self):
         try:
+            if self.i2c_bus:
+                return self.i2c_bus.result(self)
             return self.get_raw_data()
         except Exception as e:
-            with open('data/logs.log', 'a') as logs:
-                logs.write(f'ERROR > UV > {e}\n')
+            self.logger.error(f'ERROR > UV > {e}\n')
             return {'uva': 101, 'uvb': 101}
 
     @property
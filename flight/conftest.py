@@ -0,0 +1,65 @@
+"""Host test setup, run with `python -m pytest` from this directory.
+
+The flight code is written for MicroPython. For its pure parts to run on
+CPython, this provides the few MicroPython names they use: the ticks
+functions of `time`, `const`, `ucollections` and a `machine` module whose
+Pin and UART do nothing. Nothing here talks to hardware, tests that need a
+sensor, SD card or radio pass their own stand-in.
+
+The local `code` package is registered in place of the standard library
+module of the same name, which would otherwise shadow it.
+"""
+
+# standard library imports
+import collections
+import os
+import struct
+import sys
+import time
+import types
+
+FLIGHT = os.path.dirname(os.path.abspath(__file__))
+
+code = types.ModuleType('code')
+code.__path__ = [os.path.join(FLIGHT, 'code')]
+sys.modules['code'] = code
+
+if not hasattr(time, 'ticks_ms'):
+    time.ticks_ms = lambda: time.monotonic_ns() // 1000000
+    time.ticks_us = lambda: time.monotonic_ns() // 1000
+    time.ticks_diff = lambda a, b: a - b
+    time.ticks_add = lambda a, b: a + b
+    time.sleep_ms = lambda ms: time.sleep(ms / 1000)
+sys.modules.setdefault('utime', time)
+sys.modules.setdefault('ucollections', collections)
+sys.modules.setdefault('ustruct', struct)
+
+micropython = types.ModuleType('micropython')
+micropython.const = lambda value: value
+sys.modules.setdefault('micropython', micropython)
+
+
+class _Pin:
+    IN, OUT, PULL_UP = 0, 1, 2
+
+    def __init__(self, *args, **kwargs):
+        self._value = 1
+
+    def value(self, *args):
+        if args:
+            self._value = args[0]
+        return self._value
+
+    def toggle(self):
+        self._value = not self._value
+
+
+class _UART:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+machine = types.ModuleType('machine')
+machine.Pin = _Pin
+machine.UART = _UART
+sys.modules.setdefault('machine', machine)
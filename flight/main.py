@@ -1,32 +1,79 @@
-from tuppersat.r2d1 import R2D1
+# imported first so the boot profile starts as close to power on as possible
+from code.comms.boot_profile import boot_profiler
 
-# sensor imports 
-from code.sensors.pressure import Pressure
-from code.sensors.temperature import Temperature
-from code.sensors.uv import UV
-from code.sensors.humidity import Humidity
-from code.sensors.sdcard import SDCard
+# uPython imports
+from machine import Pin
 
-# gps imports
-from code.gps.gps import GPS
+R2D1 = boot_profiler.load('tuppersat.r2d1', 'R2D1')
+
+# every sensor the flight computer knows: name -> (module, class, constructor kwargs, sample rate in Hz or
+# None for a sensor read on every cycle, shares the I2C bus). Only the ones the groups below use are imported.
+DRIVERS = {
+    'uv'         : ('code.sensors.uv', 'UV', {}, 10, True),
+    'humidity'   : ('code.sensors.humidity', 'Humidity', {}, 5, True),
+    'temperature': ('code.sensors.temperature', 'Temperature', {}, 1, False),
+    'pressure'   : ('code.sensors.pressure', 'Pressure', {}, 5, True),
+    'gps'        : ('code.gps.gps', 'GPS', {}, 1, False), # {'protocol': 'ubx'} reads binary NAV-PVT instead of NMEA text
+    'sdcard'     : ('code.sensors.sdcard', 'SDCard', {}, None, False),
+}
 
 grouped_sensors = {
     'data'      : {
-        'sensors' : [UV(), Humidity(), GPS()],
+        'sensors' : ['uv', 'humidity', 'gps'],
         'store_length': 4,
-        'specified_format': 'R2D1',
-        'transmit_time': 24
+        'specified_format': 'R2D1', # 'R2D1_STATS' sends count, mean, std, min and max of the window instead
+        'transmit_time': 24,
+        'burst': 3, # queued frames sent back to back per transmit slot, within 'burst_bytes' (512 by default)
+        'burst_bytes': 768,
+        # settings that differ from the above in a flight phase (pre_launch, ascent, float, descent, landed)
+        'phase_profiles': {
+            'ascent': {'transmit_time': 12, 'store_length': 2, 'sample_rates': {'uv': 20, 'humidity': 10}},
+            'landed': {'transmit_time': 120, 'store_length': 8, 'sample_rates': {'uv': 1, 'humidity': 1}},
+            },
         },
     'telemetry' : {
-        'sensors' : [Temperature(), Pressure(), GPS()],
+        'sensors' : ['temperature', 'pressure', 'gps'],
         'store_length': 1,
         'specified_format': 'UCD',
-        'transmit_time': 20
+        'specified_storage_format': 'CSV', # 'BINARY' stores fixed width struct records in telemetry.bin
+        'transmit_time': 20,
+        'phase_profiles': {
+            'ascent': {'transmit_time': 10},
+            'landed': {'transmit_time': 60, 'sample_rates': {'pressure': 1}},
+            },
         },
     'storage'   : {
-        'sensors' : [SDCard()],
+        'sensors' : ['sdcard'],
         'store': False
         },
 }
+
+# import and create the configured sensors, each once, a sensor shared by groups is sampled once
+configured = [name for info in grouped_sensors.values() for name in info['sensors']]
+i2c_bus = None
+if any(DRIVERS[name][4] for name in configured):
+    # pressure, humidity and uv share one I2C bus so their conversions overlap
+    i2c_bus = boot_profiler.load('code.sensors.i2c_bus', 'I2CBus')()
+if any(DRIVERS[name][3] for name in configured):
+    Sampled = boot_profiler.load('code.sensors.sampler', 'Sampled')
+sensors = {}
+for name in configured:
+    if name not in sensors:
+        module, cls, kwargs, rate, on_bus = DRIVERS[name]
+        sensor = boot_profiler.load(module, cls)(**(dict(kwargs, i2c_bus=i2c_bus) if on_bus else kwargs))
+        # every sampled sensor has its own sample rate, the groups subscribe to it
+        sensors[name] = sensor if rate is None else Sampled(sensor, rate=rate)
+for info in grouped_sensors.values():
+    info['sensors'] = [sensors[name] if DRIVERS[name][3] is None else sensors[name].subscribe()
+                       for name in info['sensors']]
+
 r2d1 = R2D1(**grouped_sensors)
+# pre-launch: power on once with GP22 jumpered to GND to clear the checkpoint of the bench runs, then remove
+# the jumper, otherwise every brownout in flight would start the mission over
+r2d1.clear_pin = Pin(22, Pin.IN, Pin.PULL_UP)
+# the loop idles with time.sleep_ms between due tasks, r2d1.idle = Idle(mode='lightsleep') from code.comms.idle
+# draws less but drops UART bytes, so only without a GPS streaming NMEA
+# r2d1.logger.use_binary() stores the log as packed records in logs.bin instead of logs.log, a fraction of the
+# writes, read back with tuppersat.tools.logdecode; it is off unless enabled here
+# DualCore(r2d1).start() from tuppersat.dual_core samples on core 0 and stores and transmits on core 1
 r2d1.start()
\ No newline at end of file
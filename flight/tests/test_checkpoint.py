@@ -0,0 +1,61 @@
+from code.comms.checkpoint import Checkpoint
+
+
+def state(elapsed_ms=61000):
+    return {
+        'elapsed_ms': elapsed_ms,
+        'gps_airborne': True,
+        'frame_count': 12,
+        'telemetry_count': 5,
+        'packet_count': {'data': 40, 'telemetry': 7},
+        'store_count': {'data': 10, 'telemetry': 7},
+        'frame_tags': {'data': 3, 'telemetry': 200},
+    }
+
+
+def test_round_trip(tmp_path):
+    Checkpoint(str(tmp_path / 'checkpoint')).save(state())
+
+    loaded = Checkpoint(str(tmp_path / 'checkpoint')).load()
+
+    assert loaded == dict(state(), sequence=0, resets=1)
+
+
+def test_newest_intact_slot_wins(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint'))
+    checkpoint.save(state(1000))
+    checkpoint.save(state(2000))
+    assert Checkpoint(checkpoint.filename).load()['elapsed_ms'] == 2000
+
+    # a reset during the second save leaves its slot with a bad CRC
+    newest = tmp_path / 'checkpoint.1'
+    data = bytearray(newest.read_bytes())
+    data[-5] ^= 0xFF
+    newest.write_bytes(bytes(data))
+
+    assert Checkpoint(checkpoint.filename).load()['elapsed_ms'] == 1000
+
+
+def test_resets_count_across_boots(tmp_path):
+    filename = str(tmp_path / 'checkpoint')
+    for resets in (1, 2, 3):
+        checkpoint = Checkpoint(filename)
+        loaded = checkpoint.load()
+        if loaded:
+            assert loaded['resets'] == resets - 1
+        checkpoint.save(state())
+
+
+def test_too_old_is_rejected_and_cleared(tmp_path):
+    filename = str(tmp_path / 'checkpoint')
+    Checkpoint(filename).save(state(9 * 3600 * 1000))
+
+    checkpoint = Checkpoint(filename)
+
+    assert checkpoint.load() is None
+    assert checkpoint.rejected['elapsed_ms'] == 9 * 3600 * 1000
+    assert not list(tmp_path.iterdir())
+
+
+def test_cold_start(tmp_path):
+    assert Checkpoint(str(tmp_path / 'checkpoint')).load() is None
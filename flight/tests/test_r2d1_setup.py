@@ -0,0 +1,157 @@
+import os
+
+import pytest
+from machine import Pin
+
+from code.comms.checkpoint import Checkpoint
+from code.comms.logger import Logger
+from tuppersat import r2d1 as r2d1_module
+from tuppersat.r2d1 import R2D1
+from tuppersat.schema import csv_header
+
+
+class Card:
+    """The SD card, mounted at setup by linking ./data to a directory that survives the reboot."""
+    name = 'sdcard'
+    FIELDS = ()
+
+    def __init__(self, root):
+        self.root = root
+        self.mounted = False
+
+    def setup(self):
+        os.symlink(self.root / 'card', self.root / 'data')
+        self.mounted = True
+
+
+class Sensor:
+    """One sensor delivering every field of the data schema, with the airborne flag of the GPS driver."""
+    name = 'gps'
+    FIELDS = ('hhmmss', 'altitude', 'gps_valid', 'uva', 'uvb', 'humidity', 'temperature')
+
+    def __init__(self):
+        self.airborne = False
+        self.airborne_at_setup = None
+
+    def setup(self):
+        self.airborne_at_setup = self.airborne
+
+
+class NoRadio:
+    def setup(self):
+        return None
+
+
+@pytest.fixture
+def flight(tmp_path, monkeypatch):
+    """Returns a function that powers on R2D1, with the flight paths under /data kept on the card."""
+    (tmp_path / 'card').mkdir()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(r2d1_module, 'Radio', NoRadio)
+    headers = []
+
+    def on_card(write):
+        def write_on_card(filename, *args):
+            assert card.mounted, f'{filename} written before the card is mounted'
+            headers.append(filename)
+            write(str(tmp_path) + filename, *args)
+        return write_on_card
+
+    monkeypatch.setattr(r2d1_module, 'write_header', on_card(r2d1_module.write_header))
+    monkeypatch.setattr(r2d1_module, 'write_header_line', on_card(r2d1_module.write_header_line))
+
+    def power_on(clear=False, storage_format='CSV'):
+        nonlocal card
+        if os.path.islink(tmp_path / 'data'):
+            os.remove(tmp_path / 'data') # the reboot unmounts the card
+        card = Card(tmp_path)
+        sensor = Sensor()
+        r2d1 = R2D1(data={'sensors': [sensor], 'specified_format': 'R2D1', 'transmit_time': 24,
+                          'specified_storage_format': storage_format},
+                    storage={'sensors': [card], 'store': False})
+        r2d1.logger = Logger(filename='data/logs.log')
+        r2d1.checkpoint = Checkpoint(filename='data/checkpoint')
+        # held low by the jumper of main.py
+        r2d1.clear_pin = Pin(22, Pin.IN, Pin.PULL_UP)
+        r2d1.clear_pin.value(0 if clear else 1)
+        r2d1.setup()
+        return r2d1, sensor
+
+    card = None
+    power_on.headers = headers
+    power_on.root = tmp_path
+    return power_on
+
+
+def test_cold_start(flight):
+    r2d1, sensor = flight()
+
+    assert r2d1.resumed is None
+    assert sensor.airborne_at_setup is False
+    assert r2d1.store_count['data'] == 0
+
+
+def test_warm_restart_resumes_from_the_card(flight):
+    r2d1, sensor = flight()
+    sensor.airborne = True
+    r2d1.store_count['data'] = 7
+    r2d1.packet_count['data'] = 29
+    r2d1.frame_tags['data'] = 4
+    r2d1.checkpoint.save(r2d1.checkpoint_state())
+
+    r2d1, sensor = flight()
+
+    assert r2d1.resumed['resets'] == 1
+    # the checkpoint is read after the card is mounted and before the GPS is configured
+    assert sensor.airborne_at_setup is True
+    assert (r2d1.store_count['data'], r2d1.packet_count['data'], r2d1.frame_tags['data']) == (7, 29, 4)
+
+
+def test_clear_pin_starts_over(flight):
+    r2d1, sensor = flight()
+    r2d1.checkpoint.save(r2d1.checkpoint_state())
+
+    r2d1, sensor = flight(clear=True)
+
+    assert r2d1.resumed is None
+    assert not [name for name in os.listdir(flight.root / 'card') if name.startswith('checkpoint')]
+
+
+def store(r2d1, **values):
+    """Stores one data record through the encoders of R2D1, to the file on the card."""
+    record = r2d1.generated_packets['data']
+    for name, value in values.items():
+        record.values[record.index[name]] = value
+    filename = r2d1.filenames['data'].lstrip('/')
+    with open(filename, 'ab' if filename.endswith('.bin') else 'a') as file:
+        r2d1.files = {'data': file}
+        r2d1.change_dict_format(['data'])
+        r2d1.store(['data'])
+
+
+def test_binary_records_append_across_reboots(flight):
+    records = pytest.importorskip('tuppersat.tools.records')
+    for boot in range(2):
+        r2d1, sensor = flight(storage_format='BINARY')
+        store(r2d1, altitude=100.0 + boot)
+        r2d1.checkpoint.save(r2d1.checkpoint_state())
+
+    rows = records.load(flight.root / 'card' / 'data.bin')
+
+    assert flight.headers == ['/data/data.bin', '/data/data.bin']
+    assert list(rows['store_count']) == [0, 1]
+    assert list(rows['altitude']) == [100.0, 101.0]
+
+
+def test_csv_header_is_written_once_on_the_card(flight):
+    for boot in range(2):
+        r2d1, sensor = flight()
+        store(r2d1, altitude=100.0 + boot)
+        r2d1.checkpoint.save(r2d1.checkpoint_state())
+
+    lines = (flight.root / 'card' / 'data.csv').read_text().splitlines()
+
+    assert lines[0] == csv_header('data')
+    rows = [dict(zip(lines[0].split(','), line.split(','))) for line in lines[1:]]
+    assert all(len(row) == len(lines[0].split(',')) for row in rows)
+    assert [(row['store_count'], row['altitude']) for row in rows] == [('0', '100.0'), ('1', '101.0')]
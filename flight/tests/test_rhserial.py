@@ -0,0 +1,43 @@
+import pytest
+
+from tuppersat.rhserial import RXHandler, pack_message, pack_message_into, unpack_message
+
+MESSAGES = [
+    (b'D|R2D1    |plain payload', 0x15, 0x01, 7),
+    (b'\x10 escaped \x10\x10 twice', 0x15, 0x01, 7),
+    # an escape byte in the header is stuffed too
+    (b'payload', 0x10, 0x01, 0x10),
+    (b'', 0x15, 0x01, 255),
+]
+
+
+@pytest.mark.parametrize('msgbytes, msgto, msgfrom, msgid', MESSAGES)
+def test_matches_pack_message(msgbytes, msgto, msgfrom, msgid):
+    buffer = bytearray(b'\xff' * 300)
+
+    length = pack_message_into(buffer, 5, msgbytes, msgto, msgfrom, msgid)
+
+    assert bytes(buffer[5:5 + length]) == pack_message(msgbytes, msgto, msgfrom, msgid)
+    # nothing outside the packet is touched
+    assert buffer[:5] == b'\xff' * 5 and buffer[5 + length:] == b'\xff' * (295 - length)
+
+
+@pytest.mark.parametrize('msgbytes, msgto, msgfrom, msgid', MESSAGES)
+def test_round_trip(msgbytes, msgto, msgfrom, msgid):
+    buffer = bytearray(300)
+    received = []
+    handler = RXHandler(received.append)
+
+    for byte in buffer[:pack_message_into(buffer, 0, msgbytes, msgto, msgfrom, msgid)]:
+        handler(bytes([byte]))
+
+    message = unpack_message(received[0])
+    assert (message['message'], message['to'], message['from'], message['id']) == (msgbytes, msgto, msgfrom, msgid)
+
+
+def test_too_long_for_the_buffer():
+    length = len(pack_message(b'\x10' * 10, 0x15, 0x01, 7))
+
+    with pytest.raises(ValueError):
+        pack_message_into(bytearray(length + 3), 4, b'\x10' * 10, 0x15, 0x01, 7)
+    assert pack_message_into(bytearray(length + 4), 4, b'\x10' * 10, 0x15, 0x01, 7) == length
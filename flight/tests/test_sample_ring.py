@@ -0,0 +1,118 @@
+import contextlib
+from array import array
+
+from code.comms.sample_record import SampleRecord
+from tuppersat.dual_core import DualCore, SampleRing
+
+
+def test_wraps_around_in_order():
+    ring = SampleRing(3, capacity=4)
+    out = (array('d', [0.0, 0.0]), array('d', [0.0]))
+    for n in range(10):
+        # one slot ahead of the consumer, the slots are reused every 4 pushes
+        assert ring.push((array('d', [n, n + 0.5]), array('d', [-n])))
+        assert ring.push((array('d', [n + 100, 0]), array('d', [0])))
+        assert ring.pop_into(out)
+        assert (list(out[0]), list(out[1])) == ([n, n + 0.5], [-n])
+        assert ring.pop_into(out)
+    assert not ring.pop_into(out)
+    assert len(ring) == 0 and ring.head == 20
+
+
+def test_full_ring_drops_and_counts():
+    ring = SampleRing(1, capacity=2)
+    assert ring.push(([1.0],)) and ring.push(([2.0],))
+
+    assert not ring.push(([3.0],))
+
+    out = (array('d', [0.0]),)
+    assert ring.overflows == 1
+    assert ring.pop_into(out) and out[0][0] == 1.0
+    assert ring.push(([4.0],))
+    assert ring.pop_into(out) and out[0][0] == 2.0
+    assert ring.pop_into(out) and out[0][0] == 4.0
+
+
+def test_high_water():
+    ring = SampleRing(1, capacity=8)
+    for n in range(5):
+        ring.push(([n],))
+    out = (array('d', [0.0]),)
+    for n in range(5):
+        ring.pop_into(out)
+    ring.push(([0],))
+
+    assert ring.high_water == 5
+
+
+class Logger:
+    def use_lock(self):
+        pass
+
+
+class Flight:
+    """The R2D1 calls DualCore makes, sampling an increasing value into group 'a' and every third one into 'b'."""
+
+    def __init__(self):
+        self.logger = Logger()
+        self.generated_packets = {'a': SampleRecord(('time', 'x')), 'b': SampleRecord(('time', 'y'))}
+        self.can_idle = True
+        self.samples = 0
+        self.processed = []
+
+    def setup(self):
+        pass
+
+    def apply_rates(self):
+        pass
+
+    def time_since_epoch(self):
+        return 0.0
+
+    def sample(self, records):
+        self.samples += 1
+        records['a'].values[1] = self.samples
+        records['a'].fresh = True
+        records['b'].fresh = self.samples % 3 == 0
+        if records['b'].fresh:
+            records['b'].values[1] = self.samples
+        return 1
+
+    def account(self):
+        pass
+
+    def open_files(self):
+        return contextlib.nullcontext({})
+
+    def process(self):
+        self.processed.append({group: (record.get(record.fields[1]), record.fresh)
+                               for group, record in self.generated_packets.items()})
+
+
+def test_records_and_freshness_reach_the_consumer():
+    flight = Flight()
+    dual_core = DualCore(flight, capacity=8, report_interval_ms=None)
+    dual_core.setup()
+
+    for n in range(6):
+        dual_core.produce()
+        dual_core.consume()
+
+    assert [processed['a'] for processed in flight.processed] == [(n, True) for n in range(1, 7)]
+    assert [processed['b'][1] for processed in flight.processed] == [False, False, True, False, False, True]
+    assert flight.processed[5]['b'][0] == 6
+
+
+def test_producer_halves_its_rate_above_high_water():
+    flight = Flight()
+    dual_core = DualCore(flight, capacity=8, high_water=4, report_interval_ms=None)
+    dual_core.setup()
+
+    pushed = sum(dual_core.produce() for n in range(12))
+
+    # 4 pushed before high water, then every other sample of the remaining 8
+    assert pushed == 8 and dual_core.throttled == 4
+    assert dual_core.ring.overflows == 0
+    while dual_core.consume():
+        pass
+    assert [processed['a'][0] for processed in flight.processed] == [1, 2, 3, 4, 6, 8, 10, 12]
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from code.comms.sample_record import compile_record
+from code.sensors.sampler import Sampled
+from tuppersat.r2d1 import R2D1
+
+
+class Counter:
+    """A sensor whose reading counts its reads."""
+
+    def __init__(self, name):
+        self.name = name
+        self.FIELDS = (name,)
+        self.reads = 0
+
+    def setup(self):
+        pass
+
+    def read(self):
+        self.reads += 1
+        return {self.name: self.reads}
+
+    def read_into(self, record, offset, sample=None):
+        if sample is None:
+            sample = self.read()
+        record.values[offset] = sample[self.name]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0]
+    monkeypatch.setattr(time, 'ticks_ms', lambda: now[0])
+    return now
+
+
+def test_groups_are_fresh_only_when_their_sensors_sampled(clock):
+    fast, slow = Sampled(Counter('fast'), rate=10), Sampled(Counter('slow'), rate=2)
+    groups = {'fast': {'sensors': [fast.subscribe()]}, 'slow': {'sensors': [slow.subscribe()]},
+              'plain': {'sensors': [Counter('plain')]}}
+    r2d1 = R2D1(**groups)
+    r2d1.generated_packets = {group: compile_record(info['sensors']) for group, info in groups.items()}
+
+    fresh = []
+    for clock[0] in range(0, 1000, 50):
+        r2d1.sample(r2d1.generated_packets)
+        fresh.append(r2d1.fresh_groups())
+
+    # plain sensors are read on every cycle
+    assert fresh[:4] == [['fast', 'slow', 'plain'], ['plain'], ['fast', 'plain'], ['plain']]
+    assert fresh[10:12] == [['fast', 'slow', 'plain'], ['plain']]
+    assert sum('fast' in groups for groups in fresh) == 10
+    assert sum('slow' in groups for groups in fresh) == 2
+    assert (fast.sensor.reads, slow.sensor.reads) == (10, 2)
+
+
+def test_subscription_is_fresh_until_read():
+    source = Sampled(Counter('value'), rate=1)
+    subscription = source.subscribe()
+
+    assert not subscription.fresh
+    source.poll(now=0)
+    assert subscription.fresh
+    assert subscription.read() == {'value': 1}
+    assert not subscription.fresh
+    # not due again, the group keeps the last sample but has nothing new
+    source.poll(now=500)
+    assert not subscription.fresh and subscription.read() == {'value': 1}
@@ -0,0 +1,46 @@
+import pytest
+
+from code.comms.packets import compile_row, compile_telemetry, compile_text
+from code.comms.sample_record import SampleRecord
+from tuppersat.radio._packet_utils import TELEMETRY_LAYOUT, TelemetryPacket
+from tuppersat.schema import GROUPS, csv_header, packet_layout, storage_fields
+
+
+def record(group):
+    """A record holding every source of the group's schema, filled with 1.0."""
+    record = SampleRecord(dict.fromkeys(field[1] for field in GROUPS[group]))
+    for i in range(len(record.values)):
+        record.values[i] = 1.0
+    return record
+
+
+@pytest.mark.parametrize('group', sorted(GROUPS))
+def test_row_and_text_match_the_header(group):
+    filled = record(group)
+    columns = csv_header(group).split(',')
+
+    row = compile_row(group, filled)(filled.values)
+    text = compile_text(group, filled)(filled.values)
+
+    assert columns == [name for name, field_type in storage_fields(group)]
+    # the store count is added by R2D1.store
+    assert len(row) == len(columns) - 1
+    assert len(text.split(',')) == len(columns) - 1
+
+
+def test_missing_source_fails_at_compile_time():
+    with pytest.raises(KeyError):
+        compile_row('data', SampleRecord(('time', 'altitude')))
+
+
+def test_telemetry_fills_every_packet_field():
+    filled = record('telemetry')
+    # an HHMMSS source, formatted as a time
+    filled.values[filled.index['hhmmss']] = 123456
+
+    fields = compile_telemetry(filled)(filled.values)
+    packet = TelemetryPacket('R2D1', 7, **fields)
+
+    assert list(fields) == [name for name, width, fmt_spec in packet_layout()]
+    assert packet.startswith(b'T|R2D1    |00007|123456|')
+    assert len(packet) == len('T|') + sum(width + 1 for name, width, fmt_spec in TELEMETRY_LAYOUT) - 1
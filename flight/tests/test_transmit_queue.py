@@ -0,0 +1,63 @@
+from code.comms.transmit_queue import TransmitQueue
+
+
+def drain(queue, now):
+    sent = []
+    while True:
+        frame = queue.pop(now)
+        if frame is None:
+            return sent
+        sent.append(frame)
+
+
+def test_priority_then_freshest_first():
+    queue = TransmitQueue()
+    queue.push('data', 'd1', sample_time=1, deadline=100, priority=1)
+    queue.push('telemetry', 't1', sample_time=1, deadline=100)
+    queue.push('telemetry', 't2', sample_time=2, deadline=100)
+    queue.push('data', 'd2', sample_time=3, deadline=100, priority=1)
+
+    assert drain(queue, 5) == [('telemetry', 't2'), ('telemetry', 't1'), ('data', 'd2'), ('data', 'd1')]
+    assert queue.stats()['max_latency'] == 4
+
+
+def test_full_queue_evicts_the_oldest_of_the_same_group():
+    queue = TransmitQueue(maxlen=3)
+    queue.push('telemetry', 't1', sample_time=0, deadline=100)
+    for n in range(1, 5):
+        queue.push('data', f'd{n}', sample_time=n, deadline=100)
+
+    assert queue.evicted == 2
+    assert sorted(drain(queue, 5)) == [('data', 'd3'), ('data', 'd4'), ('telemetry', 't1')]
+
+
+def test_full_queue_of_other_groups_evicts_the_oldest():
+    queue = TransmitQueue(maxlen=2)
+    queue.push('data', 'd1', sample_time=1, deadline=100)
+    queue.push('data', 'd2', sample_time=2, deadline=100)
+
+    queue.push('telemetry', 't1', sample_time=3, deadline=100)
+
+    assert sorted(drain(queue, 5)) == [('data', 'd2'), ('telemetry', 't1')]
+
+
+def test_expired_frames_are_dropped():
+    queue = TransmitQueue()
+    queue.push('data', 'd1', sample_time=0, deadline=10)
+    queue.push('data', 'd2', sample_time=5, deadline=20)
+
+    assert queue.peek(15, 'telemetry') is None
+    assert drain(queue, 15) == [('data', 'd2')]
+    assert queue.expired == 1
+    assert queue.pop(30) is None
+
+
+def test_repeated_packet_is_suppressed():
+    queue = TransmitQueue()
+
+    assert queue.push('data', 'd1', sample_time=0, deadline=10)
+    assert not queue.push('data', 'd1', sample_time=1, deadline=11)
+    assert queue.push('telemetry', 'd1', sample_time=1, deadline=11)
+
+    assert queue.duplicates == 1 and len(queue) == 2
+    assert queue.pending('data') and not queue.pending('other')
@@ -0,0 +1,209 @@
+"""tuppersat.dual_core
+
+Optional split of the R2D1 cycle over the two RP2040 cores. Core 0 (the main
+thread) only samples the sensors, R2D1.sample, and pushes the group records
+into a SampleRing. Core 1 (a _thread) takes them off the ring and does the
+rest of the cycle, R2D1.account and R2D1.process: formatting, storage and
+transmit. A slow SD write or radio frame then delays the next stored row,
+not the next sensor sample.
+
+The ring is single producer, single consumer and lock-free: only core 0
+writes `head` and only core 1 writes `tail`, each after the slot it covers
+is written or read.
+
+Back-pressure: above `high_water` queued slots the producer pushes only
+every other sample (counted in `throttled`), and a sample that finds the
+ring full is dropped (counted in the ring's `overflows`).
+
+Core 0 owns the sensors, I2C and the GPS UART, core 1 the SD card, the
+radio and the files. The logger is written from both and is guarded by a
+lock (Logger.use_lock). A flight phase change found on core 1 only posts
+its sample rates, core 0 applies them before its next sample
+(R2D1.apply_rates), so the sensor schedules are only changed by the core
+polling them.
+
+Usage, in place of r2d1.start():
+
+    from tuppersat.dual_core import DualCore
+    DualCore(r2d1).start()
+
+tuppersat.tools.pipeline runs DualCore itself on CPython threads, with an
+R2D1 stand-in that simulates the sensor, SD card and radio timings.
+
+"""
+
+# standard library imports
+import time
+from array import array
+
+# the flight modules are imported where they are used, so tuppersat.tools can run DualCore on CPython
+
+
+class SampleRing:
+    """Fixed size single producer, single consumer ring of float records.
+
+    Parameters
+    ----------
+    width : int
+        Values per slot.
+    capacity : int, optional
+        Number of slots. Defaults to 16.
+    """
+
+    def __init__(self, width, capacity=16):
+        self.width = width
+        self.capacity = capacity
+        self.buffer = array('d', [0.0] * (width * capacity))
+        self.head = 0 # slots pushed, only changed by the producer
+        self.tail = 0 # slots popped, only changed by the consumer
+        self.overflows = 0
+        self.high_water = 0
+
+    def __len__(self):
+        return self.head - self.tail
+
+    def push(self, parts):
+        """Copies the arrays in parts one after the other into the next slot and publishes it.
+
+        Returns False, counting an overflow, if the ring is full.
+        """
+        depth = self.head - self.tail
+        if depth >= self.capacity:
+            self.overflows += 1
+            return False
+        buffer = self.buffer
+        i = (self.head % self.capacity) * self.width
+        for part in parts:
+            for value in part:
+                buffer[i] = value
+                i += 1
+        # published only once the slot is complete
+        self.head += 1
+        if depth >= self.high_water:
+            self.high_water = depth + 1
+        return True
+
+    def pop_into(self, parts):
+        """Copies the oldest slot into the arrays in parts and frees it. Returns False if the ring is empty."""
+        if self.head == self.tail:
+            return False
+        buffer = self.buffer
+        i = (self.tail % self.capacity) * self.width
+        for part in parts:
+            for j in range(len(part)):
+                part[j] = buffer[i]
+                i += 1
+        self.tail += 1
+        return True
+
+
+class DualCore:
+    """Runs the sampling of an R2D1 on core 0 and the rest of its cycle on core 1.
+
+    Parameters
+    ----------
+    r2d1 : R2D1
+        The configured, not yet started, flight computer.
+    capacity : int, optional
+        Slots in the ring. Defaults to 16.
+    high_water : int, optional
+        Depth above which the producer halves its push rate. Defaults to 3/4 of capacity.
+    report_interval_ms : int, optional
+        Interval of the DUAL_CORE log event, None turns it off. Defaults to 60000.
+    """
+
+    def __init__(self, r2d1, capacity=16, high_water=None, report_interval_ms=60000):
+        self.r2d1 = r2d1
+        self.capacity = capacity
+        self.high_water = capacity * 3 // 4 if high_water is None else high_water
+        self.report_interval_ms = report_interval_ms
+        self.ring = None
+        self.samples = {}
+        self.throttled = 0
+        self.latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self._skip = False
+        self._last_report = None
+
+    def setup(self):
+        """Sets the R2D1 up and allocates the producer records and the ring."""
+        self.r2d1.logger.use_lock()
+        self.r2d1.defer_rates = True
+        self.r2d1.setup()
+        records = self.r2d1.generated_packets
+        # core 0 fills its own records, core 1 works on the R2D1's, the ring carries one of each per slot
+        self.samples = {group: type(record)(record.fields, record.sensor_offsets) for group, record in records.items()}
+        # SampleRecord.fresh of every group travels as one more part of the slot
+        self._producer_fresh = array('d', [0.0] * len(records))
+        self._consumer_fresh = array('d', [0.0] * len(records))
+        self._producer_parts = [self.samples[group].values for group in records] + [self._producer_fresh]
+        self._consumer_parts = [records[group].values for group in records] + [self._consumer_fresh]
+        self.ring = SampleRing(sum(len(record.fields) for record in records.values()) + len(records), self.capacity)
+
+    def produce(self):
+        """Core 0 step, samples the due sensors and queues the records. Returns True if a slot was pushed."""
+        self.r2d1.apply_rates()
+        # groups with plain sensors are read on every cycle, see R2D1.can_idle
+        if not self.r2d1.sample(self.samples) and self.r2d1.can_idle:
+            return False
+        if len(self.ring) >= self.high_water:
+            self._skip = not self._skip
+        else:
+            self._skip = False
+        if self._skip:
+            self.throttled += 1
+            return False
+        for i, record in enumerate(self.samples.values()):
+            self._producer_fresh[i] = record.fresh
+        return self.ring.push(self._producer_parts)
+
+    def consume(self):
+        """Core 1 step, runs the rest of the cycle on the oldest queued records. Returns False if none."""
+        r2d1 = self.r2d1
+        if not self.ring.pop_into(self._consumer_parts):
+            return False
+        for i, record in enumerate(r2d1.generated_packets.values()):
+            record.fresh = bool(self._consumer_fresh[i])
+        r2d1.account()
+        with r2d1.open_files() as r2d1.files:
+            r2d1.process()
+        # mission time of the sample is the first value of every record
+        self.latency_ms = (r2d1.time_since_epoch() - self._consumer_parts[0][0]) * 1000
+        self.max_latency_ms = max(self.max_latency_ms, self.latency_ms)
+        self.maybe_report()
+        return True
+
+    def maybe_report(self):
+        if self.report_interval_ms is None:
+            return
+        now = time.ticks_ms()
+        if self._last_report is None:
+            self._last_report = now
+        if time.ticks_diff(now, self._last_report) < self.report_interval_ms:
+            return
+        from code.comms import events
+        self._last_report = now
+        self.r2d1.logger.event(events.DUAL_CORE, self.r2d1.time_since_epoch(), len(self.ring), self.ring.high_water,
+                               self.ring.overflows, self.throttled, round(self.max_latency_ms, 1))
+        self.max_latency_ms = 0.0
+
+    def run_consumer(self):
+        while True:
+            if not self.consume():
+                self.r2d1.service_radio()
+                time.sleep_ms(1)
+
+    def start(self):
+        import _thread
+        self.setup()
+        r2d1 = self.r2d1
+        # the first cycle runs whole on core 0, as in R2D1.start, before the cores split
+        with r2d1.open_files() as r2d1.files:
+            r2d1.sequence()
+        r2d1.boot_profiler.mark('first sample')
+        r2d1.boot_profiler.report()
+        _thread.start_new_thread(self.run_consumer, ())
+        sampler = self.r2d1.sampler
+        while True:
+            self.produce()
+            time.sleep_ms(sampler.next_due_ms())
@@ -0,0 +1,97 @@
+"""tuppersat.gps_parsing
+
+Parsing of the uBlox GPS output, shared by the flight driver
+(code.gps.gps and code.gps.ubx) and the ground benchmark
+(tuppersat.tools.gpsbench), so the benchmark times the code that flies.
+
+Nothing here touches the UART: the functions take the bytes of one NMEA
+line or one UBX message and return plain values.
+
+NAV-PVT is 84 bytes on the u-blox 7 and 92 bytes on the u-blox 8 and later.
+Only the first 78 bytes, which are the same on both, are unpacked.
+
+"""
+
+# standard library imports
+import struct
+
+NAV_PVT = b'\x01\x07'
+
+# iTOW, year, month, day, hour, min, sec, valid, tAcc, nano, fixType, flags, flags2, numSV,
+# lon, lat, height, hMSL, hAcc, vAcc, velN, velE, velD, gSpeed, headMot, sAcc, headAcc, pDOP
+NAV_PVT_FORMAT = '<IHBBBBBBIiBBBBiiiiIIiiiiiIIH'
+NAV_PVT_SIZE = 78
+NAV_PVT_MIN_LENGTH = 84
+
+# valid flags and fix types
+VALID_TIME = 0x02
+FIX_3D = 3
+
+
+def parse_nav_pvt(message):
+    """Unpacks a NAV-PVT message (with header and checksum) into a dictionary of integers.
+
+    Returns None if the message is not NAV-PVT.
+    """
+    if message[2:4] != NAV_PVT or len(message) < NAV_PVT_MIN_LENGTH + 8:
+        return None
+    (itow, year, month, day, hour, minute, second, valid, t_acc, nano, fix_type, flags, flags2, num_sv,
+     lon, lat, height, h_msl, h_acc, v_acc, vel_n, vel_e, vel_d, g_speed, head_mot, s_acc, head_acc,
+     p_dop) = struct.unpack_from(NAV_PVT_FORMAT, message, 6)
+    return {
+        'hhmmss': hour * 10000 + minute * 100 + second,
+        'valid_time': bool(valid & VALID_TIME),
+        'fix_type': fix_type,
+        'num_sv': num_sv,
+        'lat': lat,         # 1e-7 degrees
+        'lon': lon,         # 1e-7 degrees
+        'alt': h_msl,       # mm above mean sea level
+        'h_acc': h_acc,     # mm
+        'v_acc': v_acc,     # mm
+        'vel_d': vel_d,     # mm/s, positive down
+        'p_dop': p_dop,     # 0.01
+    }
+
+
+def gga_fields(line):
+    """Returns the fields of a complete $GPGGA line (bytes) with a fix, None for any other line.
+
+    Raises UnicodeError if the line is not text.
+    """
+    fields = line.decode().split(',')
+    # fix quality 0 is no fix, its position fields are empty
+    if fields[0] == '$GPGGA' and len(fields) == 15 and fields[6] != '0':
+        return fields
+    return None
+
+
+def decimal_degree(dddmm_mm):
+    """Converts NMEA 'ddmm.mmmmmN' or 'dddmm.mmmmmE' to signed decimal degrees.
+
+    Raises ValueError if the field is empty or malformed.
+    """
+    if len(dddmm_mm) == 12:
+        ddd = float(dddmm_mm[0:3])
+        mm_mm = float(dddmm_mm[3:-2])/60
+    else:
+        ddd = float(dddmm_mm[0:2])
+        mm_mm = float(dddmm_mm[2:-2])/60
+    if dddmm_mm[-1] == 'N' or dddmm_mm[-1] == 'E':
+        return ddd+mm_mm
+    return -(ddd+mm_mm)
+
+
+def gga_fix(fields, degrees=decimal_degree):
+    """Returns the fix dictionary of the GPS driver for the fields of a $GPGGA line.
+
+    degrees converts the latitude and longitude, a replacement may return None
+    for a bad field, in which case the whole fix is None.
+    """
+    fix = {'hhmmss': fields[1],
+           'latitude': degrees(fields[2]+fields[3]),
+           'longitude': degrees(fields[4]+fields[5]),
+           'altitude': fields[9],
+           'hdop': fields[11]}
+    if fix['latitude'] is None or fix['longitude'] is None:
+        return None
+    return fix
@@ -1,38 +1,44 @@
 # uPython imports
-from machine import UART, Pin, Timer
+from machine import Pin
 
 # tuppersat imports
-# radio imports
-from tuppersat.radio import TupperSatRadio
-
-# sensor imports 
-from code.sensors.pressure import Pressure
-from code.sensors.temperature import Temperature
-from code.sensors.uv import UV
-from code.sensors.humidity import Humidity
-from code.sensors.sdcard import SDCard
+# sensor imports, the drivers themselves are imported by whoever configures them
+from code.sensors.sampler import Sampler, Subscription, sensor_name, driver
 
 # communication imports
-from code.comms.write_to_csv import CSV
 from code.comms.radio import Radio
-from code.comms.packets import package_it, put_in_dict, generated_to_required
-from code.comms.write_to_files import MultiFileWriter
+from code.comms.packets import put_in_dict, package_stats, DATA_STAT_FIELDS
+from code.comms.packets import compile_packet, compile_row, compile_text, compile_select, storage_fields
+from code.comms.binary_store import record_format, write_header
+from code.comms.window_stats import WindowStats
+from code.comms.sample_record import compile_record
+from code.comms.transmit_queue import TransmitQueue
+from code.comms.logger import default_logger
+from code.comms import events
+from code.comms.write_to_files import MultiFileWriter, write_header_line
 from code.comms.time_keeper import time_since_epoch
-from code.comms.transmit import transmit as trans
-
-# gps imports
-from code.gps.gps import GPS
+from code.comms.transmit import transmit as trans, frame_bytes, TAG_MODULO
+from code.comms.boot_profile import boot_profiler
+from code.comms.checkpoint import Checkpoint
+from code.comms.flight_phase import FlightPhase, PHASE_NAMES
+from code.comms.idle import Idle
+from tuppersat.schema import csv_header
 
 # standard library imports
-from collections import namedtuple
+import struct
 import time
 
+# ms to write one FIFO sized chunk of a queued radio frame, 32 bytes at 38400 baud
+TX_CHUNK_MS = 8
+
+# default radio bytes one group may send per transmit slot, about 130 ms at 38400 baud
+BURST_BYTES = 512
+
 
 class R2D1():
     def __init__(self, **grouped_sensors) -> None:
         self.grouped_sensors = grouped_sensors
-        self.generated_packets = {}
-        self.generated_named_tuple = {}
+        self.generated_packets = {} # one SampleRecord per group, refilled in place every read
         self.filenames = {}
         self.cached_data_length = 0
         self.send_packets = {}
@@ -43,140 +49,458 @@ class R2D1():
         self.last_transmit = {}
         self.mem_packets = {}
         self.packet_count = {}
+        self.frame_tags = {} # next sequence tag per group, given to frames as they are sent
         self.packet_rate = {}
         self.write_packets = {}
         self.store_count = {}
         self.organised_packets = {}
         self.useful_packets = {} # these packs have atleast 1 telemetry packet or 4 data packets
+        self.window_stats = {} # groups using the 'R2D1_STATS' format summarise every sample between transmits
+        self.transmit_queue = TransmitQueue()
+        self.record_formats = {} # struct format of groups with 'specified_storage_format': 'BINARY'
+        # encoders generated from tuppersat.schema in init_packet, called with the record values every cycle
+        self.packet_encoders = {}
+        self.store_encoders = {}
+        self.stat_selectors = {}
         self.log_method = print 
+        self.logger = default_logger
+        # binary text records are stamped with the mission time, like the events
+        self.logger.clock = self.time_since_epoch
+        self.boot_profiler = boot_profiler
+        self.checkpoint = Checkpoint()
+        self.resumed = None # checkpoint state after a warm restart, None on a cold start
+        self.clear_pin = None # Pin read at setup, held low it clears the checkpoint for a cold start
+        # groups may retune transmit_time, store_length and sample_rates per flight phase with 'phase_profiles'
+        self.flight_phase = FlightPhase()
+        self.base_profiles = {}
+        self.phase_input = None # (values, altitude offset, pressure offset) of the record the phase is detected from
+        # with sampling on the other core (tuppersat.dual_core) a phase change only posts its sample rates
+        # here, the sampling core applies them with apply_rates
+        self.defer_rates = False
+        self.pending_rates = None
+        self._applied_rates = None
+        self.idle = Idle() # replace before start, e.g. Idle(mode='lightsleep')
+        self.tx_callbacks = {} # per group, called by the radio once a queued frame is written
+        self.tx_stats = {}
+        # sensors wrapped in Sampled are read at their own rate by the sampler, groups read their subscriptions
+        self.sampler = Sampler(sensor.source for sensors_info in grouped_sensors.values()
+                               for sensor in sensors_info.get('sensors', []) if isinstance(sensor, Subscription))
 
     def setup(self):
-        with open('data/logs.log', 'a') as self.logging:
-            self.logging.write(f'------Mission Start------\n')
-            self.logging.write(f'Start Time - {self.epoch}\n')
-            for group, sensors_info in self.grouped_sensors.items():
-                if sensors_info.get('store', True):
+        # the groups that are not stored (the SD card) mount /data, which the checkpoint and the stored files
+        # live on, so they are set up first, the checkpoint is resumed before the GPS is configured
+        mounts = [group for group, sensors_info in self.grouped_sensors.items() if not sensors_info.get('store', True)]
+        for group in mounts:
+            self.setup_group(group)
+        self.load_checkpoint()
+        for group, sensors_info in self.grouped_sensors.items():
+            if sensors_info.get('store', True):
+                if sensors_info.get('specified_storage_format', 'CSV').lower() == 'binary':
+                    self.filenames[group] = f'/data/{group}.bin'
+                else:
                     self.filenames[group] = f'/data/{group}.csv'
-                # self.filenames.append(f'/data/{group}.txt')
-                setups = [sensor.setup() for sensor in sensors_info.get('sensors')]
-                self.logging.write(f"{self.time_since_epoch():9} > SETUP    > {group.upper():9} > {', '.join([str(sensor).split()[0][1:] for sensor in sensors_info.get('sensors')])}\n")
-            self.radio = Radio().setup()
-            self.logging.write(f"{self.time_since_epoch():9} > SETUP    > Radio\n")
-            self.init_packet()
-            self.logging.write(f"{self.time_since_epoch():9} > SETUP    > Created empty packets\n")
+            # self.filenames.append(f'/data/{group}.txt')
+            if group not in mounts:
+                self.setup_group(group)
+        self.write_headers()
+        self.radio = self.boot_profiler.timed('radio', Radio().setup)
+        self.logger.event(events.SETUP_RADIO, self.time_since_epoch())
+        self.init_packet()
+        if self.resumed:
+            self.restore_counters(self.resumed)
+        self.logger.event(events.SETUP_PACKETS, self.time_since_epoch())
+        self.logger.flush()
+
+    def setup_group(self, group):
+        """Sets up the sensors of group, each timed by the boot profiler."""
+        sensors = self.grouped_sensors[group].get('sensors')
+        for sensor in sensors:
+            self.boot_profiler.timed(f'{group}.{sensor_name(sensor)}', sensor.setup)
+        self.logger.event(events.SETUP_GROUP, self.time_since_epoch(), group.upper(), ', '.join([sensor_name(sensor) for sensor in sensors]))
+
+    def write_headers(self):
+        """Writes the header of every new file, once all sensors and with them the SD card are set up.
+
+        tuppersat.tools.records recovers the record layout of a binary file from its header, and
+        tuppersat.tools.ingest checks the header row of a CSV file against the schema.
+        """
+        for group, filename in self.filenames.items():
+            if filename.endswith('.bin'):
+                write_header(filename, storage_fields(group))
+            else:
+                write_header_line(filename, csv_header(group))
+
+    def load_checkpoint(self):
+        """Clears the checkpoint if the clear pin is held low, then resumes from it or starts the mission."""
+        if self.clear_pin is not None and not self.clear_pin.value():
+            self.checkpoint.clear()
+            self.logger.info('CHECKPOINT > cleared, clear pin held at power on\n')
+        self.resumed = self.checkpoint.load()
+        if self.checkpoint.rejected:
+            self.logger.warning(f"CHECKPOINT > {self.checkpoint.rejected['elapsed_ms']} ms into its mission, "
+                                f"too old to resume, cleared\n")
+        if self.resumed:
+            self.resume(self.resumed)
+        else:
+            self.logger.event(events.MISSION_START, 0, self.epoch)
             
     def init_packet(self):
         for group, sensors_info in self.grouped_sensors.items():
             if not sensors_info.get('store', True):
                 del self.grouped_sensors[group]
                 break
-            sensor_group = ['hhmmss'] + [str(sensor).split()[0][1:].lower() for sensor in sensors_info.get('sensors')]
-            self.generated_named_tuple[group] = namedtuple(group, sensor_group)
             self.packet_count[group] = 1
+            self.frame_tags[group] = 0
             self.packet_rate[group] = 1
-            self.generated_packets[group] = []
+            record = self.generated_packets[group] = compile_record(sensors_info.get('sensors'))
+            self.packet_encoders[group] = compile_packet(group, record, sensors_info.get('specified_format', None))
             self.organised_packets[group] = []
             self.useful_packets[group] = []
             self.store_count[group] = 0
             self.write_packets[group] = None
             self.mem_packets[group] = None
             self.last_transmit[group] = self.time_since_epoch()
+            self.tx_stats[group] = {'sent': 0, 'bytes': 0, 'max_latency_ms': 0}
+            self.tx_callbacks[group] = self.tx_callback(group)
+            if sensors_info.get('specified_storage_format', 'CSV').lower() == 'binary':
+                self.record_formats[group] = record_format(storage_fields(group))
+                self.store_encoders[group] = compile_row(group, record)
+            else:
+                self.store_encoders[group] = compile_text(group, record)
+            if sensors_info.get('specified_format', '').lower() == 'r2d1_stats':
+                self.window_stats[group] = WindowStats(DATA_STAT_FIELDS)
+                self.stat_selectors[group] = compile_select(record, DATA_STAT_FIELDS)
+            self.base_profiles[group] = {
+                'transmit_time': sensors_info.get('transmit_time'),
+                'store_length': sensors_info.get('store_length', 1),
+                'sample_rates': {sensor_name(sensor): sensor.source.rate for sensor in sensors_info.get('sensors')
+                                 if isinstance(sensor, Subscription)},
+            }
+            if 'pressure' in record.index or self.phase_input is None and 'altitude' in record.index:
+                self.phase_input = (record.values, record.index.get('altitude'), record.index.get('pressure'))
+        # plain sensors are read on every cycle, a group with one keeps the loop from idling
+        self.can_idle = all(isinstance(sensor, Subscription) for sensors_info in self.grouped_sensors.values()
+                            for sensor in sensors_info.get('sensors'))
         #todo make this dynamic
         # self.last_transmit['data'] = self.time_since_epoch() + self.transmit_time / 2
         # self.last_transmit['telemetry'] = self.time_since_epoch()
     
+    def resume(self, state):
+        """Continues the mission time of a checkpoint and skips GPS configuration that survived the reset."""
+        self.epoch = time.ticks_add(time.ticks_ms(), -state['elapsed_ms'])
+        for sensors_info in self.grouped_sensors.values():
+            for sensor in sensors_info.get('sensors', []):
+                if hasattr(driver(sensor), 'airborne'):
+                    driver(sensor).airborne = state['gps_airborne']
+        self.logger.event(events.RESUME, self.time_since_epoch(), state['resets'], state['gps_airborne'])
+
+    def restore_counters(self, state):
+        """Sets the counters from a checkpoint so packet, store and radio indices stay monotonic."""
+        for group in self.packet_count:
+            self.packet_count[group] = state['packet_count'].get(group, self.packet_count[group])
+            self.store_count[group] = state['store_count'].get(group, self.store_count[group])
+            self.frame_tags[group] = state['frame_tags'].get(group, self.frame_tags[group])
+        if self.radio:
+            self.radio.frame_count.count = state['frame_count']
+            self.radio.telemetry_count.count = state['telemetry_count']
+
+    def checkpoint_state(self):
+        """Returns the state saved by the checkpoint."""
+        return {
+            'elapsed_ms': time.ticks_diff(time.ticks_ms(), self.epoch),
+            'gps_airborne': any(getattr(driver(sensor), 'airborne', False)
+                                for sensors_info in self.grouped_sensors.values()
+                                for sensor in sensors_info.get('sensors', [])),
+            'frame_count': self.radio.frame_count.count if self.radio else 0,
+            'telemetry_count': self.radio.telemetry_count.count if self.radio else 0,
+            'packet_count': self.packet_count,
+            'store_count': self.store_count,
+            'frame_tags': self.frame_tags,
+        }
+
+    def tx_callback(self, group):
+        """Returns the on_sent callback of group's frames, it counts them and logs a SENT event."""
+        stats = self.tx_stats[group]
+        name = group.upper()
+        def on_sent(msgid, length, latency_ms):
+            stats['sent'] += 1
+            stats['bytes'] += length
+            stats['max_latency_ms'] = max(stats['max_latency_ms'], latency_ms)
+            self.logger.event(events.SENT, self.time_since_epoch(), name, msgid, length, latency_ms)
+        return on_sent
+
+    def service_radio(self):
+        """Writes the next chunk of the queued radio frames, if the UART is free."""
+        if self.radio:
+            self.radio.service()
+
+    def update_phase(self):
+        """Feeds the flight phase detector and applies the profile of a new phase."""
+        if self.phase_input is None:
+            return
+        values, altitude, pressure = self.phase_input
+        phase = self.flight_phase.update(self.time_since_epoch(),
+                                         None if altitude is None else values[altitude],
+                                         None if pressure is None else values[pressure])
+        if phase is not None:
+            self.apply_phase(phase)
+
+    def apply_phase(self, phase):
+        """Sets transmit_time, store_length and the sample rates of every group to its profile for phase.
+
+        A group's 'phase_profiles' maps phase names to the settings that differ from the group's own, a phase
+        without an entry goes back to the group's settings. A sensor shared by groups runs at the highest
+        rate any of them asks for.
+        """
+        rates = {}
+        for group, group_info in self.grouped_sensors.items():
+            base = self.base_profiles[group]
+            profile = group_info.get('phase_profiles', {}).get(PHASE_NAMES[phase], {})
+            group_info['transmit_time'] = profile.get('transmit_time', base['transmit_time'])
+            group_info['store_length'] = profile.get('store_length', base['store_length'])
+            for sensor in group_info.get('sensors'):
+                name = sensor_name(sensor)
+                if name in base['sample_rates']:
+                    rate = profile.get('sample_rates', {}).get(name, base['sample_rates'][name])
+                    rates[sensor.source] = max(rate, rates.get(sensor.source, 0))
+        if self.defer_rates:
+            self.pending_rates = rates
+        else:
+            self.set_rates(rates)
+        self.logger.event(events.PHASE, self.time_since_epoch(), PHASE_NAMES[phase].upper(), self.flight_phase.rate)
+
+    def set_rates(self, rates):
+        for source, rate in rates.items():
+            source.set_rate(rate)
+
+    def apply_rates(self):
+        """Applies the sample rates posted by apply_phase, called on the sampling core.
+
+        Only the other core writes `pending_rates` and only this one `_applied_rates`, so no lock is needed.
+        """
+        rates = self.pending_rates
+        if rates is not None and rates is not self._applied_rates:
+            self._applied_rates = rates
+            self.set_rates(rates)
+
     def time_since_epoch(self):
         return time_since_epoch(self.epoch)
     
-    def blink(timer):
-        led.toggle()
+    def blink(self, timer=None):
+        """Toggles the LED, usable as a machine.Timer callback."""
+        self.led.toggle()
     
     def log_info(self, message):
         self.log_method(message)
       
     def read(self):
+        self.sample(self.generated_packets)
+        self.account()
+
+    def sample(self, records):
+        """Polls the sensors and fills records, a SampleRecord per group. Returns the number of sensors read."""
+        taken = self.sampler.poll()
         for group, sensors_info in self.grouped_sensors.items():
-            # self.generated_packets.get(group).time = (time.time()) #TODO change this to ticks
-            _read_from_sensor = [self.time_since_epoch()] + [sensor.read() for sensor in sensors_info.get('sensors')] # read 'read' as read and not read
-            # for sensor in sensors_info.get('sensors'):
-            self.generated_packets[group] = (self.generated_named_tuple[group](*_read_from_sensor))
-            
-            # self.generated_packets[group].append(self.generated_tuple[group](*_read_from_sensor))
+            record = records[group]
+            record.values[0] = self.time_since_epoch()
+            # plain sensors are read on every cycle, so they are always fresh
+            fresh = False
+            for sensor, offset in zip(sensors_info.get('sensors'), record.sensor_offsets):
+                fresh = fresh or getattr(sensor, 'fresh', True)
+                sensor.read_into(record, offset)
+            record.fresh = fresh
+        return taken
+
+    def account(self):
+        """Adds the fresh group records to the window statistics, and the records to the flight phase detector."""
+        for group in self.window_stats:
+            if self.generated_packets[group].fresh:
+                self.window_stats[group].update(self.stat_selectors[group](self.generated_packets[group].values))
+        self.update_phase()
     
-    def change_dict_format(self):
-        for group, group_info in self.grouped_sensors.items():
-            self.organised_packets[group].append(generated_to_required(self.time_since_epoch(),
-                                                                       group, self.generated_packets.get(group),
-                                                                       group_info.get('specified_format', None)))
-            self.write_packets[group] = package_it(self.time_since_epoch(), group, self.generated_packets.get(group))
+    def fresh_groups(self):
+        """Returns the groups whose record holds a new sample, the others have nothing new to store or send."""
+        return [group for group in self.grouped_sensors if self.generated_packets[group].fresh]
+
+    def change_dict_format(self, groups):
+        for group in groups:
+            values = self.generated_packets[group].values
+            self.organised_packets[group].append(self.packet_encoders[group](values))
+            self.write_packets[group] = self.store_encoders[group](values)
             # print(self.write_packets)
     
-    def check_length(self):
-        for group, group_info in self.grouped_sensors.items():
+    def check_length(self, groups):
+        for group in groups:
+            group_info = self.grouped_sensors[group]
             if len(self.organised_packets[group]) >= group_info.get('store_length', 1):
                 self.useful_packets[group] = self.organised_packets.get(group)
                 self.organised_packets[group] = []
         return
     
-    def dict_to_packet(self):
-        for group, group_info in self.grouped_sensors.items():
+    def dict_to_packet(self, groups):
+        for group in groups:
+            group_info = self.grouped_sensors[group]
             if len(self.useful_packets.get(group)) == group_info.get('store_length', 1):
                 self.send_packets[group] = put_in_dict(group, self.useful_packets.get(group))
+                # offered to the queue once, the next packet needs store_length new records
+                self.useful_packets[group] = []
+                if group not in self.window_stats:
+                    self.queue_packet(group, group_info)
                 # self.write_packets[group] = package_it(self.time_since_epoch(), group, self.useful_packets.get(group))
                  # todo look for th bug
         
-    def store(self):
+    def queue_packet(self, group, group_info):
+        """Queues the group's send packet, it goes stale after one transmit_time."""
+        now = self.time_since_epoch()
+        self.transmit_queue.push(group, self.send_packets[group],
+                                 sample_time=now,
+                                 deadline=now + group_info.get('transmit_time'),
+                                 priority=group_info.get('priority', 0))
+
+    def store(self, groups):
      # need to look for an alternate method
-        with open('data/logs.log', 'a') as logs:
-            for group, group_info in self.grouped_sensors.items():
+        for group in groups:
+            if group in self.record_formats:
+                self.files.get(group).write(struct.pack(self.record_formats[group], self.store_count.get(group), *self.write_packets.get(group)))
+            else:
                 self.files.get(group).write(f'{self.store_count.get(group)},{self.write_packets.get(group)}\n')
-                logs.write(f'{self.time_since_epoch():9} > STORE    > {group.upper()}\n')
-                self.store_count[group] += 1
+            self.logger.event(events.STORE, self.time_since_epoch(), group.upper())
+            self.store_count[group] += 1
         self.led.toggle()
         self.led.toggle()
         self.led.toggle()
     
     def transmit(self):
-        with open('data/logs.log', 'a') as logs:
-            for group, group_info in self.grouped_sensors.items():
-                if - self.last_transmit.get(group) + self.time_since_epoch() >= group_info.get('transmit_time'):
-                    trans(self.radio, self.time_since_epoch(),
+        # groups due in the same cycle go out in priority order, each sends up to 'burst' queued frames
+        # within 'burst_bytes', the first one whatever its size
+        for group, group_info in sorted(self.grouped_sensors.items(), key=lambda item: item[1].get('priority', 0)):
+            if - self.last_transmit.get(group) + self.time_since_epoch() >= group_info.get('transmit_time'):
+                if group in self.window_stats:
+                    self.send_packets[group] = package_stats(self.time_since_epoch(),
+                                                             self.generated_packets.get(group).get('hhmmss'),
+                                                             self.window_stats[group])
+                    self.window_stats[group].reset()
+                    self.queue_packet(group, group_info)
+                budget = group_info.get('burst_bytes', BURST_BYTES)
+                now = self.time_since_epoch()
+                burst = []
+                while len(burst) < group_info.get('burst', 1):
+                    frame = self.transmit_queue.peek(now, group)
+                    if frame is None:
+                        break
+                    # the burst is tagged from the group's next tag on once it is picked
+                    size = frame_bytes(group, frame[4], (self.frame_tags[group] + len(burst)) % TAG_MODULO)
+                    if burst and size > budget:
+                        break
+                    budget -= size
+                    self.transmit_queue.take(frame, now)
+                    burst.append(frame)
+                if not burst:
+                    # nothing fresh for this group, keep the slot open instead of resending a stale packet
+                    continue
+                # the freshest frames are picked, but sent oldest first and tagged as they go, so only frames
+                # handed to the radio use up tags and a gap on the ground is a frame lost on the link
+                for frame in sorted(burst, key=lambda frame: frame[2]):
+                    tag = self.frame_tags[group]
+                    trans(self.radio, now,
                                   group,
-                                  self.send_packets.get(group, 'EMPTY'),
-                                  logs.write,
+                                  frame[4],
+                                  self.logger.write,
                                   self.packet_count.get(group),
                                   self.packet_rate.get(group),
+                                  event_logger=self.logger,
+                                  on_sent=self.tx_callbacks.get(group),
+                                  tag=tag,
                                   )
-                    #print(f'{self.time_since_epoch():9} > TRANSMIT > {group.upper():9} > Packet Count - {self.packet_count.get(group)} > Packet Rate - {self.packet_rate.get(group)}\n')
+                    self.frame_tags[group] = (tag + 1) % TAG_MODULO
                     self.packet_count[group] += 1
-                    self.packet_rate[group] = self.packet_count.get(group)/((self.time_since_epoch())/60)
-                    self.last_transmit[group] = self.time_since_epoch()
-                    self.led.toggle()
+                #print(f'{self.time_since_epoch():9} > TRANSMIT > {group.upper():9} > Packet Count - {self.packet_count.get(group)} > Packet Rate - {self.packet_rate.get(group)}\n')
+                queue_stats = self.transmit_queue.stats()
+                self.logger.event(events.QUEUE, self.time_since_epoch(), group.upper(), queue_stats['depth'],
+                                  queue_stats['evicted'] + queue_stats['expired'], queue_stats['duplicates'],
+                                  queue_stats['last_latency'])
+                self.packet_rate[group] = self.packet_count.get(group)/((self.time_since_epoch())/60)
+                self.last_transmit[group] = self.time_since_epoch()
+                self.led.toggle()
     
     def sequence(self):
         # for writing
         self.read()
-        self.change_dict_format()
-        self.store()
-        self.dict_to_packet()
-        self.check_length()
+        self.process()
+
+    def process(self):
+        """Formats, stores and transmits the group records, everything in a cycle after the sensors are read."""
+        groups = self.fresh_groups()
+        self.change_dict_format(groups)
+        self.store(groups)
+        self.dict_to_packet(groups)
+        self.check_length(groups)
         
         # print(self.send_packets)
         self.transmit()
+        self.service_radio()
+        self.logger.maybe_flush()
+        self.checkpoint.maybe_save(self.checkpoint_state)
         # self.log_info((self.write_packets.get('data')))
         # self.check_record_and_send()
     
+    def next_due_ms(self):
+        """Returns the ms until the next sensor sample, log flush, checkpoint save or transmit is due."""
+        now = self.time_since_epoch()
+        due_ms = min(self.sampler.next_due_ms(), self.logger.next_flush_ms(), self.checkpoint.next_save_ms())
+        for group, group_info in self.grouped_sensors.items():
+            transmit_ms = int((self.last_transmit[group] + group_info.get('transmit_time') - now) * 1000)
+            # an overdue group with nothing queued waits for the sample that queues its packet
+            if transmit_ms > 0 or group in self.window_stats or self.transmit_queue.pending(group):
+                due_ms = min(due_ms, transmit_ms)
+        return max(0, due_ms)
+
+    def idle_until_due(self):
+        """Idles until the next task is due and logs the CPU duty cycle once per idle.report_interval_ms."""
+        while True:
+            due_ms = self.next_due_ms() if self.can_idle else 0
+            # a queued radio frame is written a chunk at a time while the loop waits
+            if due_ms <= TX_CHUNK_MS or not (self.radio and self.radio.pending()):
+                break
+            self.idle.wait(TX_CHUNK_MS)
+            self.radio.service()
+        self.idle.wait(due_ms)
+        if self.idle.report_due():
+            self.logger.event(events.CPU, self.time_since_epoch(), round(self.idle.duty * 100, 1),
+                              self.idle.wakes, round(self.idle.current_ma(), 1))
+            self.idle.reset()
+
+    def open_files(self):
+        """Returns the context manager that opens the stored files for one cycle, `with r2d1.open_files() as r2d1.files`."""
+        return MultiFileWriter(self.filenames.values())
+
     def start(self):
         self.setup()
+        with self.open_files() as self.files:
+            self.sequence()
+        self.boot_profiler.mark('first sample')
+        self.boot_profiler.report()
         while True:
-            with MultiFileWriter(self.filenames.values()) as self.files:
+            # idle first, so the first sample is not followed straight away by a second, duplicate row
+            self.idle_until_due()
+            with self.open_files() as self.files:
                 self.sequence()
                 
                             
 def main():   
+    from code.sensors.pressure import Pressure
+    from code.sensors.temperature import Temperature
+    from code.sensors.uv import UV
+    from code.sensors.humidity import Humidity
+    from code.sensors.sdcard import SDCard
+    from code.sensors.i2c_bus import I2CBus
+    from code.sensors.sampler import Sampled
+    from code.gps.gps import GPS
+    i2c_bus = I2CBus()
+    gps = Sampled(GPS(), rate=1)
     grouped_sensors = {
-        'data'      : {'sensors' : [UV(), Humidity(), GPS()], 'store_length': 4, 'specified_format': 'R2D1', 'transmit_time': 24},
-        'telemetry' : {'sensors' : [Temperature(), Pressure(), GPS()], 'store_length': 1, 'specified_format': 'UCD', 'transmit_time': 20},
+        'data'      : {'sensors' : [Sampled(UV(i2c_bus=i2c_bus), rate=10).subscribe(), Sampled(Humidity(i2c_bus=i2c_bus), rate=5).subscribe(), gps.subscribe()], 'store_length': 4, 'specified_format': 'R2D1', 'transmit_time': 24},
+        'telemetry' : {'sensors' : [Sampled(Temperature(), rate=1).subscribe(), Sampled(Pressure(i2c_bus=i2c_bus), rate=5).subscribe(), gps.subscribe()], 'store_length': 1, 'specified_format': 'UCD', 'transmit_time': 20},
         'storage'   : {'sensors' : [SDCard()], 'store': False},
     }
     r2d1 = R2D1(**grouped_sensors)
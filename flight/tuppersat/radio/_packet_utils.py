@@ -4,6 +4,8 @@ Simplified functions to format packets as bytes objects.
 
 """
 
+from tuppersat.schema import PACKET_HEADER, packet_layout
+
 def format(value, fmtspec):
     _s = '{:'+fmtspec+'}'
     return _s.format(value)
@@ -29,24 +31,24 @@ def strftime(time):
 def format_fixed_width_time(time, width=6):
     return (' '*width if time is None else strftime(time))
 
-def TelemetryPacket(callsign, index, hhmmss=None,
-                    latitude=None, longitude=None, hdop=None, altitude=None,
-                    t_internal=None, t_external=None, pressure=None):
-    """Assemble TelemetryPacket as formatted bytes object."""
-
-
-    _fields = [
-        format_fixed_width(callsign  ,  8, '<8'      ),
-        format_fixed_width(index     ,  5, '>05'     ),
-        format_fixed_width_time(hhmmss,  6),
-        format_fixed_width(latitude  ,  9, '+09.05f' ),
-        format_fixed_width(longitude , 10, '+010.05f'),
-        format_fixed_width(hdop      ,  5, '05.02f'  ), 
-        format_fixed_width(altitude  ,  8, '08.02f'  ), 
-        format_fixed_width(t_internal,  8, '+08.03f' ), 
-        format_fixed_width(t_external,  8, '+08.03f' ), 
-        format_fixed_width(pressure  ,  9, '09.04f'  ),
-    ]
+def format_field(value, width, fmt_spec):
+    if fmt_spec == 'time':
+        return format_fixed_width_time(value, width)
+    return format_fixed_width(value, width, fmt_spec)
+
+# (name, width, format spec) of every field, from tuppersat.schema
+TELEMETRY_LAYOUT = [(name,) + packet for name, packet in PACKET_HEADER] + packet_layout('telemetry')
+
+def TelemetryPacket(callsign, index, **fields):
+    """Assemble TelemetryPacket as formatted bytes object.
+
+    fields are the transmitted fields of the telemetry schema, missing ones
+    are left blank.
+    """
+    fields['callsign'], fields['index'] = callsign, index
+    _fields = [format_field(fields.pop(name, None), width, fmt_spec) for name, width, fmt_spec in TELEMETRY_LAYOUT]
+    if fields:
+        raise TypeError(f"Unexpected telemetry fields {sorted(fields)}")
 
     _parts = '|'.join(_fields)
     pkt_string = f'T|{_parts}'
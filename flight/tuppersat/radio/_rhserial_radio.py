@@ -5,6 +5,9 @@ Pico.
 
 """
 
+# standard library imports
+import time
+
 # tuppersat imports
 import tuppersat.rhserial as rhserial
 
@@ -14,9 +17,31 @@ from ._utils import Counter
 
 BROADCAST = 0xFF
 
+# RP2040 UART FIFO depth in bytes
+FIFO_SIZE = 32
+
+# bytes per frame slot of the transmit buffer, a full TDRSS data packet with room for DLE stuffing
+FRAME_SIZE = 256
+
 class RHSerialRadio:
-    """Transmit-only interface to RHSerial via UART."""
-    def __init__(self, uart, address=0xFF):
+    """Transmit-only interface to RHSerial via UART.
+
+    Frames are packed into a buffer of `frame_size` byte slots allocated
+    once, one slot per queued frame, so sending does not allocate a new
+    frame every time. A frame too long for a slot is packed on its own.
+
+    With queued=True send_bytes only packs the frame onto an outgoing queue
+    and returns. `service` writes the queued frames to the UART a FIFO sized
+    chunk at a time, when the UART has finished the previous chunk
+    (uart.txdone, where the port has it), so the caller never waits for a
+    whole frame at 38400 baud. It has to be called regularly, e.g. once per
+    main loop cycle. When a frame is fully written its on_sent callback is
+    called with (msgid, frame length, ms from send_bytes to the last chunk).
+
+    When the queue holds `maxlen` frames the oldest is dropped, counted in
+    `stats['dropped']`.
+    """
+    def __init__(self, uart, address=0xFF, queued=False, chunk_size=FIFO_SIZE, maxlen=8, frame_size=FRAME_SIZE):
         """Initialiser."""
         # UART stream interface
         self.uart = uart
@@ -26,24 +51,97 @@ class RHSerialRadio:
 
         # counter object to track frames (used for msgid)
         self.frame_count = Counter(modulo=0x100)
+
+        # outgoing frames, [frame, bytes written, msgid, on_sent, ticks when queued, slot]
+        self.queued = queued
+        self.chunk_size = chunk_size
+        # a frame being written cannot be dropped, so at least one more has to fit
+        self.maxlen = max(2, maxlen)
+        self.tx_queue = []
+        self._txdone = getattr(uart, 'txdone', None)
+        self.stats = {'queued': 0, 'sent': 0, 'bytes': 0, 'dropped': 0, 'max_latency_ms': 0}
+
+        # preallocated frame slots, one per queued frame or a single one to write from
+        self.frame_size = frame_size
+        slots = self.maxlen if queued else 1
+        self.tx_buffer = bytearray(slots * frame_size)
+        view = memoryview(self.tx_buffer)
+        self._slots = [view[i * frame_size:(i + 1) * frame_size] for i in range(slots)]
+        self._free_slots = list(range(slots))
+
+    def _pack(self, msgbytes, to, msgid, flag):
+        """Packs a frame into a free slot. Returns (frame, slot), slot is None if the frame got its own bytes."""
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            try:
+                length = rhserial.pack_message_into(self._slots[slot], 0, msgbytes, to, self.address, msgid, flag)
+                return self._slots[slot][:length], slot
+            except ValueError:
+                self._free_slots.append(slot)
+        return rhserial.pack_message(msgbytes, to, self.address, msgid, flag), None
+
+    def _release(self, entry):
+        if entry[5] is not None:
+            self._free_slots.append(entry[5])
         
     # user interface to send messages
 
-    def send_bytes(self, msgbytes, to=BROADCAST, flag=0x00):
-        """Pack and transmit encoded bytes message."""
-        _msg = rhserial.pack_message(
-            msgbytes = msgbytes          ,
-            msgto    = to                ,
-            msgfrom  = self.address      ,
-            msgid    = self.frame_count(),
-            msgflag  = flag
-        )
-        return self.uart.write(_msg)
-    
-    def send_text(self, msg, to=BROADCAST, flag=0x00, encoding='utf-8'):
+    def send_bytes(self, msgbytes, to=BROADCAST, flag=0x00, on_sent=None):
+        """Pack and transmit encoded bytes message.
+
+        Returns the number of bytes written, or queued with queued=True.
+        """
+        msgid = self.frame_count()
+        if not self.queued:
+            _msg, slot = self._pack(msgbytes, to, msgid, flag)
+            written = self.uart.write(_msg)
+            if slot is not None:
+                self._free_slots.append(slot)
+            if on_sent:
+                on_sent(msgid, len(_msg), 0)
+            return written
+        if len(self.tx_queue) >= self.maxlen:
+            self._release(self.tx_queue.pop(0 if self.tx_queue[0][1] == 0 else 1))
+            self.stats['dropped'] += 1
+        _msg, slot = self._pack(msgbytes, to, msgid, flag)
+        self.tx_queue.append([_msg, 0, msgid, on_sent, time.ticks_ms(), slot])
+        self.stats['queued'] += 1
+        return len(_msg)
+    def send_text(self, msg, to=BROADCAST, flag=0x00, encoding='utf-8', on_sent=None):
         """Encode, pack and transmit a text string."""
         _msgbytes = msg.encode(encoding)
-        return self.send_bytes(msgbytes, to, flag)
+        return self.send_bytes(_msgbytes, to, flag, on_sent)
+
+    def pending(self):
+        """Returns the number of queued frames, the one being written included."""
+        return len(self.tx_queue)
+
+    def service(self):
+        """Writes the next chunk of the oldest queued frame if the UART is idle.
 
+        Returns True if a frame was completed.
+        """
+        if not self.tx_queue or (self._txdone and not self._txdone()):
+            return False
+        entry = self.tx_queue[0]
+        frame, offset = entry[0], entry[1]
+        chunk = memoryview(frame)[offset:offset + self.chunk_size]
+        written = self.uart.write(chunk)
+        entry[1] = offset + (len(chunk) if written is None else written)
+        if entry[1] < len(frame):
+            return False
+        self._release(self.tx_queue.pop(0))
+        latency = time.ticks_diff(time.ticks_ms(), entry[4])
+        self.stats['sent'] += 1
+        self.stats['bytes'] += len(frame)
+        self.stats['max_latency_ms'] = max(self.stats['max_latency_ms'], latency)
+        if entry[3]:
+            entry[3](entry[2], len(frame), latency)
+        return True
 
-    
+    def flush(self, timeout_ms=1000):
+        """Blocks until the queue is written or timeout_ms has passed. Returns True if it is empty."""
+        start = time.ticks_ms()
+        while self.tx_queue and time.ticks_diff(time.ticks_ms(), start) < timeout_ms:
+            self.service()
+        return not self.tx_queue
@@ -26,15 +26,15 @@ def format_callsign(callsign):
 class TupperSatRadio(RHSerialRadio):
     """API to send TDRSS telemetry & data messages with the T3."""
     
-    def __init__(self, uart, address, callsign, user_callback=None):
-        """Initialiser."""
+    def __init__(self, uart, address, callsign, user_callback=None, **kwargs):
+        """Initialiser, kwargs (queued, chunk_size, maxlen) go to RHSerialRadio."""
         self.callsign = format_callsign(callsign)
         self.telemetry_count = Counter()
         
 #        super().__init__(uart, address, user_callback)
-        super().__init__(uart, address)
+        super().__init__(uart, address, **kwargs)
 
-    def send_packet(self, packet):
+    def send_packet(self, packet, on_sent=None):
         """Convert pkt to bytes and transmit."""
         #TODO: check pkt is a valid packet type?
         #TODO: catch exceptions when converting to bytes?
@@ -42,29 +42,33 @@ class TupperSatRadio(RHSerialRadio):
         _pkt_bytes = bytes(packet)
 
         # transmit
-        return self.send_bytes(_pkt_bytes)
+        return self.send_bytes(_pkt_bytes, on_sent=on_sent)
         
     def send_telemetry(self, hhmmss, latitude, longitude, hdop, altitude,
-                       t_internal, t_external, pressure):
-        """Assemble and transmit a TupperSat telemetry packet."""
+                       t_internal, t_external, pressure, gps_valid=None, on_sent=None, index=None):
+        """Assemble and transmit a TupperSat telemetry packet.
+
+        index defaults to the next telemetry count, gps_valid is left blank if not given.
+        """
         # assemble
         _packet = TelemetryPacket(
             callsign   = self.callsign         , 
-            index      = self.telemetry_count(), 
+            index      = self.telemetry_count() if index is None else index, 
             hhmmss     = hhmmss                , 
             latitude   = latitude              ,
             longitude  = longitude             ,
             hdop       = hdop                  ,
             altitude   = altitude              ,
+            gps_valid  = gps_valid             ,
             t_internal = t_internal            ,
             t_external = t_external            ,
             pressure   = pressure              ,
         )
 
         # transmit
-        return self.send_packet(_packet)
+        return self.send_packet(_packet, on_sent)
 
-    def send_data(self, data):
+    def send_data(self, data, on_sent=None):
         """Assemble and transmit data in a TupperSat data packet."""
         # assemble
         _packet = DataPacket(
@@ -73,4 +77,4 @@ class TupperSatRadio(RHSerialRadio):
         )
 
         # transmit
-        return self.send_packet(_packet)
+        return self.send_packet(_packet, on_sent)
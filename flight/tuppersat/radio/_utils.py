@@ -3,17 +3,21 @@
 
 """
 
-def Counter(start=0x00, modulo=None):
-    """Callable that counts from start every time it is called."""
-    _count = start
+class Counter:
+    """Callable that counts from start every time it is called.
 
-    def _counter():
-        nonlocal _count
-        idx = _count
+    The next value is kept in `count` so it can be saved and restored across
+    a reset.
+    """
+
+    def __init__(self, start=0x00, modulo=None):
+        self.count = start
+        self.modulo = modulo
+
+    def __call__(self):
+        idx = self.count
         # update counter
-        _count += 1
-        if modulo:
-            _count %= modulo
+        self.count += 1
+        if self.modulo:
+            self.count %= self.modulo
         return idx
-
-    return _counter
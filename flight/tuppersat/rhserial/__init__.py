@@ -16,9 +16,9 @@ API Overview
 ------------
 
 The core API consists of functions `pack_message` and `unpack_message`, which
-handle packet and header formatting. Note that they aren't quite symmetric, in
-particular around handling DLE-escape sequences and the message head and
-tail. The RXHandler class contains a state machine that will process receiving
+handle packet and header formatting, and `pack_message_into`, which packs into
+a preallocated buffer. Note that they aren't quite symmetric, in particular
+around handling DLE-escape sequences and the message head and tail. The RXHandler class contains a state machine that will process receiving
 a message one byte at a time.
 
 """
@@ -29,7 +29,7 @@ STX = b'\x02' # Start of Text
 ETX = b'\x03' # End of Text
 
 
-from ._rhserial import pack_message, unpack_message
+from ._rhserial import pack_message, pack_message_into, unpack_message
 from ._rhserial import calculate_checksum, passes_checksum
 from ._rhserialrxhandler import RXHandler
 #from ._rhserialradio import RHSerialRadio
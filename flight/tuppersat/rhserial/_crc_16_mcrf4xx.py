@@ -50,7 +50,6 @@ CRC_16_MCRF4XX_TABLE = [
 
 def _crc16(data, init, table):
     """Calculate CRC from initial value and table."""
-    data = bytearray(data)
     crc = init
     for byte in data:
         _idx = byte ^ (0xff & crc)
@@ -58,8 +57,9 @@ def _crc16(data, init, table):
     return crc
 
 def make_crc_func(init, table):
-    def crc_func(data):
-        return _crc16(data, init, table)
+    # crc continues a running checksum, so a message can be checked in parts
+    def crc_func(data, crc=init):
+        return _crc16(data, crc, table)
     return crc_func
 
 crc_16_mcrf4xx = make_crc_func(0xffff, CRC_16_MCRF4XX_TABLE)
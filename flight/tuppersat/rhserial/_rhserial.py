@@ -96,3 +96,47 @@ def pack_message(msgbytes, msgto, msgfrom, msgid, msgflag=0x00):
     # finally, assemble and return full message
     full_msg = msghead + msgbody + msgtail + bytes(checksum)
     return full_msg
+
+def pack_message_into(buffer, offset, msgbytes, msgto, msgfrom, msgid, msgflag=0x00):
+    """Assemble message packet into buffer at offset, as pack_message.
+
+    Nothing is allocated for the packet itself, so a transmitter can reuse
+    one preallocated buffer for every frame. Returns the packet length, or
+    raises ValueError if it does not fit.
+    """
+    msginfo = (msgto, msgfrom, msgid, msgflag)
+    dle = DLE[0]
+    # length with DLE stuffing: head, header, message, tail and checksum
+    stuffed = msgbytes.count(DLE)
+    length = 2 + 4 + len(msgbytes) + 2 + 2 + msginfo.count(dle) + stuffed
+    if offset + length > len(buffer):
+        raise ValueError(f'{length} byte packet does not fit the buffer')
+
+    i = offset
+    buffer[i], buffer[i + 1] = dle, STX[0]
+    i += 2
+    for byte in msginfo:
+        buffer[i] = byte
+        i += 1
+        if byte == dle:
+            buffer[i] = dle
+            i += 1
+    if stuffed:
+        for byte in msgbytes:
+            buffer[i] = byte
+            i += 1
+            if byte == dle:
+                buffer[i] = dle
+                i += 1
+    else:
+        buffer[i:i + len(msgbytes)] = msgbytes
+        i += len(msgbytes)
+    buffer[i], buffer[i + 1] = dle, ETX[0]
+    i += 2
+
+    # checksum of the unstuffed header, message and tail
+    crc = crc16(msginfo)
+    crc = crc16(msgbytes, crc)
+    crc = crc16(DLE + ETX, crc)
+    buffer[i], buffer[i + 1] = crc >> 8, crc & 0xFF
+    return length
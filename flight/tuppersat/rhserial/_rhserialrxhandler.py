@@ -17,7 +17,7 @@ class RXHandler:
     www.airspayce.com/mikem/arduino/RadioHead/classRH__Serial.html
 
     """
-    def __init__(self, on_received):
+    def __init__(self, on_received, on_checksum_failure=None):
         """Initialiser.
 
         Parameters
@@ -25,8 +25,12 @@ class RXHandler:
         on_received : callable
             callback function which takes completed message as its sole 
              argument.
+        on_checksum_failure : callable, optional
+            callback function which takes a message that failed the checksum
+             as its sole argument.
         """
         self._on_received = on_received
+        self._on_checksum_failure = on_checksum_failure
         self.reset()
 
     def __call__(self, byte):
@@ -81,7 +85,7 @@ class RXHandler:
                 if byte == DLE:
                     # it's a DLE that's part of the message.
                     self._message += byte
-                    state = 'MESSAGE'
+                    self._state = 'MESSAGE'
                 elif byte == ETX:
                     # it's an ETX, we're done with the message, move on to the
                     # checksum.
@@ -100,6 +104,8 @@ class RXHandler:
                 if passes_checksum(self._message+DLE+ETX, self._checksum):
                     # Process message.
                     self._on_received(self._message)
+                elif self._on_checksum_failure:
+                    self._on_checksum_failure(self._message)
                 # either we processed the message or it didn't pass the
                 # checksum, either way let's start over
                 self._state = 'IDLE'
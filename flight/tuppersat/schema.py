@@ -0,0 +1,88 @@
+"""tuppersat.schema
+
+Declarative layout of the telemetry and data groups, shared by the flight
+encoders (code.comms.packets), the binary and CSV storage headers, the
+TelemetryPacket fixed widths (tuppersat.radio) and the ground tools
+(tuppersat.tools.ground and ingest), so all of them agree on the fields.
+
+Every field is a tuple
+
+    (name, source, type, scale, digits, packet)
+
+name
+    Column name in the stored rows and the packets.
+source
+    Key of the value in the group's SampleRecord.
+type
+    struct type of the field in binary records, integer types are
+    truncated with int() by the encoders.
+scale
+    Source units per stored unit, the source value is divided by it.
+digits
+    Decimal places the value is rounded to, None keeps it as it is.
+packet
+    (width, format spec) of the field in a TelemetryPacket, None if the
+    field is not transmitted. The format spec 'time' formats an HHMMSS
+    Time.
+
+Plain Python, imported on the flight computer and on the ground.
+
+"""
+
+GROUPS = {
+    'telemetry': (
+        ('hhmmss', 'hhmmss', 'I', 1, None, (6, 'time')),
+        ('latitude', 'latitude', 'd', 1, None, (9, '+09.05f')),
+        ('longitude', 'longitude', 'd', 1, None, (10, '+010.05f')),
+        ('hdop', 'hdop', 'f', 1, None, (5, '05.02f')),
+        ('altitude', 'altitude', 'f', 1, None, (8, '08.02f')),
+        # 0 while the position above is a stale fix or the placeholder before the first one
+        ('gps_valid', 'gps_valid', 'B', 1, None, (1, '1d')),
+        # s since the fix, -1 before the first
+        ('gps_age', 'gps_age', 'f', 1, 1, None),
+        ('t_internal', 't_internal', 'f', 1, None, (8, '+08.03f')),
+        ('t_external', 't_external', 'f', 1, None, (8, '+08.03f')),
+        # Pa from the MS5611, hPa in the packets and the stored rows
+        ('pressure', 'pressure', 'f', 100, None, (9, '09.04f')),
+        ('temperature_from_pressure', 'temperature_from_pressure', 'f', 1, None, None),
+    ),
+    'data': (
+        ('time', 'time', 'f', 1, 2, None),
+        ('hhmmss', 'hhmmss', 'I', 1, None, None),
+        ('altitude', 'altitude', 'f', 1, None, None),
+        ('gps_valid', 'gps_valid', 'B', 1, None, None),
+        ('uva', 'uva', 'f', 1, None, None),
+        ('uvb', 'uvb', 'f', 1, None, None),
+        ('humidity', 'humidity', 'f', 1, None, None),
+        ('temperature', 'temperature', 'f', 1, None, None),
+    ),
+}
+
+# leading fields of a TelemetryPacket, added by TupperSatRadio
+PACKET_HEADER = (
+    ('callsign', (8, '<8')),
+    ('index', (5, '>05')),
+)
+
+# struct types that the encoders truncate to integers
+INTEGER_TYPES = 'bBhHiIlLqQ'
+
+
+def field_names(group):
+    """Returns the field names of a group in stored order."""
+    return tuple(field[0] for field in GROUPS[group])
+
+
+def storage_fields(group):
+    """Returns the (name, struct type) pairs of a stored row, the store count first."""
+    return [('store_count', 'I')] + [(field[0], field[2]) for field in GROUPS[group]]
+
+
+def csv_header(group):
+    """Returns the header line of a group's CSV file, without the newline."""
+    return ','.join(name for name, field_type in storage_fields(group))
+
+
+def packet_layout(group='telemetry'):
+    """Returns the (name, width, format spec) of every transmitted field, in packet order."""
+    return [(field[0],) + field[5] for field in GROUPS[group] if field[5] is not None]
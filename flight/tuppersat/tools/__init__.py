@@ -0,0 +1,5 @@
+"""tuppersat.tools
+
+Host-side tools to process the files recorded by the flight software.
+
+"""
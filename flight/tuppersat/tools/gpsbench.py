@@ -0,0 +1,142 @@
+"""tuppersat.tools.gpsbench
+
+Measures the GPS UART load per fix for the uBlox output configurations of
+code.gps.ubx: the default NMEA set, GGA only (nmea_config) and NAV-PVT
+(GPS(protocol='ubx')). A simulated one-fix stream is generated for each and
+parsed with the parsers of the flight driver (tuppersat.gps_parsing),
+reporting bytes per fix, the share of a 9600 baud UART and the host CPU time
+per fix.
+
+Usage:
+
+    python -m tuppersat.tools.gpsbench --fixes 20000
+
+"""
+
+# standard library imports
+import argparse
+import struct
+import time
+
+# tuppersat imports
+from tuppersat.gps_parsing import NAV_PVT, NAV_PVT_FORMAT, parse_nav_pvt, gga_fields, gga_fix
+
+BAUDRATE = 9600
+
+# NAV-PVT payload of a u-blox 8
+NAV_PVT_LENGTH = 92
+
+
+# ****************************************************************************
+# simulated receiver output
+# ****************************************************************************
+
+def nmea(body):
+    """Returns a complete NMEA sentence with checksum for a body without '$' and '*'."""
+    checksum = 0
+    for char in body.encode('ascii'):
+        checksum ^= char
+    return f'${body}*{checksum:02X}\r\n'.encode('ascii')
+
+
+def nmea_fix(second):
+    """One fix of the default uBlox 7 output: GGA, GLL, GSA, three GSV, RMC and VTG."""
+    hhmmss = f'12{second // 60 % 60:02}{second % 60:02}.00'
+    return b''.join([
+        nmea(f'GPGGA,{hhmmss},5318.48720,N,00613.42560,W,1,09,0.92,1234.5,M,55.0,M,,'),
+        nmea(f'GPGLL,5318.48720,N,00613.42560,W,{hhmmss},A,A'),
+        nmea('GPGSA,A,3,02,05,07,09,13,16,20,26,30,,,,1.61,0.92,1.32'),
+        nmea('GPGSV,3,1,11,02,48,302,38,05,54,226,41,07,18,062,30,09,12,107,26'),
+        nmea('GPGSV,3,2,11,13,73,120,44,16,07,033,22,20,38,262,35,26,05,330,19'),
+        nmea('GPGSV,3,3,11,29,02,175,,30,61,076,42,31,,,'),
+        nmea(f'GPRMC,{hhmmss},A,5318.48720,N,00613.42560,W,0.104,,191026,,,A'),
+        nmea('GPVTG,,T,,M,0.104,N,0.193,K,A'),
+    ])
+
+
+def gga_only_fix(second):
+    """One fix with nmea_config(keep=('GGA',)) applied."""
+    return nmea_fix(second).split(b'\r\n', 1)[0] + b'\r\n'
+
+
+def ubx_checksum(data):
+    a = b = 0
+    for byte in data:
+        a = (a + byte) & 0xFF
+        b = (b + a) & 0xFF
+    return bytes([a, b])
+
+
+def nav_pvt_fix(second):
+    """One NAV-PVT message of a u-blox 8."""
+    payload = bytearray(NAV_PVT_LENGTH)
+    struct.pack_into(NAV_PVT_FORMAT, payload, 0, second * 1000, 2026, 10, 19, 12, second // 60 % 60, second % 60,
+                     0x07, 10, 0, 3, 1, 0, 9, -62237600, 533081200, 1290000, 1234500, 2500, 4000,
+                     0, 0, -5000, 0, 0, 0, 0, 161)
+    body = NAV_PVT + struct.pack('<H', len(payload)) + payload
+    return b'\xb5\x62' + body + ubx_checksum(body)
+
+
+# ****************************************************************************
+# parsing, as code.gps.gps.GPS
+# ****************************************************************************
+
+def parse_nmea(stream):
+    """GPS.read_string and build_dictionary: keep the $GPGGA lines, convert the newest."""
+    fixes = []
+    for line in stream.splitlines(True):
+        fields = gga_fields(line)
+        if fields:
+            fixes.append(fields)
+    if not fixes:
+        return None
+    return gga_fix(fixes[-1])
+
+
+def parse_ubx(stream):
+    """GPS.read_nav_pvt: frame and check the messages as airborne.UBXReader, parse NAV-PVT."""
+    fix = None
+    start = stream.find(b'\xb5\x62')
+    while start >= 0 and start + 6 <= len(stream):
+        end = start + 8 + (stream[start + 4] | stream[start + 5] << 8)
+        message = stream[start:end]
+        if ubx_checksum(message[2:-2]) == message[-2:]:
+            pvt = parse_nav_pvt(message)
+            if pvt and pvt['fix_type'] >= 2:
+                fix = pvt
+        start = stream.find(b'\xb5\x62', end)
+    return fix
+
+
+CONFIGURATIONS = {
+    'nmea-default': (nmea_fix, parse_nmea),
+    'nmea-gga': (gga_only_fix, parse_nmea),
+    'ubx-nav-pvt': (nav_pvt_fix, parse_ubx),
+}
+
+
+def measure(fixes, make_fix, parse):
+    """Returns (bytes per fix, CPU seconds per fix) for fixes simulated one-second reads."""
+    stream = [make_fix(second) for second in range(fixes)]
+    start = time.process_time()
+    for chunk in stream:
+        if parse(chunk) is None:
+            raise ValueError('no fix parsed')
+    cpu = time.process_time() - start
+    return sum(len(chunk) for chunk in stream) / fixes, cpu / fixes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--fixes', type=int, default=10000, help='simulated fixes per configuration')
+    args = parser.parse_args(argv)
+
+    print(f'{"configuration":14} {"bytes/fix":>10} {"UART @9600":>11} {"CPU/fix":>10}')
+    for name, (make_fix, parse) in CONFIGURATIONS.items():
+        bytes_per_fix, cpu = measure(args.fixes, make_fix, parse)
+        load = 100 * bytes_per_fix * 10 / BAUDRATE
+        print(f'{name:14} {bytes_per_fix:10.0f} {load:10.1f}% {cpu * 1e6:8.1f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,562 @@
+"""tuppersat.tools.ground
+
+Ground-station receiver. Reads the T3 radio byte stream from a serial port, or
+from any file or pipe for offline testing, decodes the RHSerial frames with
+RXHandler, parses the TDRSS telemetry (T|) and data (D|) packets and fans them
+out to the sinks through bounded queues. A slow sink drops its oldest
+packets instead of stalling the reader. Packets carry the sequence tag the
+flight computer gave them when it sent them (the telemetry index, the data
+prefix), so packets of a burst sent out of order are put back in order and
+repeated ones dropped before the sinks see them. Link statistics (lost frames, loss
+rate, RSSI, checksum failures) are kept as frames arrive and served as JSON to
+anyone connecting to --stats-port.
+
+Usage:
+
+    python -m tuppersat.tools.ground --serial /dev/ttyUSB0 --stdout --csv received/
+    python -m tuppersat.tools.ground --replay capture.bin --tcp 8765
+    python -m tuppersat.tools.ground --serial /dev/ttyUSB0 --stats-port 8766
+    python -m tuppersat.tools.ground --make-capture capture.bin --frames 20000
+    python -m tuppersat.tools.ground --replay capture.bin --benchmark
+    python -m tuppersat.tools.ground --serial /dev/ttyUSB0 --stdout --reorder-window 0
+
+"""
+
+# standard library imports
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+
+# tuppersat imports
+from tuppersat.rhserial import RXHandler, unpack_message
+from tuppersat.tools.linkstats import LinkStats, SEQUENCE_TAG_MODULO
+from tuppersat.radio._packet_utils import TELEMETRY_LAYOUT
+from tuppersat.schema import field_names
+
+# 38400 baud, 8N1
+FULL_RATE_BYTES_PER_SECOND = 38400 // 10
+
+READ_SIZE = 4096
+
+# packet fields from the group schemas the flight encoders are generated from
+TELEMETRY_FIELDS = tuple(name for name, width, fmt_spec in TELEMETRY_LAYOUT)
+DATA_FIELDS = field_names('data')
+
+
+# ****************************************************************************
+# packet parsing
+# ****************************************************************************
+
+def _number(text):
+    text = text.strip()
+    if not text:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def _text(text):
+    return text.strip()
+
+
+# decoder of every TelemetryPacket field, text fields are kept as strings
+TELEMETRY_DECODERS = tuple((name, _text if fmt_spec in ('time', '<8') else _number)
+                           for name, width, fmt_spec in TELEMETRY_LAYOUT)
+
+
+def parse_data_rows(text):
+    """Decodes the rows of an 'R2D1' data packet, '<count>(v, ...), (v, ...)'.
+
+    Returns a list of dictionaries of DATA_FIELDS, empty if the packet holds
+    anything else (the 'R2D1_STATS' summary for one).
+    """
+    rows = []
+    for part in text.split('(')[1:]:
+        values = part.split(')')[0].split(',')
+        if len(values) != len(DATA_FIELDS):
+            return []
+        try:
+            rows.append(dict(zip(DATA_FIELDS, (_number(value) for value in values))))
+        except ValueError:
+            return []
+    return rows
+
+
+def parse_sequence_tag(text):
+    """Returns the sequence tag the data of a data packet starts with, or None."""
+    digits = text.split('(', 1)[0]
+    return int(digits) if digits.isdigit() else None
+
+
+def parse_packet(payload):
+    """Parses a TDRSS packet payload into a dictionary.
+
+    Telemetry packets give the fields of TelemetryPacket, data packets the
+    callsign, the data decoded as text and its rows (parse_data_rows).
+    Both carry their sequence tag as 'seq', the index of a telemetry packet.
+    Anything else is returned with type '?' and the raw payload.
+    """
+    if payload.startswith(b'T|'):
+        parts = payload.decode('ascii', 'replace').split('|')[1:]
+        packet = {'type': 'T'}
+        for (name, decode), value in zip(TELEMETRY_DECODERS, parts):
+            packet[name] = decode(value)
+        index = packet.get('index')
+        packet['seq'] = index if isinstance(index, int) else None
+        return packet
+    if payload.startswith(b'D|'):
+        callsign, _, data = payload[2:].partition(b'|')
+        text = data.decode('ascii', 'replace')
+        return {'type': 'D', 'callsign': callsign.decode('ascii', 'replace').strip(),
+                'seq': parse_sequence_tag(text), 'data': text, 'rows': parse_data_rows(text)}
+    return {'type': '?', 'seq': None, 'data': payload.hex()}
+
+
+class ReorderBuffer:
+    """Puts the packets of one stream back in sequence tag order.
+
+    The first packet of a stream sets the expected tag. A packet ahead of
+    the expected tag is held until the ones before it arrive. Once more than
+    `window` packets are held, or the oldest has waited `max_wait` seconds
+    (see `expire`), the missing tags are given up as lost. A packet behind
+    the expected tag, one that arrived after its gap was given up, is passed
+    on straight away.
+
+    The flight computer tags frames as it sends them, so a burst goes out
+    in tag order and a missing tag was lost on the link. A late packet only
+    comes from reordering on the way, so the wait is kept short.
+
+    Parameters
+    ----------
+    window : int
+        Packets held at most.
+    max_wait : float
+        Seconds a packet is held at most.
+    modulo : int
+        The tags wrap around at this value.
+    """
+
+    def __init__(self, window=8, max_wait=2, modulo=SEQUENCE_TAG_MODULO):
+        self.window = window
+        self.max_wait = max_wait
+        self.modulo = modulo
+        self.expected = None
+        self._held = {}
+        # tags passed on recently, to recognise repeats
+        self._recent = [None] * (4 * window)
+        self._recent_index = 0
+
+    def seen(self, seq):
+        """Returns True if seq is held or was passed on recently."""
+        return seq in self._held or seq in self._recent
+
+    def _passed(self, seq):
+        self._recent[self._recent_index] = seq
+        self._recent_index = (self._recent_index + 1) % len(self._recent)
+
+    def _release_run(self, released):
+        while self.expected in self._held:
+            released.append(self._held.pop(self.expected)[0])
+            self._passed(self.expected)
+            self.expected = (self.expected + 1) % self.modulo
+
+    def push(self, seq, packet, now):
+        """Adds a packet, returns the packets now in order."""
+        if self.expected is None:
+            self.expected = seq
+        if (seq - self.expected) % self.modulo >= self.modulo // 2:
+            self._passed(seq)
+            return [packet]
+        self._held[seq] = (packet, now)
+        released = []
+        self._release_run(released)
+        while len(self._held) > self.window:
+            self._skip_gap(released)
+        return released
+
+    def _skip_gap(self, released):
+        self.expected = min(self._held, key=lambda tag: (tag - self.expected) % self.modulo)
+        self._release_run(released)
+
+    def expire(self, now):
+        """Gives up the gaps in front of packets held longer than `max_wait`, returns the packets released."""
+        released = []
+        while self._held and now - min(held[1] for held in self._held.values()) > self.max_wait:
+            self._skip_gap(released)
+        return released
+
+    def flush(self):
+        """Returns every held packet in order, as at the end of a recording."""
+        released = []
+        while self._held:
+            self._skip_gap(released)
+        return released
+
+
+class FrameDecoder:
+    """Feeds bytes through RXHandler and returns the decoded packets.
+
+    With a reorder_window the packets of each stream (packet type and
+    callsign) go through a ReorderBuffer, and repeated ones are dropped.
+    """
+
+    def __init__(self, reorder_window=8, max_wait=2):
+        self.reorder_window = reorder_window
+        self.max_wait = max_wait
+        self._streams = {}
+        self._frames = []
+        self.link_stats = LinkStats()
+        self.handler = RXHandler(self._frames.append, self.link_stats.checksum_failure)
+        self.bytes_received = 0
+        self.frames_received = 0
+
+    def feed(self, chunk):
+        """Decodes a chunk of bytes, returns a list of packet dictionaries."""
+        handler = self.handler
+        for i in range(len(chunk)):
+            handler(chunk[i:i + 1])
+        self.bytes_received += len(chunk)
+        packets = []
+        received_at = time.time()
+        for frame in self._frames:
+            header = unpack_message(frame)
+            packet = parse_packet(header['message'])
+            packet.update({'received': received_at, 'frame_id': header['id'], 'rssi': header['rssi'],
+                           'from': header['from']})
+            self.link_stats.update(packet)
+            if not self.reorder_window or packet['seq'] is None:
+                packets.append(packet)
+                continue
+            key = (packet['type'], packet.get('callsign'))
+            stream = self._streams.get(key)
+            if stream is None:
+                stream = self._streams[key] = ReorderBuffer(self.reorder_window, self.max_wait)
+            if stream.seen(packet['seq']):
+                self.link_stats.duplicates += 1
+                continue
+            packets.extend(stream.push(packet['seq'], packet, received_at))
+        packets.extend(self.expire(received_at))
+        self.frames_received += len(self._frames)
+        self._frames.clear()
+        return packets
+
+    def expire(self, now):
+        """Returns the held packets whose gaps are given up, see ReorderBuffer.expire."""
+        packets = []
+        for stream in self._streams.values():
+            packets.extend(stream.expire(now))
+        return packets
+
+    def flush(self):
+        """Returns the packets still held for reordering."""
+        packets = []
+        for stream in self._streams.values():
+            packets.extend(stream.flush())
+        return packets
+
+
+# ****************************************************************************
+# sinks
+# ****************************************************************************
+
+class Sink:
+    """Base class of a subscriber with its own bounded queue."""
+
+    def __init__(self, maxsize=256):
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.errors = 0
+
+    def offer(self, packet):
+        """Queues packet without blocking, dropping the oldest queued packet when full."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(packet)
+
+    async def run(self):
+        """Handles queued packets until the None sentinel, a packet that fails is counted and skipped."""
+        while True:
+            packet = await self.queue.get()
+            if packet is None:
+                break
+            try:
+                await self.handle(packet)
+            except Exception as error:
+                # e.g. a closed stdout pipe, reported once so the sink keeps draining its queue quietly
+                if not self.errors:
+                    print(f'{type(self).__name__}: {error!r}, further errors are only counted', file=sys.stderr)
+                self.errors += 1
+        await self.close()
+
+    async def handle(self, packet):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class StdoutSink(Sink):
+    """Prints one line per packet."""
+
+    async def handle(self, packet):
+        if packet['type'] == 'T':
+            text = ' '.join(f'{name}={packet.get(name)}' for name in TELEMETRY_FIELDS[1:])
+        else:
+            text = packet.get('data')
+        print(f"{packet['type']} #{packet['frame_id']:3} rssi {packet['rssi']:4} | {text}")
+
+
+class CsvSink(Sink):
+    """Appends telemetry and data packets to telemetry.csv and data.csv in a directory."""
+
+    COLUMNS = {
+        'T': ('received', 'frame_id', 'rssi') + TELEMETRY_FIELDS,
+        'D': ('received', 'frame_id', 'rssi', 'callsign', 'seq', 'data'),
+    }
+
+    def __init__(self, directory, maxsize=256):
+        super().__init__(maxsize)
+        os.makedirs(directory, exist_ok=True)
+        self._files = {}
+        self._writers = {}
+        for kind, name in (('T', 'telemetry.csv'), ('D', 'data.csv')):
+            path = os.path.join(directory, name)
+            new = not os.path.exists(path) or os.path.getsize(path) == 0
+            self._files[kind] = open(path, 'a', newline='')
+            self._writers[kind] = csv.writer(self._files[kind])
+            if new:
+                self._writers[kind].writerow(self.COLUMNS[kind])
+
+    async def handle(self, packet):
+        writer = self._writers.get(packet['type'])
+        if writer:
+            writer.writerow([packet.get(column) for column in self.COLUMNS[packet['type']]])
+
+    async def close(self):
+        for file in self._files.values():
+            file.close()
+
+
+class TcpSink(Sink):
+    """Serves the packets as JSON lines to every client connected to a local TCP port."""
+
+    def __init__(self, port, host='127.0.0.1', maxsize=256):
+        super().__init__(maxsize)
+        self.host = host
+        self.port = port
+        self._clients = set()
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._connected, self.host, self.port)
+
+    async def _connected(self, reader, writer):
+        self._clients.add(writer)
+
+    async def handle(self, packet):
+        line = (json.dumps(packet) + '\n').encode('utf-8')
+        for writer in list(self._clients):
+            if writer.is_closing():
+                self._clients.discard(writer)
+                continue
+            writer.write(line)
+            # a client that does not keep up is dropped rather than buffered
+            if writer.transport.get_write_buffer_size() > 1 << 20:
+                writer.close()
+                self._clients.discard(writer)
+
+    async def close(self):
+        for writer in self._clients:
+            writer.close()
+        if self._server:
+            self._server.close()
+
+
+class StatsServer:
+    """Writes the current link statistics as one JSON line to every client that connects."""
+
+    def __init__(self, link_stats, port, host='127.0.0.1'):
+        self.link_stats = link_stats
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._connected, self.host, self.port)
+
+    async def _connected(self, reader, writer):
+        writer.write((json.dumps(self.link_stats.snapshot()) + '\n').encode('utf-8'))
+        await writer.drain()
+        writer.close()
+
+    def close(self):
+        if self._server:
+            self._server.close()
+
+
+# ****************************************************************************
+# reader
+# ****************************************************************************
+
+def open_source(args):
+    """Returns a blocking read(n) callable and a close callable for the configured source."""
+    if args.serial:
+        # optional dependency, only needed for a real serial port
+        import serial
+        port = serial.Serial(args.serial, args.baudrate, timeout=0.1)
+        return port.read, port.close
+    if args.replay == '-':
+        return sys.stdin.buffer.read1, lambda: None
+    stream = open(args.replay, 'rb')
+    return stream.read, stream.close
+
+
+async def receive(read, sinks, decoder, rate=None, follow=False):
+    """Reads the source until it ends and offers every decoded packet to the sinks.
+
+    Parameters
+    ----------
+    read : callable
+        Blocking read(n), run in the default executor so the event loop stays free.
+    rate : float, optional
+        Throttle to this many bytes per second, e.g. to replay at radio speed.
+    follow : bool
+        Keep reading after an empty read, as for a serial port.
+    """
+    def offer(packets):
+        for packet in packets:
+            for sink in sinks:
+                sink.offer(packet)
+
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+    while True:
+        chunk = await loop.run_in_executor(None, read, READ_SIZE)
+        if not chunk:
+            if follow:
+                # a quiet port still releases the packets held for reordering in time
+                offer(decoder.expire(time.time()))
+                continue
+            break
+        offer(decoder.feed(chunk))
+        if rate:
+            ahead = decoder.bytes_received / rate - (time.monotonic() - started)
+            if ahead > 0:
+                await asyncio.sleep(ahead)
+        else:
+            # let the sinks drain between chunks
+            await asyncio.sleep(0)
+    offer(decoder.flush())
+
+
+async def run(args):
+    sinks = []
+    if args.stdout:
+        sinks.append(StdoutSink(args.queue_size))
+    if args.csv:
+        sinks.append(CsvSink(args.csv, args.queue_size))
+    if args.tcp:
+        tcp = TcpSink(args.tcp, maxsize=args.queue_size)
+        await tcp.start()
+        sinks.append(tcp)
+
+    read, close = open_source(args)
+    decoder = FrameDecoder(args.reorder_window)
+    stats_server = None
+    if args.stats_port:
+        stats_server = StatsServer(decoder.link_stats, args.stats_port)
+        await stats_server.start()
+    tasks = [asyncio.create_task(sink.run()) for sink in sinks]
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        await receive(read, sinks, decoder, args.rate, follow=bool(args.serial))
+    finally:
+        close()
+        if stats_server:
+            stats_server.close()
+        for sink, task in zip(sinks, tasks):
+            # a sink that is no longer running would never take the sentinel off a full queue
+            if not task.done():
+                await sink.queue.put(None)
+        await asyncio.gather(*tasks, return_exceptions=True)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return decoder, sinks, wall, cpu
+
+
+# ****************************************************************************
+# capture files
+# ****************************************************************************
+
+class _CaptureUART:
+    """Stands in for the UART so TupperSatRadio writes frames to a file."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, data):
+        return self.stream.write(data)
+
+
+def make_capture(path, frames):
+    """Writes a synthetic capture of alternating telemetry and data frames."""
+    # tuppersat imports, only needed to synthesise captures
+    from tuppersat.radio import TupperSatRadio
+    from collections import namedtuple
+    Time = namedtuple('Time', 'hour minute second microsecond')
+    with open(path, 'wb') as stream:
+        radio = TupperSatRadio(_CaptureUART(stream), 0x15, 'R2D1')
+        for i in range(frames):
+            seconds = 12 * 3600 + i
+            if i % 2:
+                radio.send_data(f'{i // 2}({i * 0.5:.2f}, {seconds}, 1234.5, 1, 12.5, 3.25, 32768, 26000)'.encode('ascii'))
+            else:
+                radio.send_telemetry(Time(seconds // 3600 % 24, seconds // 60 % 60, seconds % 60, 0),
+                                     53.30812, -6.22376, 1.2, 1234.5 + i, 21.5, -12.25, 1013.25, gps_valid=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--serial', help='serial port of the ground radio')
+    source.add_argument('--replay', help="capture file or '-' for stdin")
+    parser.add_argument('--baudrate', type=int, default=38400)
+    parser.add_argument('--rate', type=float, help='replay throttle in bytes per second')
+    parser.add_argument('--stdout', action='store_true', help='print packets')
+    parser.add_argument('--csv', help='directory for telemetry.csv and data.csv')
+    parser.add_argument('--tcp', type=int, help='serve JSON lines on this local port')
+    parser.add_argument('--stats-port', type=int, help='serve link statistics as JSON on this local port')
+    parser.add_argument('--queue-size', type=int, default=256, help='packets buffered per sink')
+    parser.add_argument('--reorder-window', type=int, default=8,
+                        help='packets held per stream to restore their order, 0 passes them on as received')
+    parser.add_argument('--benchmark', action='store_true', help='report throughput and CPU use')
+    parser.add_argument('--make-capture', help='write a synthetic capture file and exit')
+    parser.add_argument('--frames', type=int, default=10000, help='frames in the synthetic capture')
+    args = parser.parse_args(argv)
+
+    if args.make_capture:
+        make_capture(args.make_capture, args.frames)
+        return
+    if not (args.serial or args.replay):
+        parser.error('one of --serial or --replay is required')
+
+    decoder, sinks, wall, cpu = asyncio.run(run(args))
+    if args.benchmark:
+        full_rate_seconds = decoder.bytes_received / FULL_RATE_BYTES_PER_SECOND
+        print(f'{decoder.frames_received} frames, {decoder.bytes_received} bytes in {wall:.2f} s '
+              f'({decoder.bytes_received / wall:.0f} B/s), {cpu:.2f} s CPU')
+        print(f'the same bytes take {full_rate_seconds:.0f} s at 38400 baud, '
+              f'CPU load at full rate {100 * cpu / full_rate_seconds:.2f} %')
+        for sink in sinks:
+            print(f'{type(sink).__name__}: {sink.dropped} dropped, {sink.errors} failed')
+        print(json.dumps(decoder.link_stats.snapshot(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""tuppersat.tools.ingest
+
+Turns the flight files (data, telemetry and logs.log) into compressed columnar
+datasets for analysis. Files are streamed in fixed size chunks of lines, so
+memory stays bounded however long the flight was, and several files are
+processed in parallel by a process pool.
+
+Columns follow the stored row layout of R2D1.store: the store count followed
+by the fields of the group in tuppersat.schema. The header line of the CSV
+files is checked against it. Raw values are converted on the way:
+
+- data: SHT31 humidity ticks to %RH and temperature ticks to degrees C.
+- telemetry: the MS5611 temperature from 0.01 degrees C to degrees C,
+  pressure is already stored in hPa.
+
+Usage:
+
+    python -m tuppersat.tools.ingest data/telemetry.txt data/data.txt data/logs.log -o out/
+    python -m tuppersat.tools.ingest data/*.csv -o out/ --format parquet
+
+"""
+
+# standard library imports
+import argparse
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+# third party imports
+import numpy as np
+
+# tuppersat imports
+from tuppersat.schema import csv_header, storage_fields
+
+# numpy types of the struct types in tuppersat.schema
+DTYPES = {'B': '<u1', 'H': '<u2', 'I': '<u4', 'i': '<i4', 'f': '<f4', 'd': '<f8'}
+
+# columns of the stored rows, from the group schemas R2D1.store writes them with
+SCHEMAS = {
+    'telemetry': [(name, DTYPES[field_type]) for name, field_type in storage_fields('telemetry')],
+    'data': [(name, DTYPES[field_type]) for name, field_type in storage_fields('data')],
+    'logs': [
+        ('time', '<f8'),
+        ('event', '<U16'),
+        ('group', '<U16'),
+        ('message', '<U160'),
+    ],
+}
+
+CHUNK_LINES = 50000
+
+# '     12.3 > TRANSMIT > TELEMETRY > Packet Count - 1 > ...' or 'ERROR > READ > PRESSURE > ...'
+LOG_LINE = re.compile(r'^\s*(?P<time>-?\d+(?:\.\d*)?)?\s*(?:>\s*)?(?P<event>[A-Za-z_]+)\s*>\s*(?P<rest>.*)$')
+
+
+def detect_kind(path):
+    """Guesses the file kind ('telemetry', 'data' or 'logs') from its name."""
+    name = os.path.basename(path).lower()
+    for kind in ('telemetry', 'data', 'log'):
+        if kind in name:
+            return 'logs' if kind == 'log' else kind
+    raise ValueError(f'cannot tell the kind of {path}, pass --kind')
+
+
+def iter_chunks(path, chunk_lines=CHUNK_LINES):
+    """Yields lists of at most chunk_lines non-empty lines."""
+    chunk = []
+    with open(path, 'r', errors='replace') as stream:
+        for line in stream:
+            if line.strip():
+                chunk.append(line)
+                if len(chunk) >= chunk_lines:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+def _clean(line):
+    # data rows are written as str(tuple), tolerate the brackets and spaces
+    return line.replace('(', '').replace(')', '').replace(' ', '')
+
+
+def parse_numeric_chunk(lines, columns):
+    """Parses comma separated rows into a 2D float array, skipping malformed rows.
+
+    Returns
+    -------
+    values : numpy.ndarray
+        shape (rows, columns)
+    bad : int
+        Number of skipped rows.
+    """
+    cleaned = [_clean(line) for line in lines]
+    try:
+        values = np.loadtxt(cleaned, delimiter=',', ndmin=2, dtype=np.float64)
+        if values.shape[1] == columns:
+            return values, 0
+    except ValueError:
+        pass
+    # slow path, only taken for chunks with malformed rows
+    rows = []
+    for line in cleaned:
+        parts = line.strip().split(',')
+        if len(parts) != columns:
+            continue
+        try:
+            rows.append([float(part) for part in parts])
+        except ValueError:
+            continue
+    values = np.array(rows, dtype=np.float64).reshape(-1, columns)
+    return values, len(lines) - len(rows)
+
+
+def convert(kind, columns):
+    """Converts raw sensor units in place."""
+    if kind == 'data':
+        columns['humidity'] = (100.0 * columns['humidity'] / 65535.0).astype('<f4')
+        columns['temperature'] = (-45.0 + 175.0 * columns['temperature'] / 65535.0).astype('<f4')
+    elif kind == 'telemetry':
+        columns['temperature_from_pressure'] = (columns['temperature_from_pressure'] / 100.0).astype('<f4')
+    return columns
+
+
+def check_header(kind, line):
+    """Raises ValueError if a CSV header line does not match the schema of kind."""
+    if line.strip() != csv_header(kind):
+        raise ValueError(f'{kind} header {line.strip()!r} does not match the schema {csv_header(kind)!r}')
+
+
+def parse_chunk(kind, lines):
+    """Parses a chunk of lines into a dict of column arrays and the number of skipped lines."""
+    schema = SCHEMAS[kind]
+    if kind == 'logs':
+        return parse_log_chunk(lines)
+    if lines[0].startswith('store_count'):
+        check_header(kind, lines[0])
+        lines = lines[1:]
+    values, bad = parse_numeric_chunk(lines, len(schema))
+    columns = {name: values[:, i].astype(dtype) for i, (name, dtype) in enumerate(schema)}
+    return convert(kind, columns), bad
+
+
+def parse_log_chunk(lines):
+    """Splits logs.log lines into time, event, group and message columns."""
+    times, events, groups, messages = [], [], [], []
+    for line in lines:
+        match = LOG_LINE.match(line.rstrip('\n'))
+        if match:
+            parts = [part.strip() for part in match.group('rest').split('>')]
+            times.append(float(match.group('time')) if match.group('time') else np.nan)
+            events.append(match.group('event').strip())
+            groups.append(parts[0])
+            messages.append(' > '.join(parts[1:]))
+        else:
+            times.append(np.nan)
+            events.append('TEXT')
+            groups.append('')
+            messages.append(line.strip())
+    schema = dict(SCHEMAS['logs'])
+    columns = {
+        'time': np.array(times, dtype=schema['time']),
+        'event': np.array(events, dtype=schema['event']),
+        'group': np.array(groups, dtype=schema['group']),
+        'message': np.array(messages, dtype=schema['message']),
+    }
+    return columns, 0
+
+
+class NpzWriter:
+    """Streams columns into a compressed .npz without holding them in memory.
+
+    Each column's chunks are appended to a temporary raw file, on close every
+    column is copied into the zip archive behind its .npy header.
+    """
+    def __init__(self, path, schema):
+        self.path = path
+        self.schema = [(name, np.dtype(dtype)) for name, dtype in schema]
+        self.rows = 0
+        self._tmpdir = tempfile.mkdtemp(prefix='ingest-')
+        self._files = {name: open(os.path.join(self._tmpdir, name), 'wb') for name, dtype in self.schema}
+
+    def write(self, columns):
+        for name, dtype in self.schema:
+            self._files[name].write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+        self.rows += len(columns[self.schema[0][0]])
+
+    def close(self):
+        try:
+            with zipfile.ZipFile(self.path, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+                for name, dtype in self.schema:
+                    self._files[name].close()
+                    header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (self.rows,)}
+                    with archive.open(f'{name}.npy', 'w', force_zip64=True) as member:
+                        np.lib.format.write_array_header_2_0(member, header)
+                        with open(os.path.join(self._tmpdir, name), 'rb') as raw:
+                            shutil.copyfileobj(raw, member, 1 << 20)
+        finally:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+
+class ParquetWriter:
+    """Streams columns into a Parquet file, one row group per chunk."""
+    def __init__(self, path, schema):
+        # optional dependency, only needed for --format parquet
+        import pyarrow
+        import pyarrow.parquet
+        self._pyarrow = pyarrow
+        self.rows = 0
+        self._writer = None
+        self._path = path
+        self._names = [name for name, dtype in schema]
+        self._parquet = pyarrow.parquet
+
+    def write(self, columns):
+        table = self._pyarrow.table({name: columns[name] for name in self._names})
+        if self._writer is None:
+            self._writer = self._parquet.ParquetWriter(self._path, table.schema, compression='zstd')
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+WRITERS = {
+    'npz': NpzWriter,
+    'parquet': ParquetWriter,
+}
+
+
+def ingest_file(path, output_dir, output_format='npz', kind=None, chunk_lines=CHUNK_LINES):
+    """Converts one flight file and returns (path, output path, rows, skipped lines)."""
+    kind = kind or detect_kind(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    output = os.path.join(output_dir, f'{stem}.{output_format}')
+    writer = WRITERS[output_format](output, SCHEMAS[kind])
+    skipped = 0
+    try:
+        for lines in iter_chunks(path, chunk_lines):
+            columns, bad = parse_chunk(kind, lines)
+            skipped += bad
+            writer.write(columns)
+    finally:
+        writer.close()
+    return path, output, writer.rows, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('files', nargs='+', help='flight files, e.g. data/telemetry.txt data/logs.log')
+    parser.add_argument('-o', '--output-dir', default='.', help='directory for the converted files')
+    parser.add_argument('--format', choices=sorted(WRITERS), default='npz', help='output format')
+    parser.add_argument('--kind', choices=sorted(SCHEMAS), help='file kind, guessed from the name by default')
+    parser.add_argument('--chunk-lines', type=int, default=CHUNK_LINES, help='lines parsed per chunk')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes, one file each')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(ingest_file, path, args.output_dir, args.format, args.kind, args.chunk_lines)
+                   for path in args.files]
+        for future in futures:
+            path, output, rows, skipped = future.result()
+            print(f'{path} -> {output}: {rows} rows, {skipped} skipped')
+
+
+if __name__ == '__main__':
+    main()
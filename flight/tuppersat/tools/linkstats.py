@@ -0,0 +1,181 @@
+"""tuppersat.tools.linkstats
+
+Incremental radio link statistics for the ground station: lost frames from
+gaps in the 8-bit RHSerial frame id and lost packets from gaps in the
+telemetry and data sequence tags (all wrap around), loss rates over sliding
+time windows, an RSSI histogram, the number of frames that failed the
+checksum and of repeated packets.
+
+Every update is O(1) and all state has a fixed size, so the statistics can
+run for a whole flight inside tuppersat.tools.ground.
+
+"""
+
+# standard library imports
+import time
+
+FRAME_ID_MODULO = 0x100
+TELEMETRY_INDEX_MODULO = 100000
+# the flight computer tags telemetry and data packets alike as it sends them, the telemetry index is the tag,
+# so frames it drops from its transmit queue leave no gap here
+SEQUENCE_TAG_MODULO = TELEMETRY_INDEX_MODULO
+
+
+class SequenceTracker:
+    """Counts received and lost items of a wrapping sequence number.
+
+    A jump forward by more than half the modulo is taken as a duplicate or
+    reordered item rather than as that many lost ones.
+    """
+
+    def __init__(self, modulo):
+        self.modulo = modulo
+        self.last = None
+        self.received = 0
+        self.lost = 0
+        self.out_of_order = 0
+
+    def update(self, sequence):
+        """Records a sequence number and returns how many were lost before it."""
+        self.received += 1
+        if self.last is None:
+            self.last = sequence
+            return 0
+        gap = (sequence - self.last - 1) % self.modulo
+        if gap >= self.modulo // 2:
+            self.out_of_order += 1
+            return 0
+        self.last = sequence
+        self.lost += gap
+        return gap
+
+    @property
+    def loss_rate(self):
+        total = self.received + self.lost
+        return self.lost / total if total else 0.0
+
+
+class LossWindow:
+    """Received and lost counts over the last `seconds`, in one second buckets."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self._received = [0] * seconds
+        self._lost = [0] * seconds
+        self._bucket = None
+
+    def _advance(self, now):
+        bucket = int(now)
+        if self._bucket is None:
+            self._bucket = bucket
+        # clear the buckets that fell out of the window, at most the whole ring
+        for second in range(self._bucket + 1, min(bucket, self._bucket + self.seconds) + 1):
+            self._received[second % self.seconds] = 0
+            self._lost[second % self.seconds] = 0
+        self._bucket = max(self._bucket, bucket)
+
+    def add(self, now, received, lost):
+        self._advance(now)
+        self._received[self._bucket % self.seconds] += received
+        self._lost[self._bucket % self.seconds] += lost
+
+    def loss_rate(self, now=None):
+        if now is not None:
+            self._advance(now)
+        received, lost = sum(self._received), sum(self._lost)
+        return lost / (received + lost) if received + lost else 0.0
+
+
+class RSSIHistogram:
+    """Histogram of the signed RSSI byte, one bin per value."""
+
+    def __init__(self):
+        self.counts = [0] * 256
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+        self._sum = 0
+
+    def add(self, rssi):
+        self.counts[rssi + 128] += 1
+        self.total += 1
+        self._sum += rssi
+        self.minimum = rssi if self.minimum is None else min(self.minimum, rssi)
+        self.maximum = rssi if self.maximum is None else max(self.maximum, rssi)
+
+    @property
+    def mean(self):
+        return self._sum / self.total if self.total else None
+
+    def percentile(self, q):
+        """RSSI below which q percent of the frames were received."""
+        if not self.total:
+            return None
+        target, running = q / 100 * self.total, 0
+        for i, count in enumerate(self.counts):
+            running += count
+            if running >= target:
+                return i - 128
+        return self.maximum
+
+
+class LinkStats:
+    """Link statistics over every frame the ground station decoded.
+
+    Parameters
+    ----------
+    windows : tuple of int
+        Lengths in seconds of the sliding loss windows.
+    """
+
+    def __init__(self, windows=(10, 60, 600)):
+        self.frames = SequenceTracker(FRAME_ID_MODULO)
+        self.telemetry = SequenceTracker(TELEMETRY_INDEX_MODULO)
+        self.data = SequenceTracker(SEQUENCE_TAG_MODULO)
+        self.windows = [LossWindow(seconds) for seconds in windows]
+        self.rssi = RSSIHistogram()
+        self.checksum_failures = 0
+        self.duplicates = 0 # counted by the ground FrameDecoder, which drops them
+        self.started = time.time()
+
+    def update(self, packet, now=None):
+        """Records a decoded packet as returned by tuppersat.tools.ground.FrameDecoder."""
+        now = packet.get('received', time.time()) if now is None else now
+        lost = self.frames.update(packet['frame_id'])
+        for window in self.windows:
+            window.add(now, 1, lost)
+        self.rssi.add(packet['rssi'])
+        if packet['type'] == 'T' and isinstance(packet.get('index'), int):
+            self.telemetry.update(packet['index'])
+        elif packet['type'] == 'D' and packet.get('seq') is not None:
+            self.data.update(packet['seq'])
+
+    def checksum_failure(self, message=None):
+        """RXHandler on_checksum_failure callback."""
+        self.checksum_failures += 1
+
+    def snapshot(self, now=None):
+        """Returns the current statistics as a JSON serialisable dictionary."""
+        now = time.time() if now is None else now
+        return {
+            'uptime': round(now - self.started, 1),
+            'frames_received': self.frames.received,
+            'frames_lost': self.frames.lost,
+            'frames_out_of_order': self.frames.out_of_order,
+            'frame_loss_rate': round(self.frames.loss_rate, 4),
+            'telemetry_received': self.telemetry.received,
+            'telemetry_lost': self.telemetry.lost,
+            'data_received': self.data.received,
+            'data_lost': self.data.lost,
+            'checksum_failures': self.checksum_failures,
+            'duplicates': self.duplicates,
+            'loss_rate_windows': {f'{window.seconds}s': round(window.loss_rate(now), 4) for window in self.windows},
+            'rssi': {
+                'min': self.rssi.minimum,
+                'max': self.rssi.maximum,
+                'mean': None if self.rssi.mean is None else round(self.rssi.mean, 1),
+                'p10': self.rssi.percentile(10),
+                'p50': self.rssi.percentile(50),
+                'p90': self.rssi.percentile(90),
+            },
+        }
@@ -0,0 +1,120 @@
+"""tuppersat.tools.logdecode
+
+Decodes a binary event log (see code.comms.events) back to the text form of
+logs.log. The message templates are read from the file header, records are
+decoded one at a time so files of any size stream through in constant memory.
+
+Usage:
+
+    python -m tuppersat.tools.logdecode data/logs.bin
+    python -m tuppersat.tools.logdecode data/logs.bin --event TRANSMIT QUEUE --start 60 --end 600
+
+"""
+
+# standard library imports
+import argparse
+import struct
+import sys
+
+MAGIC = b'R2D1LOG'
+RECORD_HEAD = struct.Struct('<BI')
+
+
+class LogFormatError(ValueError):
+    """Raised when a file is not a binary event log."""
+
+
+def read_header(stream):
+    """Reads the file header and returns the event table.
+
+    Returns
+    -------
+    dict
+        event id -> (name, template, format, argument names)
+    """
+    if stream.read(len(MAGIC)) != MAGIC:
+        raise LogFormatError('not a binary event log')
+    version, length = struct.unpack('<BH', stream.read(3))
+    table = {}
+    for entry in stream.read(length).decode('utf-8').split('\x1e'):
+        if not entry:
+            continue
+        event_id, name, template, fmt, names = entry.split('\x1f')
+        table[int(event_id)] = (name, template, fmt, tuple(names.split(',')) if names else ())
+    return table
+
+
+def _read_exact(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise EOFError
+    return data
+
+
+def read_records(stream, table):
+    """Yields (event name, time in seconds, argument dict) for every record."""
+    while True:
+        try:
+            event_id, ms = RECORD_HEAD.unpack(_read_exact(stream, RECORD_HEAD.size))
+            name, template, fmt, names = table[event_id]
+            args = []
+            for code in fmt:
+                if code == 's':
+                    (length,) = struct.unpack('<H', _read_exact(stream, 2))
+                    args.append(_read_exact(stream, length).decode('utf-8', 'replace'))
+                else:
+                    size = struct.calcsize('<' + code)
+                    (value,) = struct.unpack('<' + code, _read_exact(stream, size))
+                    # values were packed as single precision floats
+                    args.append(round(value, 4) if code == 'f' else value)
+        except EOFError:
+            # end of file, or a record truncated by a reset mid write
+            return
+        yield name, ms / 1000, dict(zip(names, args))
+
+
+def decode(stream, events=None, start=None, end=None):
+    """Yields the text log lines of the records matching the filters.
+
+    Parameters
+    ----------
+    stream : binary file object
+    events : iterable of str, optional
+        Event names to keep, all if None.
+    start, end : float, optional
+        Mission time range in seconds to keep.
+    """
+    table = read_header(stream)
+    templates = {name: template for name, template, fmt, names in table.values()}
+    events = set(events) if events else None
+    for name, t, args in read_records(stream, table):
+        if events is not None and name not in events:
+            continue
+        if start is not None and t < start:
+            continue
+        if end is not None and t > end:
+            continue
+        yield templates[name].format(t=t, **args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('logfile', help='binary event log, e.g. data/logs.bin')
+    parser.add_argument('--event', nargs='+', help='only these events, e.g. TRANSMIT QUEUE')
+    parser.add_argument('--start', type=float, help='mission time in seconds to start from')
+    parser.add_argument('--end', type=float, help='mission time in seconds to stop at')
+    parser.add_argument('-o', '--output', help='write to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    with open(args.logfile, 'rb') as stream:
+        output = open(args.output, 'w') if args.output else sys.stdout
+        try:
+            for line in decode(stream, args.event, args.start, args.end):
+                output.write(line)
+        finally:
+            if args.output:
+                output.close()
+
+
+if __name__ == '__main__':
+    main()
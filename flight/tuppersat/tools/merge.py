@@ -0,0 +1,186 @@
+"""tuppersat.tools.merge
+
+Time-aligned (as-of) merge of two flight streams, e.g. the data group (UV,
+humidity) with the telemetry group (pressure, temperature, position), as
+written by tuppersat.tools.ingest.
+
+Every row of the left stream gets the right row at or before its time
+('backward'), at or after it ('forward') or the closer of the two
+('nearest'). Matches further away than the tolerance are left as NaN, and
+numeric columns can instead be linearly interpolated between the rows either
+side. Both streams must be sorted by time; the two sorted key arrays are
+merged with a stable sort, which runs in a single linear pass over sorted
+runs, and everything else is vectorized.
+
+Usage:
+
+    python -m tuppersat.tools.merge out/data.npz out/telemetry.npz -o out/merged.npz --tolerance 5 --interpolate
+
+"""
+
+# standard library imports
+import argparse
+import os
+
+# third party imports
+import numpy as np
+
+DIRECTIONS = ('backward', 'forward', 'nearest')
+
+
+def hhmmss_to_seconds(hhmmss):
+    """Converts GPS hhmmss integers to seconds, continuing past midnight."""
+    hhmmss = np.asarray(hhmmss, dtype=np.int64)
+    seconds = (hhmmss // 10000) * 3600 + (hhmmss // 100 % 100) * 60 + hhmmss % 100
+    # a drop of more than half a day is the UTC day rolling over
+    rollover = np.concatenate(([0], np.diff(seconds) < -43200)).cumsum()
+    return (seconds + rollover * 86400).astype(np.float64)
+
+
+def _backward_index(left_keys, right_keys):
+    """Index of the last right key <= each left key, -1 if there is none."""
+    m = len(right_keys)
+    keys = np.concatenate((right_keys, left_keys))
+    # right keys first so an equal right key sorts before the left key it matches
+    order = np.argsort(keys, kind='stable')
+    is_right = order < m
+    running = np.maximum.accumulate(np.where(is_right, order, -1))
+    index = np.empty(len(left_keys), dtype=np.int64)
+    index[order[~is_right] - m] = running[~is_right]
+    return index
+
+
+def _forward_index(left_keys, right_keys):
+    """Index of the first right key >= each left key, len(right_keys) if there is none."""
+    reversed_index = _backward_index(-left_keys[::-1], -right_keys[::-1])[::-1]
+    return np.where(reversed_index < 0, len(right_keys), len(right_keys) - 1 - reversed_index)
+
+
+def asof_indices(left_keys, right_keys, direction='backward', tolerance=None):
+    """Returns the matching right row for every left row, -1 where there is no match.
+
+    Parameters
+    ----------
+    left_keys, right_keys : numpy.ndarray
+        Sorted times.
+    direction : str
+        'backward', 'forward' or 'nearest'.
+    tolerance : float, optional
+        Largest allowed distance between matched times.
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f'direction must be one of {DIRECTIONS}')
+    left_keys = np.asarray(left_keys, dtype=np.float64)
+    right_keys = np.asarray(right_keys, dtype=np.float64)
+    m = len(right_keys)
+    if not m:
+        # a capture with only the other packet type, nothing matches
+        return np.full(len(left_keys), -1, dtype=np.intp)
+    backward = _backward_index(left_keys, right_keys)
+    if direction == 'backward':
+        index = backward
+    else:
+        forward = _forward_index(left_keys, right_keys)
+        if direction == 'forward':
+            index = np.where(forward < m, forward, -1)
+        else:
+            back_distance = np.where(backward >= 0, left_keys - right_keys[np.clip(backward, 0, None)], np.inf)
+            forward_distance = np.where(forward < m, right_keys[np.clip(forward, None, m - 1)] - left_keys, np.inf)
+            index = np.where(forward_distance < back_distance, forward, backward)
+            index = np.where(np.isinf(np.minimum(back_distance, forward_distance)), -1, index)
+    if tolerance is not None and m:
+        distance = np.abs(left_keys - right_keys[np.clip(index, 0, m - 1)])
+        index = np.where(distance > tolerance, -1, index)
+    return index
+
+
+def asof_merge(left_keys, right_keys, right_columns, direction='backward', tolerance=None, interpolate=False):
+    """Aligns right_columns to left_keys.
+
+    Parameters
+    ----------
+    left_keys, right_keys : numpy.ndarray
+        Sorted times.
+    right_columns : dict of numpy.ndarray
+        Columns of the right stream.
+    direction, tolerance :
+        See asof_indices.
+    interpolate : bool
+        Linearly interpolate numeric columns between the right rows either
+        side of each left time, both within tolerance. Other columns take the
+        as-of match.
+
+    Returns
+    -------
+    dict of numpy.ndarray
+        Columns with one row per left key, NaN (or '') where unmatched.
+    """
+    left_keys = np.asarray(left_keys, dtype=np.float64)
+    right_keys = np.asarray(right_keys, dtype=np.float64)
+    index = asof_indices(left_keys, right_keys, direction, tolerance)
+    matched = index >= 0
+    safe_index = np.where(matched, index, 0)
+
+    if interpolate and len(right_keys) > 1:
+        m = len(right_keys)
+        before = _backward_index(left_keys, right_keys)
+        after = _forward_index(left_keys, right_keys)
+        inside = (before >= 0) & (after < m)
+        if tolerance is not None:
+            inside &= (left_keys - right_keys[np.clip(before, 0, m - 1)] <= tolerance)
+            inside &= (right_keys[np.clip(after, 0, m - 1)] - left_keys <= tolerance)
+        b, a = np.clip(before, 0, m - 1), np.clip(after, 0, m - 1)
+        span = right_keys[a] - right_keys[b]
+        weight = np.divide(left_keys - right_keys[b], span, out=np.zeros_like(left_keys), where=span > 0)
+
+    merged = {}
+    for name, column in right_columns.items():
+        column = np.asarray(column)
+        if column.dtype.kind in 'fiu':
+            if not len(column):
+                merged[name] = np.full(len(left_keys), np.nan)
+                continue
+            values = np.where(matched, column[safe_index].astype(np.float64), np.nan)
+            if interpolate and len(right_keys) > 1:
+                interpolated = column[b] + weight * (column[a].astype(np.float64) - column[b])
+                values = np.where(inside, interpolated, values)
+            merged[name] = values
+        elif not len(column):
+            merged[name] = np.full(len(left_keys), column.dtype.type(), dtype=column.dtype)
+        else:
+            merged[name] = np.where(matched, column[safe_index], column.dtype.type())
+    return merged
+
+
+def stream_keys(columns, on):
+    """Returns the sort key of a stream, 'hhmmss' is converted to seconds."""
+    if on == 'hhmmss':
+        return hhmmss_to_seconds(columns['hhmmss'])
+    return np.asarray(columns[on], dtype=np.float64)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('left', help='stream that sets the rows, e.g. out/data.npz')
+    parser.add_argument('right', help='stream joined onto it, e.g. out/telemetry.npz')
+    parser.add_argument('-o', '--output', required=True, help='merged .npz')
+    parser.add_argument('--on', default='hhmmss', help="time column present in both streams, default 'hhmmss'")
+    parser.add_argument('--direction', choices=DIRECTIONS, default='backward')
+    parser.add_argument('--tolerance', type=float, help='largest time difference in seconds')
+    parser.add_argument('--interpolate', action='store_true', help='interpolate numeric right columns')
+    args = parser.parse_args(argv)
+
+    left = dict(np.load(args.left))
+    right = dict(np.load(args.right))
+    prefix = os.path.splitext(os.path.basename(args.right))[0]
+    right_columns = {(f'{prefix}_{name}' if name in left else name): column
+                     for name, column in right.items() if name != args.on}
+    merged = asof_merge(stream_keys(left, args.on), stream_keys(right, args.on), right_columns,
+                        args.direction, args.tolerance, args.interpolate)
+    np.savez_compressed(args.output, **left, **merged)
+    matched = int(np.sum(~np.isnan(next(iter(merged.values()))))) if merged else 0
+    print(f'{args.output}: {len(next(iter(left.values())))} rows, {matched} matched')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""tuppersat.tools.pipeline
+
+Runs the R2D1 cycle against simulated sensor, SD card and radio timings,
+once on a single thread like R2D1.start and once split by
+tuppersat.dual_core.DualCore itself, its produce step on one thread and its
+consume step on another standing in for core 1. Reports how late the
+samples are taken, the end-to-end latency from sample to stored row and the
+ring's back-pressure counters.
+
+The flight R2D1 needs the RP2040, so a SimulatedR2D1 with the interface
+DualCore uses takes its place. The simulated costs sleep, so the two
+threads overlap the way the two RP2040 cores do.
+
+Usage:
+
+    python -m tuppersat.tools.pipeline --duration 10
+    python -m tuppersat.tools.pipeline --sd-stall-ms 400 --capacity 8
+
+"""
+
+# standard library imports
+import argparse
+import contextlib
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+# tuppersat imports
+from tuppersat.dual_core import DualCore
+
+# fields of the telemetry and data records of main.py, 'time' first
+TELEMETRY_FIELDS = ('time', 't_internal', 't_external', 'pressure', 'temperature_from_pressure', 'hhmmss',
+                    'latitude', 'longitude', 'hdop', 'altitude', 'gps_valid', 'gps_age')
+DATA_FIELDS = ('time', 'uva', 'uvb', 'humidity', 'temperature', 'hhmmss', 'latitude', 'longitude', 'hdop',
+               'altitude', 'gps_valid', 'gps_age')
+
+
+class SimulatedRecord:
+    """Same layout as code.comms.sample_record.SampleRecord, which DualCore copies for core 0."""
+
+    def __init__(self, fields, sensor_offsets=None):
+        self.fields = tuple(fields)
+        self.sensor_offsets = sensor_offsets or []
+        self.values = array('d', [0.0] * len(self.fields))
+        self.fresh = False
+
+
+class SimulatedLogger:
+    def use_lock(self):
+        pass
+
+
+class SimulatedR2D1:
+    """Stands in for R2D1 with the methods DualCore calls, the sensors, SD card and radio are timed sleeps."""
+
+    def __init__(self, args):
+        self.period = 1 / args.rate
+        self.read_cost = args.read_ms / 1000
+        self.process_cost = args.process_ms / 1000
+        self.sd_stall = args.sd_stall_ms / 1000
+        self.sd_stall_every = args.sd_stall_every
+        self.transmit_cost = args.transmit_ms / 1000
+        self.transmit_every = args.transmit_every
+        self.logger = SimulatedLogger()
+        self.defer_rates = False
+        self.can_idle = True
+        self.generated_packets = {}
+        self.files = {}
+        self.processed = 0
+        self.lateness = []
+        self._start = time.perf_counter()
+        self._due = 0.0
+
+    def setup(self):
+        self.generated_packets = {'telemetry': SimulatedRecord(TELEMETRY_FIELDS), 'data': SimulatedRecord(DATA_FIELDS)}
+        self._start = time.perf_counter()
+        self._due = 0.0
+
+    def time_since_epoch(self):
+        return time.perf_counter() - self._start
+
+    def next_due(self):
+        """Seconds until the next sample is due, like Sampler.next_due_ms."""
+        return max(0.0, self._due - self.time_since_epoch())
+
+    def apply_rates(self):
+        pass
+
+    def sample(self, records):
+        """Sensor reads when a sample is due, returns the number of sensors read like R2D1.sample."""
+        now = self.time_since_epoch()
+        if now < self._due:
+            return 0
+        self.lateness.append(now - self._due)
+        time.sleep(self.read_cost)
+        for record in records.values():
+            record.values[0] = now
+            record.fresh = True
+        self._due += self.period
+        # like Sampled.poll, a sample more than a period late is rescheduled from now
+        if now - self._due > self.period:
+            self._due = now + self.period
+        return 1
+
+    def account(self):
+        pass
+
+    def open_files(self):
+        return contextlib.nullcontext({})
+
+    def process(self):
+        """Formatting and the SD card write, with the odd long stall, and a radio frame now and then."""
+        self.processed += 1
+        cost = self.process_cost
+        if self.processed % self.sd_stall_every == 0:
+            cost += self.sd_stall
+        if self.processed % self.transmit_every == 0:
+            cost += self.transmit_cost
+        time.sleep(cost)
+
+
+def summary(lateness, latency):
+    def percentile(values, p):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000 if ordered else 0
+    return {
+        'samples': len(lateness),
+        'late_p99_ms': percentile(lateness, 99),
+        'late_max_ms': max(lateness, default=0) * 1000,
+        'latency_p50_ms': percentile(latency, 50),
+        'latency_p99_ms': percentile(latency, 99),
+        'latency_max_ms': max(latency, default=0) * 1000,
+    }
+
+
+def run_single(r2d1, duration):
+    """Samples and processes on one thread like R2D1.start, each sample waits for the previous cycle."""
+    latency = []
+    r2d1.setup()
+    records = r2d1.generated_packets
+    while r2d1.time_since_epoch() < duration:
+        time.sleep(r2d1.next_due())
+        if not r2d1.sample(records):
+            continue
+        r2d1.account()
+        with r2d1.open_files() as r2d1.files:
+            r2d1.process()
+        latency.append(r2d1.time_since_epoch() - records['telemetry'].values[0])
+    return summary(r2d1.lateness, latency), {}
+
+
+def run_split(r2d1, duration, capacity, high_water):
+    """Runs DualCore.produce on one pool thread and DualCore.consume on the other."""
+    dual = DualCore(r2d1, capacity, high_water, report_interval_ms=None)
+    dual.setup()
+    latency = []
+    done = []
+
+    def produce():
+        while r2d1.time_since_epoch() < duration:
+            time.sleep(r2d1.next_due())
+            dual.produce()
+        done.append(True)
+
+    def consume():
+        while not done or len(dual.ring):
+            if dual.consume():
+                latency.append(dual.latency_ms / 1000)
+            else:
+                time.sleep(0.001)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        consumer = pool.submit(consume)
+        producer = pool.submit(produce)
+        producer.result()
+        consumer.result()
+    counters = {'throttled': dual.throttled, 'overflows': dual.ring.overflows, 'peak_depth': dual.ring.high_water}
+    return summary(r2d1.lateness, latency), counters
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--duration', type=float, default=10, help='simulated seconds per run')
+    parser.add_argument('--rate', type=float, default=10, help='sample rate in Hz, the fastest sensor')
+    parser.add_argument('--read-ms', type=float, default=3, help='sensor reads per sample')
+    parser.add_argument('--process-ms', type=float, default=4, help='formatting and SD write per sample')
+    parser.add_argument('--sd-stall-ms', type=float, default=250, help='occasional SD card stall')
+    parser.add_argument('--sd-stall-every', type=int, default=25, help='writes between SD stalls')
+    parser.add_argument('--transmit-ms', type=float, default=30, help='radio frame write at 38400 baud')
+    parser.add_argument('--transmit-every', type=int, default=20, help='samples between radio frames')
+    parser.add_argument('--capacity', type=int, default=16, help='ring slots')
+    parser.add_argument('--high-water', type=int, help='depth where the producer throttles, 3/4 of capacity by default')
+    args = parser.parse_args(argv)
+    high_water = args.high_water or args.capacity * 3 // 4
+
+    for name, run in (('single', lambda sim: run_single(sim, args.duration)),
+                      ('split', lambda sim: run_split(sim, args.duration, args.capacity, high_water))):
+        result, counters = run(SimulatedR2D1(args))
+        print(f"{name:7} {result['samples']:5} samples | late p99 {result['late_p99_ms']:6.1f} ms "
+              f"max {result['late_max_ms']:6.1f} ms | latency p50 {result['latency_p50_ms']:6.1f} ms "
+              f"p99 {result['latency_p99_ms']:6.1f} ms max {result['latency_max_ms']:6.1f} ms"
+              + ''.join(f' | {key} {value}' for key, value in counters.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""tuppersat.tools.records
+
+Loads the binary storage records written with 'specified_storage_format':
+'BINARY' (see code.comms.binary_store). The header describes the field names
+and struct types, the records are fixed width and unpadded, so the file is
+mapped straight into a numpy structured array without parsing.
+
+Usage:
+
+    python -m tuppersat.tools.records data/telemetry.bin
+
+"""
+
+# standard library imports
+import argparse
+import os
+import struct
+
+# third party imports
+import numpy as np
+
+MAGIC = b'R2D1REC'
+
+# struct type -> numpy little endian type
+NUMPY_TYPES = {
+    'b': 'i1', 'B': 'u1',
+    'h': '<i2', 'H': '<u2',
+    'i': '<i4', 'I': '<u4',
+    'q': '<i8', 'Q': '<u8',
+    'f': '<f4', 'd': '<f8',
+}
+
+
+class RecordFormatError(ValueError):
+    """Raised when a file is not a binary storage record file."""
+
+
+def read_header(filename):
+    """Reads the header of a record file.
+
+    Returns
+    -------
+    dtype : numpy.dtype
+        Structured dtype of one record.
+    offset : int
+        Byte offset of the first record.
+    """
+    with open(filename, 'rb') as stream:
+        if stream.read(len(MAGIC)) != MAGIC:
+            raise RecordFormatError(f'{filename} is not a binary record file')
+        version, length = struct.unpack('<BH', stream.read(3))
+        description = stream.read(length).decode('ascii')
+    fields = [field.split(':') for field in description.split(',')]
+    dtype = np.dtype([(name, NUMPY_TYPES[field_type]) for name, field_type in fields])
+    return dtype, len(MAGIC) + 3 + length
+
+
+def load(filename):
+    """Memory-maps every complete record of filename as a structured array.
+
+    A record truncated by a reset mid write at the end of the file is ignored.
+    """
+    dtype, offset = read_header(filename)
+    count = (os.path.getsize(filename) - offset) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('filenames', nargs='+', help='record files, e.g. data/telemetry.bin')
+    args = parser.parse_args(argv)
+
+    for filename in args.filenames:
+        records = load(filename)
+        print(f'{filename}: {len(records)} records')
+        for name in records.dtype.names:
+            column = records[name]
+            if len(column):
+                print(f'  {name:26} {column.min():>14.6g} .. {column.max():<14.6g}')
+
+
+if __name__ == '__main__':
+    main()